@@ -0,0 +1,142 @@
+"""
+Benchmark CPU time and peak memory of preparing a recording's audio.
+
+Compares decoding the whole file with librosa (resampled to 22050 Hz), as
+recordings used to be loaded, against probing the header and loading
+channels at native rate. Each case runs in a fresh process so peak memory
+isn't shared between them.
+
+Usage:
+    python benchmarks/audio_loading.py --minutes 60 --sample-rate 16000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+
+def synthesize_call(path: str, minutes: float, sample_rate: int):
+    """Write a stereo call with alternating speech-like bursts on each channel"""
+    rng = np.random.default_rng(0)
+    block_seconds = 60
+    subtype = "PCM_16" if path.endswith(".wav") else None
+    with sf.SoundFile(
+        path, "w", samplerate=sample_rate, channels=2, subtype=subtype
+    ) as f:
+        remaining = int(minutes * 60 * sample_rate)
+        while remaining > 0:
+            n = min(block_seconds * sample_rate, remaining)
+            t = np.arange(n) / sample_rate
+            speaking = (t // 3) % 2 == 0
+            tone = 0.3 * np.sin(2 * np.pi * 220 * t)
+            noise = 0.01 * rng.standard_normal((n, 2))
+            block = noise.copy()
+            block[:, 0] += np.where(speaking, tone, 0)
+            block[:, 1] += np.where(speaking, 0, tone)
+            f.write(block.astype(np.float32))
+            remaining -= n
+
+
+def librosa_full_decode(audio_path: str, output_folder: str):
+    import librosa
+
+    y, sr = librosa.load(audio_path, mono=False)
+    librosa.get_duration(y=y, sr=sr)
+    sf.write(os.path.join(output_folder, "user.wav"), y[0], sr)
+    sf.write(os.path.join(output_folder, "agent.wav"), y[1], sr)
+
+
+def probe_only(audio_path: str, output_folder: str):
+    from mixedvoices.processors.audio import probe_audio
+
+    probe_audio(audio_path)
+
+
+def native_rate_channels(audio_path: str, output_folder: str):
+    from mixedvoices.processors.audio import AudioBuffer
+    from mixedvoices.processors.transcriber import (
+        encode_audio,
+        find_chunk_boundaries,
+        get_chunk_seconds,
+    )
+
+    # Prepares every upload of the OpenAI path, without sending it
+    audio = AudioBuffer.from_file(audio_path)
+    chunk_seconds = get_chunk_seconds(audio.sample_rate)
+    for channel_idx in range(audio.channels):
+        samples = audio.channel(channel_idx)
+        boundaries = find_chunk_boundaries(samples, audio.sample_rate, chunk_seconds)
+        for start, end in zip(boundaries, boundaries[1:]):
+            encode_audio(samples[start:end], audio.sample_rate, "chunk")
+
+
+CASES = {
+    "librosa full decode + split (before)": librosa_full_decode,
+    "header probe (deepgram path)": probe_only,
+    "shared buffer + chunk uploads (openai path)": native_rate_channels,
+}
+
+
+def run_case(name, audio_path, output_folder, upload_encoding, results):
+    # Package import time is the same for every case, keep it out of the timings
+    import mixedvoices.core.utils  # noqa: F401
+    from mixedvoices import models
+
+    models.UPLOAD_ENCODING = upload_encoding
+
+    start_cpu = time.process_time()
+    start_wall = time.perf_counter()
+    CASES[name](audio_path, output_folder)
+    results.put(
+        {
+            "cpu": time.process_time() - start_cpu,
+            "wall": time.perf_counter() - start_wall,
+            # Linux reports ru_maxrss in kilobytes
+            "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--format", choices=["wav", "mp3"], default="wav")
+    parser.add_argument(
+        "--upload-encoding", choices=["wav", "flac", "opus"], default="flac"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        audio_path = os.path.join(folder, f"call.{args.format}")
+        synthesize_call(audio_path, args.minutes, args.sample_rate)
+        size_mb = os.path.getsize(audio_path) / 1024**2
+        print(
+            f"{args.minutes:g} min stereo {args.format} at {args.sample_rate} Hz, "
+            f"{size_mb:.0f} MB"
+        )
+
+        context = multiprocessing.get_context("spawn")
+        for name in CASES:
+            results = context.Queue()
+            process = context.Process(
+                target=run_case,
+                args=(name, audio_path, folder, args.upload_encoding, results),
+            )
+            process.start()
+            result = results.get()
+            process.join()
+            print(
+                f"{name:<44} cpu {result['cpu']:7.2f}s  wall {result['wall']:7.2f}s  "
+                f"peak rss {result['peak_mb']:7.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark framewise audio quality analysis on a long, memory mapped call.
+
+Compares the single scalar SNR from global RMS per channel, as call metrics
+used to compute it, against analyze_audio_quality, which also finds the noise
+floor, clipping, dead air and a per second timeline.
+
+Usage:
+    python benchmarks/audio_quality.py --minutes 180
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from audio_loading import synthesize_call
+
+
+def legacy_snr(audio):
+    results = []
+    for index in range(2):
+        channel = audio.channel(index)
+        sum_of_squares = 0.0
+        for start in range(0, len(channel), 1_000_000):
+            block = channel[start : start + 1_000_000].astype(float)
+            sum_of_squares += float(np.dot(block, block))
+        signal_rms = np.sqrt(sum_of_squares / len(channel))
+        noise_rms = np.sqrt(np.mean(channel[:1000].astype(float) ** 2))
+        results.append(20 * np.log10(signal_rms / noise_rms) if noise_rms else None)
+    return results
+
+
+def report(name, func):
+    start = time.perf_counter()
+    result = func()
+    wall = time.perf_counter() - start
+    print(f"{name:<24} wall {wall:7.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--minutes", type=float, default=180)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    args = parser.parse_args()
+
+    from mixedvoices.processors.audio import AudioBuffer
+    from mixedvoices.processors.audio_quality import analyze_audio_quality
+
+    with tempfile.TemporaryDirectory() as folder:
+        audio_path = os.path.join(folder, "call.wav")
+        synthesize_call(audio_path, args.minutes, args.sample_rate)
+        audio = AudioBuffer.from_file(audio_path)
+        print(f"{args.minutes:g} min stereo wav at {args.sample_rate} Hz")
+
+        print("legacy snr", report("global rms", lambda: legacy_snr(audio)))
+        quality = report("framewise", lambda: analyze_audio_quality(audio))
+        print(quality.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark throughput of local transcription, in audio seconds per CPU second.
+
+Transcribes both channels of a stereo recording with each local Whisper model
+and process count. Model loading and a warm up run are kept out of the timings,
+CPU time is summed over this process and the pool's worker processes (Linux).
+
+Usage:
+    python benchmarks/local_transcription.py --audio tests/assets/call2.wav
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from audio_loading import synthesize_call
+
+
+def get_worker_cpu(pool) -> float:
+    """CPU seconds used so far by the pool's worker processes"""
+    ticks = os.sysconf("SC_CLK_TCK")
+    total = 0.0
+    for pid in pool._processes:
+        with open(f"/proc/{pid}/stat") as f:
+            # utime and stime, after the parenthesised command name
+            fields = f.read().rsplit(")", 1)[1].split()
+        total += (int(fields[11]) + int(fields[12])) / ticks
+    return total
+
+
+def benchmark(audio_path: str, transcription_model: str, processes: int):
+    from mixedvoices import models
+    from mixedvoices.processors import local_transcriber
+    from mixedvoices.processors.audio import AudioBuffer
+
+    models.TRANSCRIPTION_MODEL = transcription_model
+    models.LOCAL_TRANSCRIPTION_PROCESSES = processes
+    audio = AudioBuffer.from_file(audio_path)
+    warm_up = audio.channel(0)[: audio.sample_rate]
+    try:
+        # Starts every worker, each loads the model as it starts
+        futures = [
+            local_transcriber.submit_local(warm_up, audio.sample_rate)
+            for _ in range(processes)
+        ]
+        for future in futures:
+            future.result()
+        pool = local_transcriber.get_local_pool()
+
+        start_cpu = time.process_time() + get_worker_cpu(pool)
+        start_wall = time.perf_counter()
+        _, timeline = local_transcriber.transcribe_and_combine_local(audio)
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() + get_worker_cpu(pool) - start_cpu
+    finally:
+        local_transcriber.shutdown_local_pool()
+
+    audio_seconds = audio.duration * audio.channels
+    print(
+        f"{transcription_model:<20} processes {processes}  "
+        f"cpu {cpu:7.2f}s  wall {wall:7.2f}s  "
+        f"{audio_seconds / cpu:6.2f} audio s/cpu s  "
+        f"{audio_seconds / wall:6.2f}x realtime  "
+        f"{len(timeline)} words"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--audio", help="Stereo recording, a synthetic call is used if not given"
+    )
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument(
+        "--models", nargs="+", default=["local/whisper-tiny", "local/whisper-base"]
+    )
+    parser.add_argument("--processes", nargs="+", type=int, default=[1, 2])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        audio_path = args.audio
+        if audio_path is None:
+            audio_path = os.path.join(folder, "call.wav")
+            synthesize_call(audio_path, args.minutes, 16000)
+        for transcription_model in args.models:
+            for processes in args.processes:
+                benchmark(audio_path, transcription_model, processes)
+
+
+if __name__ == "__main__":
+    main()
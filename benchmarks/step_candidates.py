@@ -0,0 +1,86 @@
+"""
+Benchmark the step candidate list offered to the steps model as a project's
+step vocabulary grows.
+
+Compares offering every existing step name, as the steps prompt used to,
+against select_step_candidates. For each call of the sample project, reuse
+recall is the share of its existing, non standard steps that are offered.
+
+Usage:
+    python benchmarks/step_candidates.py --steps 2000 --limit 40
+"""
+
+import argparse
+import glob
+import json
+import time
+
+import numpy as np
+
+from mixedvoices.processors.step_candidates import (
+    OFFERED_STEP_NAMES,
+    select_step_candidates,
+)
+from mixedvoices.processors.utils import get_standard_steps_string
+
+VERSION_FOLDER = "tests/assets/sample_project/versions/v1"
+VERBS = ["Check", "Update", "Cancel", "Confirm", "Explain", "Verify", "Discuss"]
+NOUNS = [
+    "Insurance", "Billing", "Refund", "Prescription", "Address", "Order",
+    "Delivery", "Warranty", "Membership", "Password", "Schedule", "Payment",
+]  # fmt: skip
+
+
+def load_fixture_calls():
+    step_names = {}
+    for path in glob.glob(f"{VERSION_FOLDER}/steps/*/info.json"):
+        step_names[path.split("/")[-2]] = json.load(open(path))["name"]
+    calls = []
+    for path in glob.glob(f"{VERSION_FOLDER}/recordings/*/info.json"):
+        recording = json.load(open(path))
+        names = [step_names[step_id] for step_id in recording["step_ids"]]
+        calls.append((recording["combined_transcript"], names))
+    return calls
+
+
+def synthesize_step_counts(num_steps: int, calls):
+    """Distractor step names with Zipf distributed usage, plus the fixture's"""
+    rng = np.random.default_rng(0)
+    step_counts = {}
+    while len(step_counts) < num_steps:
+        name = f"{rng.choice(VERBS)} {rng.choice(NOUNS)} {len(step_counts)}"
+        step_counts[name] = int(rng.zipf(1.5))
+    for _, names in calls:
+        step_counts.update(dict.fromkeys(names, 1))
+    return step_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=40)
+    args = parser.parse_args()
+
+    calls = load_fixture_calls()
+    step_counts = synthesize_step_counts(args.steps, calls)
+    full_prompt = get_standard_steps_string(list(step_counts))
+    print(f"{len(step_counts)} existing steps, {len(calls)} fixture calls")
+    print(f"{'all steps':<24} prompt {len(full_prompt):8d} chars  recall 1.00")
+
+    recalls, lengths = [], []
+    start = time.perf_counter()
+    for transcript, names in calls:
+        candidates = select_step_candidates(transcript, step_counts, args.limit)
+        lengths.append(len(get_standard_steps_string(candidates)))
+        expected = set(names) - OFFERED_STEP_NAMES
+        if expected:
+            recalls.append(len(expected & set(candidates)) / len(expected))
+    wall = (time.perf_counter() - start) / len(calls)
+    print(
+        f"{f'top {args.limit} candidates':<24} prompt {max(lengths):8d} chars"
+        f"  recall {np.mean(recalls):.2f}  {wall * 1000:.1f} ms per call"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark transcript merging and call metrics on a long call.
+
+Compares lists of TranscriptionWord walked in Python loops, as words used to
+be held, against the array backed WordTimeline.
+
+Usage:
+    python benchmarks/word_timeline.py --words 10000
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+from openai.types.audio import TranscriptionWord
+
+from mixedvoices.processors.call_metrics import (
+    calculate_latency_and_interruptions,
+    calculate_wpm,
+)
+from mixedvoices.processors.timeline import AGENT, WordTimeline
+from mixedvoices.processors.transcriber import create_combined_transcript
+
+
+def synthesize_words(num_words: int):
+    """Alternating turns of 5 to 30 words, with pauses between some words"""
+    rng = np.random.default_rng(0)
+    vocabulary = ["hello", "appointment", "tuesday", "yes", "the", "dental", "a"]
+    user_words, agent_words = [], []
+    time, speaker = 0.0, 0
+    while len(user_words) + len(agent_words) < num_words:
+        for _ in range(rng.integers(5, 30)):
+            duration = rng.uniform(0.1, 0.5)
+            word = TranscriptionWord(
+                word=str(rng.choice(vocabulary)), start=time, end=time + duration
+            )
+            (user_words, agent_words)[speaker].append(word)
+            time += duration + rng.choice([0.05, 0.1, 1.5], p=[0.6, 0.35, 0.05])
+        time += rng.uniform(0.3, 2.0)
+        speaker = 1 - speaker
+    return user_words, agent_words
+
+
+def legacy_combined_transcript(user_words, agent_words):
+    segments, last_speaker = [], None
+    user_index, agent_index = 0, 0
+    while user_index < len(user_words) or agent_index < len(agent_words):
+        user_word = user_words[user_index] if user_index < len(user_words) else None
+        agent_word = (
+            agent_words[agent_index] if agent_index < len(agent_words) else None
+        )
+        if not agent_word or (user_word and user_word.start < agent_word.start):
+            speaker, word = "user", user_word
+            user_index += 1
+        else:
+            speaker, word = "bot", agent_word
+            agent_index += 1
+        if speaker != last_speaker:
+            segments.append([f"{speaker}:"])
+            last_speaker = speaker
+        segments[-1].append(word.word)
+    return "\n".join(f"{i}. {' '.join(s)}" for i, s in enumerate(segments, 1))
+
+
+def legacy_group_utterances(words):
+    utterances = [[words[0]]] if words else []
+    for word in words[1:]:
+        if word.start - utterances[-1][-1].end > 1.0:
+            utterances.append([word])
+        else:
+            utterances[-1].append(word)
+    return utterances
+
+
+def legacy_wpm(words):
+    segments = []
+    for word in words:
+        if segments and word.start - segments[-1][1] < 1.0:
+            segments[-1][1] = word.end
+            segments[-1][2] += 1
+        else:
+            segments.append([word.start, word.end, 1])
+    total_duration = sum(end - start for start, end, _ in segments)
+    return sum(count for _, _, count in segments) / (total_duration / 60)
+
+
+def legacy_latency(user_words, agent_words):
+    user_utterances = legacy_group_utterances(user_words)
+    agent_utterances = legacy_group_utterances(agent_words)
+    latencies, i, j = [], 0, 0
+    while i < len(user_utterances) and j < len(agent_utterances):
+        user_start, user_end = user_utterances[i][0].start, user_utterances[i][-1].end
+        asst_start, asst_end = agent_utterances[j][0].start, agent_utterances[j][-1].end
+        if asst_start < user_start < asst_end:
+            i += 1
+        elif user_start < asst_start < user_end:
+            j += 1
+        elif asst_start > user_end:
+            if asst_start - user_end >= 0.2:
+                latencies.append(asst_start - user_end)
+            i += 1
+        else:
+            j += 1
+    return sum(latencies) / len(latencies) if latencies else 0
+
+
+def report(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{name:<40} {seconds * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    user_words, agent_words = synthesize_words(args.words)
+    timeline = WordTimeline.from_words(user_words, agent_words)
+    agent_timeline = timeline.channel(AGENT)
+    assert legacy_combined_transcript(
+        user_words, agent_words
+    ) == create_combined_transcript(timeline)
+    assert np.isclose(legacy_wpm(agent_words), calculate_wpm(agent_timeline))
+    # Latencies aren't compared, the legacy walk measured an agent turn from
+    # every user utterance before it rather than only the last one
+    print(f"{len(timeline)} words")
+
+    def legacy_all():
+        legacy_combined_transcript(user_words, agent_words)
+        legacy_wpm(agent_words)
+        legacy_latency(user_words, agent_words)
+
+    def timeline_all():
+        create_combined_transcript(timeline)
+        calculate_wpm(timeline.channel(AGENT))
+        calculate_latency_and_interruptions(timeline, 3600)
+
+    n = args.number
+    report(
+        "build timeline", lambda: WordTimeline.from_words(user_words, agent_words), n
+    )
+    report(
+        "transcript (lists)",
+        lambda: legacy_combined_transcript(user_words, agent_words),
+        n,
+    )
+    report("transcript (timeline)", lambda: create_combined_transcript(timeline), n)
+    report("wpm (lists)", lambda: legacy_wpm(agent_words), n)
+    report("wpm (timeline)", lambda: calculate_wpm(agent_timeline), n)
+    report("latency (lists)", lambda: legacy_latency(user_words, agent_words), n)
+    report(
+        "latency (timeline)",
+        lambda: calculate_latency_and_interruptions(timeline, 3600),
+        n,
+    )
+    report("all (lists)", legacy_all, n)
+    report("all (timeline)", timeline_all, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from unittest.mock import patch
 import pytest
 
 import mixedvoices as mv
-from mixedvoices.core.utils import create_steps_from_names
+from mixedvoices.core.step_graph import upsert_step_path
 
 if TYPE_CHECKING:
     from mixedvoices.core.recording import Recording  # pragma: no cover
@@ -78,7 +78,7 @@ def mock_process_recording():
             recording.is_successful = True
             recording.success_explanation = "Test success explanation"
         step_names = ["Testing A", "Testing B", "Testing C"]
-        all_steps = create_steps_from_names(step_names, version, recording)
+        all_steps = upsert_step_path(step_names, version, recording)
         recording.step_ids = [step.step_id for step in all_steps]
         recording.summary = "Test summary"
         recording.llm_metrics = {
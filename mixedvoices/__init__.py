@@ -3,6 +3,7 @@ import sys
 
 from mixedvoices import constants, metrics, models
 from mixedvoices.core.project import create_project, load_project
+from mixedvoices.core.sampling import SamplingPolicy as SamplingPolicy
 from mixedvoices.evaluation.agents.base_agent import BaseAgent
 from mixedvoices.evaluation.test_case_generator import TestCaseGenerator
 
@@ -1,5 +1,6 @@
 # mixedvoices/config.py
 import json
+import math
 import os
 from typing import Any, Dict
 
@@ -8,7 +9,31 @@ from mixedvoices.constants import MIXEDVOICES_FOLDER
 # Define available options for specific fields
 # If a field isn't listed here, any value is allowed
 CONFIG_OPTIONS = {
-    "TRANSCRIPTION_MODEL": ["openai/whisper-1", "deepgram/nova-2"],
+    "TRANSCRIPTION_MODEL": [
+        "openai/whisper-1",
+        "deepgram/nova-2",
+        "local/whisper-tiny",
+        "local/whisper-base",
+        "local/whisper-small",
+    ],
+    "MODEL_ROUTING": ["fixed", "adaptive"],
+    "ROUTING_BUDGET": ["cost", "balanced", "quality"],
+    "TRANSCRIPT_CHUNKING": ["off", "auto"],
+    "UPLOAD_ENCODING": ["wav", "flac", "opus"],
+    "TRANSCRIPTION_VAD": ["off", "on"],
+}
+
+# Fields that must hold a positive number of the given type, stored as strings
+# like every other value
+NUMERIC_CONFIG_KEYS = {
+    "ROUTING_TOKEN_THRESHOLD": int,
+    "TRANSCRIPT_CHUNK_TOKENS": int,
+    "REQUEST_TIMEOUT": float,
+    "TASK_DEADLINE": float,
+    "TRANSCRIPTION_WORKERS": int,
+    "LOCAL_TRANSCRIPTION_PROCESSES": int,
+    "CALL_METRIC_PROCESSES": int,
+    "STEPS_CANDIDATE_LIMIT": int,
 }
 
 DEFAULT_CONFIG = {
@@ -19,6 +44,20 @@ DEFAULT_CONFIG = {
     "STEPS_MODEL": "gpt-4o",
     "EVAL_AGENT_MODEL": "gpt-4o",
     "TEST_CASE_GENERATOR_MODEL": "gpt-4o",
+    "MODEL_ROUTING": "fixed",
+    "ROUTING_SMALL_MODEL": "gpt-4o-mini",
+    "ROUTING_TOKEN_THRESHOLD": "3000",
+    "ROUTING_BUDGET": "balanced",
+    "TRANSCRIPT_CHUNKING": "off",
+    "TRANSCRIPT_CHUNK_TOKENS": "8000",
+    "REQUEST_TIMEOUT": "120",
+    "TASK_DEADLINE": "1800",
+    "UPLOAD_ENCODING": "flac",
+    "TRANSCRIPTION_VAD": "off",
+    "TRANSCRIPTION_WORKERS": "4",
+    "LOCAL_TRANSCRIPTION_PROCESSES": "2",
+    "CALL_METRIC_PROCESSES": "2",
+    "STEPS_CANDIDATE_LIMIT": "40",
 }
 
 CONFIG_PATH = os.path.join(MIXEDVOICES_FOLDER, "config.json")
@@ -49,7 +88,7 @@ def save_config(config: Dict[str, Any]):
 def update_value(key: str, new_value: str):
     """Update a specific key's value in the config"""
     config = load_config()
-    if key not in config:
+    if key not in DEFAULT_CONFIG:
         raise ValueError(f"Invalid key name: {key}")
 
     # Validate against allowed options if they exist for this field
@@ -60,6 +99,18 @@ def update_value(key: str, new_value: str):
                 f"Must be one of: {', '.join(CONFIG_OPTIONS[key])}"
             )
 
+    if key in NUMERIC_CONFIG_KEYS:
+        number_type = NUMERIC_CONFIG_KEYS[key]
+        kind = "integer" if number_type is int else "number"
+        try:
+            number = number_type(new_value)
+        except ValueError as e:
+            raise ValueError(
+                f"Invalid value for {key}. Must be a positive {kind}"
+            ) from e
+        if not (math.isfinite(number) and number > 0):
+            raise ValueError(f"Invalid value for {key}. Must be a positive {kind}")
+
     config[key] = new_value
     save_config(config)
 
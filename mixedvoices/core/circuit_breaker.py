@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import aiohttp
+import openai
+import requests
+
+# Consecutive outage errors after which a provider's circuit opens
+FAILURE_THRESHOLD = 3
+BASE_BACKOFF_SECONDS = 5.0
+MAX_BACKOFF_SECONDS = 300.0
+# How often to check again while the trial call of an open circuit is in flight
+TRIAL_POLL_SECONDS = 1.0
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when a provider is down or its circuit is open"""
+
+    def __init__(self, provider: str, message: str):
+        self.provider = provider
+        super().__init__(f"{provider} unavailable: {message}")
+
+
+def is_outage_error(error: BaseException) -> bool:
+    """Whether an error means the provider is down, rather than the request being bad"""
+    # A timed out call may have just run out of the task's deadline
+    if isinstance(
+        error,
+        (
+            TimeoutError,
+            asyncio.TimeoutError,
+            openai.APITimeoutError,
+            requests.exceptions.Timeout,
+        ),
+    ):
+        return False
+    if isinstance(
+        error,
+        (
+            openai.APIConnectionError,
+            openai.InternalServerError,
+            openai.RateLimitError,
+            requests.exceptions.ConnectionError,
+            aiohttp.ClientConnectionError,
+        ),
+    ):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        return response is not None and (
+            response.status_code >= 500 or response.status_code == 429
+        )
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return False
+
+
+def is_provider_down(error: BaseException) -> bool:
+    """Whether a task that raised the error should wait for the provider, not fail"""
+    return isinstance(error, ProviderUnavailableError) or is_outage_error(error)
+
+
+class CircuitBreaker:
+    """Track consecutive outage errors of a provider.
+
+    After FAILURE_THRESHOLD consecutive outage errors the circuit opens and calls
+    are refused until the backoff passes. Then a single trial call is let through,
+    which closes the circuit on success, or reopens it with double the backoff.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.backoff = BASE_BACKOFF_SECONDS
+        self.open_until = 0.0
+        self.is_open = False
+        self.trial_in_flight = False
+
+    def retry_after(self) -> float:
+        """Seconds until calls are let through again, 0 if they are now"""
+        with self._lock:
+            if not self.is_open:
+                return 0.0
+            wait = self.open_until - time.monotonic()
+            if wait <= 0 and self.trial_in_flight:
+                return TRIAL_POLL_SECONDS
+            return max(wait, 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.backoff = BASE_BACKOFF_SECONDS
+            self.is_open = False
+
+    def record_failure(self) -> bool:
+        """Count an outage error, returns whether the circuit is now open"""
+        with self._lock:
+            self.consecutive_failures += 1
+            # A failed trial call after the backoff reopens the circuit right away
+            if self.is_open or self.consecutive_failures >= FAILURE_THRESHOLD:
+                if self.is_open:
+                    self.backoff = min(self.backoff * 2, MAX_BACKOFF_SECONDS)
+                self.is_open = True
+                self.open_until = time.monotonic() + self.backoff
+            return self.is_open
+
+    def _let_through(self) -> bool:
+        """Refuse a call while the circuit is open, returns whether it's the trial call
+
+        Raises:
+            ProviderUnavailableError: If the circuit is open
+        """
+        with self._lock:
+            if not self.is_open:
+                return False
+            wait = self.open_until - time.monotonic()
+            if wait > 0:
+                raise ProviderUnavailableError(
+                    self.provider, f"circuit open, retry in {wait:.0f}s"
+                )
+            if self.trial_in_flight:
+                raise ProviderUnavailableError(
+                    self.provider, "circuit open, trial call in flight"
+                )
+            self.trial_in_flight = True
+            return True
+
+    @contextmanager
+    def guard(self):
+        """Wrap a call to the provider.
+
+        Outage errors that don't open the circuit are raised as they are, so the
+        caller handles them like any other failed call.
+
+        Raises:
+            ProviderUnavailableError: If the circuit is open, or the call failed
+                with the outage error that opened it
+        """
+        is_trial = self._let_through()
+        try:
+            yield
+        except Exception as e:
+            if is_outage_error(e) and self.record_failure():
+                raise ProviderUnavailableError(self.provider, str(e)) from e
+            raise
+        else:
+            self.record_success()
+        finally:
+            if is_trial:
+                with self._lock:
+                    self.trial_in_flight = False
+
+
+BREAKERS: Dict[str, CircuitBreaker] = {
+    "openai": CircuitBreaker("openai"),
+    "deepgram": CircuitBreaker("deepgram"),
+}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    if provider not in BREAKERS:
+        raise KeyError(f"No circuit breaker for provider {provider}")
+    return BREAKERS[provider]
@@ -0,0 +1,156 @@
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+import mixedvoices.constants as constants
+from mixedvoices.core.paths import get_step_path
+from mixedvoices.utils import file_lock, load_json, save_json
+
+
+def get_flow_path(project_id):
+    return os.path.join(constants.PROJECTS_FOLDER, project_id, "flow.json")
+
+
+def new_counts() -> Dict[str, int]:
+    return {"calls": 0, "failed_calls": 0, "terminated_calls": 0}
+
+
+class ProjectFlow:
+    """
+    Steps of all versions of a project merged by their path of names, like
+    Greeting->Booking, with calls, failed calls and terminated calls per version
+    """
+
+    def __init__(
+        self, project_id: str, steps: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        self.project_id = project_id
+        self.steps = steps or {}
+
+    @property
+    def path(self):
+        return get_flow_path(self.project_id)
+
+    def _get_counts(
+        self, path: str, name: str, previous_path: Optional[str], version_id: str
+    ) -> Dict[str, int]:
+        step = self.steps.setdefault(
+            path, {"name": name, "previous_path": previous_path, "versions": {}}
+        )
+        return step["versions"].setdefault(version_id, new_counts())
+
+    def record_call(
+        self, version_id: str, step_names: List[str], is_successful: Optional[bool]
+    ):
+        """Count a call through step_names in the version"""
+        path = None
+        for i, name in enumerate(step_names):
+            previous_path = path
+            path = name if previous_path is None else f"{previous_path}->{name}"
+            counts = self._get_counts(path, name, previous_path, version_id)
+            counts["calls"] += 1
+            if i == len(step_names) - 1:
+                counts["terminated_calls"] += 1
+                if not is_successful:
+                    counts["failed_calls"] += 1
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Steps with their counts per version and in total"""
+        steps = []
+        for path, step in self.steps.items():
+            totals = new_counts()
+            for counts in step["versions"].values():
+                for key, value in counts.items():
+                    totals[key] += value
+            steps.append(
+                {
+                    "path": path,
+                    "name": step["name"],
+                    "previous_path": step["previous_path"],
+                    "number_of_calls": totals["calls"],
+                    "number_of_failed_calls": totals["failed_calls"],
+                    "number_of_terminated_calls": totals["terminated_calls"],
+                    "versions": step["versions"],
+                }
+            )
+        return steps
+
+    def save(self):
+        save_json({"steps": self.steps}, self.path)
+
+    @classmethod
+    def load(cls, project_id: str) -> "ProjectFlow":
+        """Load the project's flow, building it from its versions if missing"""
+        path = get_flow_path(project_id)
+        if not os.path.exists(path):
+            flow = cls.build(project_id)
+            flow.save()
+            return flow
+        return cls(project_id, **load_json(path))
+
+    @classmethod
+    def build(cls, project_id: str) -> "ProjectFlow":
+        """Merge the steps of every version, loading each of them"""
+        from mixedvoices.core.version import Version
+
+        flow = cls(project_id)
+        versions_folder = os.path.join(
+            constants.PROJECTS_FOLDER, project_id, "versions"
+        )
+        for version_id in sorted(os.listdir(versions_folder)):
+            if not os.path.isdir(os.path.join(versions_folder, version_id)):
+                continue
+            version = Version._load(project_id, version_id)
+            step_paths = sorted(
+                ((get_step_path(step), step) for step in version._steps.values()),
+                key=lambda item: item[0].count("->"),
+            )
+            for path, step in step_paths:
+                previous_path = path.rpartition("->")[0] or None
+                counts = flow._get_counts(path, step.name, previous_path, version_id)
+                continued = sum(
+                    next_step.number_of_calls for next_step in step.next_steps
+                )
+                counts["calls"] += step.number_of_calls
+                counts["failed_calls"] += step.number_of_failed_calls
+                counts["terminated_calls"] += step.number_of_calls - continued
+        return flow
+
+
+def _update_flow(project_id: str, update: Callable[[ProjectFlow], None]):
+    with file_lock(f"{get_flow_path(project_id)}.lock"):
+        if os.path.exists(get_flow_path(project_id)):
+            flow = ProjectFlow.load(project_id)
+            update(flow)
+        else:
+            # Built from steps already saved, which include the update
+            flow = ProjectFlow.build(project_id)
+        flow.save()
+
+
+def update_project_flow(
+    project_id: str,
+    version_id: str,
+    step_names: List[str],
+    is_successful: Optional[bool],
+):
+    """Record a call through step_names of the version in the project's flow"""
+    _update_flow(
+        project_id,
+        lambda flow: flow.record_call(version_id, step_names, is_successful),
+    )
+
+
+def update_failed_calls(project_id: str, version_id: str, changes: Dict[str, int]):
+    """Change failed calls of steps of the version, by their path of names"""
+
+    def update(flow: ProjectFlow):
+        for path, change in changes.items():
+            flow.steps[path]["versions"][version_id]["failed_calls"] += change
+
+    _update_flow(project_id, update)
+
+
+def get_project_flow(project_id: str) -> List[Dict[str, Any]]:
+    """Steps of all the project's versions, merged by their path of names"""
+    with file_lock(f"{get_flow_path(project_id)}.lock"):
+        return ProjectFlow.load(project_id).to_list()
@@ -0,0 +1,138 @@
+import heapq
+import os
+from typing import Any, Dict, Iterable, List, Literal, Optional
+
+import mixedvoices.constants as constants
+from mixedvoices.core.step import Step, get_info_path, get_steps_lock_path
+from mixedvoices.utils import file_lock, load_json, save_json
+
+PATH_SORT_KEYS = {
+    "calls": lambda stats: (-stats["calls"], stats["path"]),
+    "failure_rate": lambda stats: (
+        -stats["failure_rate"],
+        -stats["calls"],
+        stats["path"],
+    ),
+}
+
+
+def make_path_stats(path: str, calls: int, failed_calls: int) -> Dict[str, Any]:
+    return {
+        "path": path,
+        "calls": calls,
+        "failed_calls": failed_calls,
+        "failure_rate": failed_calls / calls if calls else 0.0,
+    }
+
+
+def get_path_stats(starting_steps: List[Step]) -> List[Dict[str, Any]]:
+    """
+    Every path from a starting step to a step where calls ended, as "A->B->C",
+    with the calls that took it and how many of those failed. Walks the flow with
+    a stack, so deep flows don't hit the recursion limit.
+    """
+    path_stats = []
+    stack = [(step, step.name) for step in reversed(starting_steps)]
+    while stack:
+        step, path = stack.pop()
+        # Calls that didn't continue to a next step ended here, like hang-ups
+        terminated = step.number_of_calls - sum(
+            next_step.number_of_calls for next_step in step.next_steps
+        )
+        if terminated > 0 or not step.next_steps:
+            # Failed calls are only counted on the step where the call ended
+            path_stats.append(
+                make_path_stats(path, terminated, step.number_of_failed_calls)
+            )
+        stack.extend(
+            (next_step, f"{path}->{next_step.name}")
+            for next_step in reversed(step.next_steps)
+        )
+    return path_stats
+
+
+def get_path_stats_path(project_id, version_id):
+    return os.path.join(
+        constants.PROJECTS_FOLDER, project_id, "versions", version_id, "path_stats.json"
+    )
+
+
+def build_path_stats(project_id: str, version_id: str) -> List[Dict[str, Any]]:
+    """Path stats from the saved steps of a version, without loading its recordings"""
+    steps_path = os.path.join(
+        os.path.dirname(get_path_stats_path(project_id, version_id)), "steps"
+    )
+    steps = {
+        step_id: Step.load(project_id, version_id, step_id)
+        for step_id in os.listdir(steps_path)
+        if os.path.exists(get_info_path(project_id, version_id, step_id))
+    }
+    for step in steps.values():
+        step.next_steps = [steps[step_id] for step_id in step.next_step_ids]
+    return get_path_stats(
+        [step for step in steps.values() if step.previous_step_id is None]
+    )
+
+
+def load_path_stats(project_id: str, version_id: str) -> List[Dict[str, Any]]:
+    """
+    Path stats of a version. They're saved next to its steps, and built again
+    only after the step graph changed, see remove_path_stats.
+    """
+    path = get_path_stats_path(project_id, version_id)
+    try:
+        return load_json(path)["paths"]
+    except FileNotFoundError:
+        pass
+    # Steps can't change while they're read, so saved stats are never stale
+    with file_lock(get_steps_lock_path(project_id, version_id)):
+        path_stats = build_path_stats(project_id, version_id)
+        save_json({"paths": path_stats}, path)
+    return path_stats
+
+
+def remove_path_stats(project_id: str, version_id: str):
+    """Drop saved path stats, called with the steps lock held as steps change"""
+    path = get_path_stats_path(project_id, version_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def get_step_path(step: Step) -> str:
+    """Names of the steps from a starting step to step, like Greeting->Booking"""
+    names = [step.name]
+    while step.previous_step is not None:
+        step = step.previous_step
+        names.append(step.name)
+    return "->".join(reversed(names))
+
+
+def merge_path_stats(
+    path_stats_list: Iterable[List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """Combine path stats of several versions, adding up calls of equal paths"""
+    totals: Dict[str, List[int]] = {}
+    for path_stats in path_stats_list:
+        for stats in path_stats:
+            total = totals.setdefault(stats["path"], [0, 0])
+            total[0] += stats["calls"]
+            total[1] += stats["failed_calls"]
+    return [make_path_stats(path, *total) for path, total in totals.items()]
+
+
+def select_paths(
+    path_stats: List[Dict[str, Any]],
+    top_k: Optional[int] = None,
+    sort_by: Literal["calls", "failure_rate"] = "calls",
+) -> List[Dict[str, Any]]:
+    """
+    The top_k paths with the most calls, or the highest failure rate.
+    All paths, in flow order, if top_k is None.
+    """
+    if sort_by not in PATH_SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {', '.join(PATH_SORT_KEYS)}")
+    if top_k is None:
+        return path_stats
+    if top_k < 1:
+        raise ValueError("top_k must be at least 1")
+    return heapq.nsmallest(top_k, path_stats, key=PATH_SORT_KEYS[sort_by])
@@ -1,11 +1,17 @@
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 from uuid import uuid4
 
 import mixedvoices.constants as constants
+from mixedvoices.core.flow import get_project_flow
+from mixedvoices.core.paths import load_path_stats, merge_path_stats, select_paths
+from mixedvoices.core.sampling import SamplingPolicy
+from mixedvoices.core.step_index import get_step_names
 from mixedvoices.core.version import Version
 from mixedvoices.evaluation.evaluator import Evaluator
+from mixedvoices.metrics.call_metric import CallMetric
 from mixedvoices.metrics.metric import Metric
+from mixedvoices.processors.call_metrics import BUILTIN_CALL_METRICS
 from mixedvoices.utils import load_json, save_json, validate_name
 
 
@@ -60,11 +66,15 @@ class Project:
         success_criteria: Optional[str] = None,
         evals: Optional[Dict[str, Evaluator]] = None,
         _metrics: Optional[Dict[str, Metric]] = None,
+        sampling_policy: Optional[SamplingPolicy] = None,
+        call_metrics: Optional[Dict[str, CallMetric]] = None,
     ):
         self._project_id = project_id
         self._success_criteria = success_criteria
+        self._sampling_policy = sampling_policy or SamplingPolicy()
         self._metrics: Dict[str, Metric] = _metrics or {}
         self._evals: Dict[str, Evaluator] = evals or {}
+        self._call_metrics: Dict[str, CallMetric] = call_metrics or {}
         os.makedirs(os.path.join(self._project_folder, "versions"), exist_ok=True)
         if metrics:
             self.add_metrics(metrics)
@@ -85,7 +95,8 @@ class Project:
     def add_metrics(self, metrics: List[Metric]) -> None:
         """
         Add new metrics to the project.
-        """
+        Recordings already scored can be scored on them using Version.rescore_stale_metrics
+        """  # noqa E501
         metrics = check_metrics_while_adding(metrics, self._metrics)
         for metric in metrics:
             self._metrics[metric.name] = metric
@@ -94,10 +105,11 @@ class Project:
     def update_metric(self, metric: Metric) -> None:
         """
         Update an existing metric.
+        Recordings already scored can be scored again on it using Version.rescore_stale_metrics
 
         Args:
             metric (Metric): The metric to update
-        """
+        """  # noqa E501
         if metric.name not in self._metrics:
             raise KeyError(
                 f"Metric with name '{metric.name}' does not exist in project"
@@ -154,20 +166,87 @@ class Project:
         """Get all metric names."""
         return list(self._metrics.keys())
 
+    # Call Metric Methods
+    @property
+    def call_metrics(self) -> List[CallMetric]:
+        """Get all custom call metrics in the project"""
+        return list(self._call_metrics.values())
+
+    def add_call_metrics(self, call_metrics: List[CallMetric]) -> None:
+        """
+        Add custom call metrics, computed for recordings processed from now on.
+
+        Args:
+            call_metrics (List[CallMetric]): The call metrics to add
+        """
+        if not all(isinstance(metric, CallMetric) for metric in call_metrics):
+            raise TypeError("Call metrics must be a list of CallMetric objects")
+        for metric in call_metrics:
+            # Custom values are stored alongside built-in ones in call_metrics
+            if metric.name in BUILTIN_CALL_METRICS:
+                raise ValueError(
+                    f"Call metric name '{metric.name}' is used by a built-in metric"
+                )
+            if metric.name in self._call_metrics:
+                raise FileExistsError(
+                    f"Call metric with name '{metric.name}' already exists in project"
+                )
+        for metric in call_metrics:
+            self._call_metrics[metric.name] = metric
+        self._save()
+
+    def remove_call_metric(self, call_metric_name: str) -> None:
+        """
+        Remove a custom call metric by name.
+
+        Args:
+            call_metric_name (str): The name of the call metric to remove
+        """
+        if call_metric_name not in self._call_metrics:
+            raise KeyError(
+                f"Call metric with name '{call_metric_name}' does not exist in project"
+            )
+        del self._call_metrics[call_metric_name]
+        self._save()
+
     # Success Criteria Methods
     @property
     def success_criteria(self):
         """Get the success criteria of the project"""
         return self._success_criteria
 
-    def update_success_criteria(self, success_criteria: Optional[str]) -> None:
+    def update_success_criteria(
+        self, success_criteria: Optional[str], rejudge: bool = False
+    ) -> None:
         """Update the success criteria of the project
 
         Args:
             success_criteria (Optional[str]): The new success criteria. If it is None, the success criteria will be removed
-        """
+            rejudge (bool): If True, success of recordings judged against the previous criteria is judged again in the background. Defaults to False.
+        """  # noqa E501
         self._success_criteria = success_criteria
         self._save()
+        if rejudge:
+            for version_id in self.version_ids:
+                self.load_version(version_id).rejudge_success(blocking=False)
+
+    # Sampling Policy Methods
+    @property
+    def sampling_policy(self) -> SamplingPolicy:
+        """Get the policy deciding which recordings get LLM metrics scored"""
+        return self._sampling_policy
+
+    def update_sampling_policy(self, sampling_policy: SamplingPolicy) -> None:
+        """Update the sampling policy of the project.
+        Applies to recordings processed from now on.
+
+        Args:
+            sampling_policy (SamplingPolicy): The new sampling policy
+        """
+        if not isinstance(sampling_policy, SamplingPolicy):
+            raise TypeError("sampling_policy must be a SamplingPolicy object")
+        self._sampling_policy = sampling_policy
+        self._save()
 
     # Version methods
     @property
@@ -215,6 +294,36 @@ class Project:
             raise KeyError(f"Version {version_id} does not exist")
         return Version._load(self.id, version_id)
 
+    def get_path_stats(
+        self,
+        top_k: Optional[int] = None,
+        sort_by: Literal["calls", "failure_rate"] = "calls",
+    ) -> List[Dict[str, Any]]:
+        """
+        Get paths through the conversation flow across all versions, with the calls that took each. Calls of a path found in several versions are added up
+
+        Args:
+            top_k (Optional[int]): Only return this many paths, ranked by sort_by. Defaults to None, for every path.
+            sort_by (str): Rank paths by "calls" or "failure_rate". Defaults to "calls".
+
+        Returns:
+            List[Dict[str, Any]]: path, calls, failed_calls and failure_rate of each path
+        """  # noqa E501
+        # Saved path stats of each version, without loading the versions
+        path_stats = merge_path_stats(
+            load_path_stats(self.id, version_id) for version_id in self.version_ids
+        )
+        return select_paths(path_stats, top_k, sort_by)
+
+    def get_flow(self) -> List[Dict[str, Any]]:
+        """
+        Get the flow of all versions merged, steps are matched by their path of step names from the start of the call
+
+        Returns:
+            List[Dict[str, Any]]: path, name, previous_path and call, failure and termination counts of each step, in total and per version
+        """  # noqa E501
+        return get_project_flow(self.id)
+
     # Evaluator methods
     def create_evaluator(
         self, test_cases: List[str], metric_names: Optional[List[str]] = None
@@ -282,19 +391,15 @@ class Project:
     def _path(self) -> str:
         return get_info_path(self.id)
 
-    def _get_paths(self) -> List[str]:
-        paths = []
-        for version_id in self.version_ids:
-            version = self.load_version(version_id)
-            paths.extend(version._get_paths())
-        return paths
+    def _get_paths(
+        self,
+        top_k: Optional[int] = None,
+        sort_by: Literal["calls", "failure_rate"] = "calls",
+    ) -> List[str]:
+        return [stats["path"] for stats in self.get_path_stats(top_k, sort_by)]
 
     def _get_step_names(self) -> List[str]:
-        step_names = set()
-        for version_id in self.version_ids:
-            version = self.load_version(version_id)
-            step_names.union(version._get_step_names())
-        return list(step_names)
+        return get_step_names(self.id)
 
     def _save(self):
         metrics = {k: v.to_dict() for k, v in self._metrics.items()}
@@ -302,6 +407,8 @@ class Project:
             "success_criteria": self._success_criteria,
             "eval_ids": list(self._evals.keys()),
             "metrics": metrics,
+            "sampling_policy": self._sampling_policy.to_dict(),
+            "call_metrics": {k: v.to_dict() for k, v in self._call_metrics.items()},
         }
         save_json(d, self._path)
 
@@ -325,12 +432,20 @@ class Project:
                 eval_id: Evaluator._load(project_id, eval_id) for eval_id in eval_ids
             }
             success_criteria = d.get("success_criteria", None)
+            sampling_policy = d.get("sampling_policy", None)
+            if sampling_policy is not None:
+                sampling_policy = SamplingPolicy(**sampling_policy)
             evals = {k: v for k, v in evals.items() if v}
+            call_metrics = {
+                k: CallMetric(**v) for k, v in d.get("call_metrics", {}).items()
+            }
             return cls(
                 project_id,
                 success_criteria=success_criteria,
                 evals=evals,
                 _metrics=metrics,
+                sampling_policy=sampling_policy,
+                call_metrics=call_metrics,
             )
         except FileNotFoundError:
             return cls(project_id)
@@ -3,7 +3,9 @@ import time
 from typing import Any, Dict, List, Optional
 
 import mixedvoices.constants as constants
-from mixedvoices.utils import load_json, save_json
+from mixedvoices.processors.audio_quality import AudioQuality, load_windows
+from mixedvoices.processors.timeline import WordTimeline
+from mixedvoices.utils import check_cancelled, load_json, save_json
 
 
 def get_info_path(project_id, version_id, recording_id):
@@ -18,6 +20,13 @@ def get_info_path(project_id, version_id, recording_id):
     )
 
 
+def load_recording(project_id, version_id, recording_id) -> "Recording":
+    """Load a single recording, without loading the rest of its version"""
+    if not os.path.exists(get_info_path(project_id, version_id, recording_id)):
+        raise KeyError(f"Recording {recording_id} not found in version {version_id}")
+    return Recording._load(project_id, version_id, recording_id)
+
+
 class Recording:
     def __init__(
         self,
@@ -37,6 +46,12 @@ class Recording:
         llm_metrics: Optional[Dict[str, Any]] = None,
         call_metrics: Optional[Dict[str, Any]] = None,
         task_status: Optional[str] = None,
+        sampling: Optional[Dict[str, Any]] = None,
+        stage_failures: Optional[Dict[str, str]] = None,
+        processing_stats: Optional[Dict[str, Any]] = None,
+        turn_timing: Optional[Dict[str, List[float]]] = None,
+        llm_metric_hashes: Optional[Dict[str, str]] = None,
+        success_criteria_hash: Optional[str] = None,
     ):
         self._recording_id = recording_id
         self.created_at = created_at or int(time.time())
@@ -54,6 +69,13 @@ class Recording:
         self.llm_metrics = llm_metrics or {}
         self.call_metrics = call_metrics or {}
         self.task_status = task_status or "Processing"
+        self.sampling = sampling
+        self.stage_failures = stage_failures or {}
+        self.processing_stats = processing_stats or {}
+        self.turn_timing = turn_timing or {}
+        # Definition hash of each scored metric, and of the success criteria used
+        self.llm_metric_hashes = llm_metric_hashes or {}
+        self.success_criteria_hash = success_criteria_hash
 
     @property
     def id(self):
@@ -63,11 +85,42 @@ class Recording:
     def _path(self):
         return get_info_path(self.project_id, self.version_id, self.id)
 
+    @property
+    def _timeline_path(self):
+        return os.path.join(os.path.dirname(self._path), "timeline.npz")
+
+    @property
+    def _audio_quality_path(self):
+        return os.path.join(os.path.dirname(self._path), "audio_quality.npz")
+
     def _save(self):
+        check_cancelled()
         os.makedirs(os.path.dirname(self._path), exist_ok=True)
         d = self._to_dict()
         save_json(d, self._path)
 
+    def _save_timeline(self, timeline: WordTimeline):
+        """Keep word timestamps, so call metrics can be recomputed later"""
+        check_cancelled()
+        os.makedirs(os.path.dirname(self._timeline_path), exist_ok=True)
+        timeline.save(self._timeline_path)
+
+    def _load_timeline(self) -> Optional[WordTimeline]:
+        if not os.path.exists(self._timeline_path):
+            return None
+        return WordTimeline.load(self._timeline_path)
+
+    def _save_audio_quality(self, quality: AudioQuality):
+        """Keep the per window audio quality timeline of the call"""
+        check_cancelled()
+        os.makedirs(os.path.dirname(self._audio_quality_path), exist_ok=True)
+        quality.save(self._audio_quality_path)
+
+    def _load_audio_quality(self) -> Optional[dict]:
+        if not os.path.exists(self._audio_quality_path):
+            return None
+        return load_windows(self._audio_quality_path)
+
     @classmethod
     def _load(cls, project_id, version_id, recording_id):
         path = get_info_path(project_id, version_id, recording_id)
@@ -96,4 +149,10 @@ class Recording:
             "task_status": self.task_status,
             "llm_metrics": self.llm_metrics,
             "call_metrics": self.call_metrics,
+            "sampling": self.sampling,
+            "stage_failures": self.stage_failures,
+            "processing_stats": self.processing_stats,
+            "turn_timing": self.turn_timing,
+            "llm_metric_hashes": self.llm_metric_hashes,
+            "success_criteria_hash": self.success_criteria_hash,
         }
@@ -0,0 +1,175 @@
+import hashlib
+import math
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import mixedvoices.constants as constants
+from mixedvoices.utils import file_lock, load_json, save_json
+
+if TYPE_CHECKING:
+    from mixedvoices.core.recording import Recording  # pragma: no cover
+    from mixedvoices.core.version import Version  # pragma: no cover
+
+ALWAYS_STRATUM = "always"
+
+
+@dataclass
+class SamplingPolicy:
+    """Decide which recordings get LLM metrics scored during processing.
+
+    Recordings that aren't sampled are still transcribed, split into steps and
+    checked for success. Their metrics can be scored later using Version.backfill_metrics
+
+    Args:
+        rate (float): Fraction of recordings to score, between 0 and 1. Defaults to 1.
+        always_score_failed (bool): Always score recordings that are not successful. Defaults to True.
+        short_call_seconds (float): Always score recordings shorter than this. Defaults to 0.
+        stratify_by_version (bool): Sample exactly rate of each version's recordings,
+            instead of sampling each recording independently. Defaults to True.
+    """  # noqa E501
+
+    rate: float = 1.0
+    "Fraction of recordings to score."
+    always_score_failed: bool = True
+    "Always score recordings that are not successful."
+    short_call_seconds: float = 0
+    "Always score recordings shorter than this."
+    stratify_by_version: bool = True
+    "Sample exactly rate of each version's recordings."
+
+    def __post_init__(self):
+        if not 0 <= self.rate <= 1:
+            raise ValueError("Sampling rate must be between 0 and 1")
+        if self.short_call_seconds < 0:
+            raise ValueError("short_call_seconds must not be negative")
+
+    def to_dict(self):
+        """Returns a dictionary representation of the sampling policy."""
+        return {
+            "rate": self.rate,
+            "always_score_failed": self.always_score_failed,
+            "short_call_seconds": self.short_call_seconds,
+            "stratify_by_version": self.stratify_by_version,
+        }
+
+
+def hash_fraction(recording_id: str) -> float:
+    """Deterministic pseudo random number in [0, 1) for a recording"""
+    digest = hashlib.md5(recording_id.encode()).hexdigest()
+    return int(digest[:8], 16) / 16**8
+
+
+def get_strata_path(project_id, version_id):
+    return os.path.join(
+        constants.PROJECTS_FOLDER, project_id, "versions", version_id, "strata.json"
+    )
+
+
+def build_strata(project_id: str, version_id: str) -> Dict[str, int]:
+    """Positions claimed in each stratum, from the version's saved recordings"""
+    recordings_path = os.path.join(
+        os.path.dirname(get_strata_path(project_id, version_id)), "recordings"
+    )
+    counts: Dict[str, int] = {}
+    for recording_id in os.listdir(recordings_path):
+        info_path = os.path.join(recordings_path, recording_id, "info.json")
+        if not os.path.exists(info_path):
+            continue
+        sampling = load_json(info_path).get("sampling") or {}
+        if sampling.get("position") is not None:
+            stratum = sampling["stratum"]
+            counts[stratum] = max(counts.get(stratum, 0), sampling["position"] + 1)
+    return counts
+
+
+def claim_position(project_id: str, version_id: str, stratum: str) -> int:
+    """
+    Claim the next position in a stratum. Counts are kept in a file under a lock,
+    so recordings sampled in parallel, each by a task with its own Version, get
+    distinct positions.
+    """
+    path = get_strata_path(project_id, version_id)
+    with file_lock(f"{path}.lock"):
+        if os.path.exists(path):
+            counts = load_json(path)["counts"]
+        else:
+            counts = build_strata(project_id, version_id)
+        position = counts.get(stratum, 0)
+        counts[stratum] = position + 1
+        save_json({"counts": counts}, path)
+    return position
+
+
+def get_sampling_decision(
+    policy: SamplingPolicy, recording: "Recording", version: "Version"
+) -> Dict[str, Any]:
+    """
+    Decide if a recording's LLM metrics should be scored.
+
+    Returns:
+        dict: stratum the recording belongs to and whether it is scored.
+            Recordings of the "always" stratum are scored regardless of rate.
+            Systematically sampled recordings also keep their position in the
+            stratum, so a retried task reuses it instead of claiming another.
+    """
+    if policy.always_score_failed and recording.is_successful is False:
+        return {"stratum": ALWAYS_STRATUM, "scored": True}
+    duration = recording.duration
+    if duration is not None and duration < policy.short_call_seconds:
+        return {"stratum": ALWAYS_STRATUM, "scored": True}
+
+    if not policy.stratify_by_version:
+        return {"stratum": "all", "scored": hash_fraction(recording.id) < policy.rate}
+
+    stratum = f"version:{version.id}"
+    # Every recording or none is scored, whatever its position
+    if policy.rate in (0, 1):
+        return {"stratum": stratum, "scored": policy.rate == 1}
+
+    # Systematic sampling, scores every 1/rate-th recording of the version's stratum
+    previous = recording.sampling or {}
+    if previous.get("stratum") == stratum and previous.get("position") is not None:
+        position = previous["position"]
+    else:
+        position = claim_position(version.project_id, version.id, stratum)
+    scored = math.floor((position + 1) * policy.rate) > math.floor(
+        position * policy.rate
+    )
+    return {"stratum": stratum, "scored": scored, "position": position}
+
+
+def get_sampling_weights(recordings: List[Dict[str, Any]]) -> List[Optional[float]]:
+    """
+    Weights that make averages over scored recordings estimate averages over all.
+
+    Each scored recording stands in for the unscored recordings of its stratum.
+    Recordings processed without a sampling policy have weight 1.
+
+    Args:
+        recordings (List[Dict[str, Any]]): Recordings as dicts with a sampling key
+
+    Returns:
+        List[Optional[float]]: Weight of each recording, None if it wasn't scored
+    """
+    totals: Dict[str, int] = {}
+    scored: Dict[str, int] = {}
+    for recording in recordings:
+        sampling = recording.get("sampling")
+        if not sampling:
+            continue
+        stratum = sampling["stratum"]
+        totals[stratum] = totals.get(stratum, 0) + 1
+        scored[stratum] = scored.get(stratum, 0) + int(sampling["scored"])
+
+    weights: List[Optional[float]] = []
+    for recording in recordings:
+        sampling = recording.get("sampling")
+        if not sampling:
+            weights.append(1.0)
+        elif not sampling["scored"]:
+            weights.append(None)
+        else:
+            stratum = sampling["stratum"]
+            weights.append(totals[stratum] / scored[stratum])
+    return weights
@@ -21,6 +21,13 @@ def get_info_path(project_id, version_id, step_id):
     )
 
 
+def get_steps_lock_path(project_id, version_id):
+    """Lock held while the steps of a version change"""
+    return os.path.join(
+        constants.PROJECTS_FOLDER, project_id, "versions", version_id, "steps.lock"
+    )
+
+
 class Step:
     def __init__(
         self,
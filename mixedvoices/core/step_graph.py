@@ -0,0 +1,122 @@
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from mixedvoices.core.flow import update_failed_calls, update_project_flow
+from mixedvoices.core.paths import get_step_path, remove_path_stats
+from mixedvoices.core.step import Step, get_info_path, get_steps_lock_path
+from mixedvoices.core.step_index import update_step_index
+from mixedvoices.core.step_recordings import update_step_recordings
+from mixedvoices.utils import check_cancelled, file_lock
+
+if TYPE_CHECKING:
+    from mixedvoices.core.recording import Recording  # pragma: no cover
+    from mixedvoices.core.version import Version  # pragma: no cover
+
+
+def get_lock_path(version: "Version") -> str:
+    return get_steps_lock_path(version.project_id, version.id)
+
+
+def _refresh_step(version: "Version", step_id: str) -> Step:
+    """Bring a step of the version up to date with its saved state"""
+    saved = Step.load(version.project_id, version.id, step_id)
+    step = version._steps.get(step_id)
+    if step is None:
+        version._steps[step_id] = saved
+        return saved
+    step.recording_ids = saved.recording_ids
+    step.number_of_terminated_calls = saved.number_of_terminated_calls
+    step.number_of_failed_calls = saved.number_of_failed_calls
+    step.next_step_ids = saved.next_step_ids
+    return step
+
+
+def _get_options(version: "Version", previous_step: Optional[Step]) -> List[Step]:
+    """Saved steps that can follow previous_step, or start a call if it's None"""
+    if previous_step is not None:
+        return [version._steps[step_id] for step_id in previous_step.next_step_ids]
+    for step_id in os.listdir(version._steps_path):
+        if step_id not in version._steps and os.path.exists(
+            get_info_path(version.project_id, version.id, step_id)
+        ):
+            version._steps[step_id] = Step.load(version.project_id, version.id, step_id)
+    return version._starting_steps
+
+
+def upsert_step_path(
+    step_names: List[str], version: "Version", recording: "Recording"
+) -> List[Step]:
+    """
+    Add a recording's path of step names to the version's flow, creating missing steps.
+
+    The merge holds a lock on the version's steps, shared across threads and
+    processes, and works on their saved state, so recordings of the same version
+    processed in parallel, each with its own Version object, don't create
+    duplicate steps or lose counts. It's idempotent: running it again for the
+    same recording, as a retried task does, counts the call only once.
+
+    Args:
+        step_names (List[str]): Names of the steps the recording went through
+        version (Version): Version of the recording, updated to the saved flow
+        recording (Recording): The recording
+
+    Returns:
+        List[Step]: Steps of the path, in order
+    """
+    with file_lock(get_lock_path(version)):
+        check_cancelled()
+        all_steps: List[Step] = []
+        previous_step = None
+        for step_name in step_names:
+            options = _get_options(version, previous_step)
+            step = next((s for s in options if s.name == step_name), None)
+            if step is None:
+                step = Step(step_name, version.id, version.project_id)
+                if previous_step is not None:
+                    step.previous_step_id = previous_step.step_id
+                    previous_step.next_step_ids.append(step.step_id)
+                version._steps[step.step_id] = step
+            else:
+                step = _refresh_step(version, step.step_id)
+                for step_id in step.next_step_ids:
+                    if step_id not in version._steps:
+                        _refresh_step(version, step_id)
+            all_steps.append(step)
+            previous_step = step
+
+        new_call = bool(all_steps) and recording.id not in all_steps[-1].recording_ids
+        for i, step in enumerate(all_steps):
+            if recording.id not in step.recording_ids:
+                is_final_step = i == len(all_steps) - 1
+                step.record_usage(recording, is_final_step, recording.is_successful)
+            step.save()
+            update_step_recordings(
+                version.project_id, version.id, step.step_id, [recording]
+            )
+        if new_call:
+            update_step_index(version.project_id, step_names)
+            update_project_flow(
+                version.project_id, version.id, step_names, recording.is_successful
+            )
+        version._create_flowchart()
+        remove_path_stats(version.project_id, version.id)
+        return all_steps
+
+
+def update_step_failed_calls(version: "Version", changes: Dict[str, int]):
+    """Change failed calls of steps of the version, by step id, and in the project's flow"""  # noqa E501
+    if not changes:
+        return
+    with file_lock(get_lock_path(version)):
+        check_cancelled()
+        for step_id, change in changes.items():
+            step = _refresh_step(version, step_id)
+            step.number_of_failed_calls += change
+            step.save()
+        version._create_flowchart()
+        flow_changes = {
+            get_step_path(version._steps[step_id]): change
+            for step_id, change in changes.items()
+        }
+        update_failed_calls(version.project_id, version.id, flow_changes)
+        remove_path_stats(version.project_id, version.id)
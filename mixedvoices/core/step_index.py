@@ -0,0 +1,90 @@
+import os
+from typing import Dict, Iterable, List, Optional
+
+import mixedvoices.constants as constants
+from mixedvoices.utils import file_lock, load_json, save_json
+
+
+def get_step_index_path(project_id):
+    return os.path.join(constants.PROJECTS_FOLDER, project_id, "step_index.json")
+
+
+class StepIndex:
+    """Step names used across all versions of a project, with calls through each"""
+
+    def __init__(self, project_id: str, step_counts: Optional[Dict[str, int]] = None):
+        self.project_id = project_id
+        self.step_counts = step_counts or {}
+
+    @property
+    def path(self):
+        return get_step_index_path(self.project_id)
+
+    @property
+    def step_names(self) -> List[str]:
+        """Step names, most used first"""
+        return sorted(
+            self.step_counts, key=lambda name: (-self.step_counts[name], name)
+        )
+
+    def record_usage(self, step_names: Iterable[str]):
+        """Count a call through each step, creating entries for new step names"""
+        for step_name in set(step_names):
+            self.step_counts[step_name] = self.step_counts.get(step_name, 0) + 1
+
+    def save(self):
+        save_json({"step_counts": self.step_counts}, self.path)
+
+    @classmethod
+    def load(cls, project_id: str) -> "StepIndex":
+        """Load the project's step index, building it from its versions if missing"""
+        path = get_step_index_path(project_id)
+        if not os.path.exists(path):
+            index = cls.build(project_id)
+            index.save()
+            return index
+        return cls(project_id, **load_json(path))
+
+    @classmethod
+    def build(cls, project_id: str) -> "StepIndex":
+        """Count calls through each step name by loading every version's steps"""
+        from mixedvoices.core.version import Version
+
+        recordings_by_name: Dict[str, set] = {}
+        versions_folder = os.path.join(
+            constants.PROJECTS_FOLDER, project_id, "versions"
+        )
+        for version_id in os.listdir(versions_folder):
+            if not os.path.isdir(os.path.join(versions_folder, version_id)):
+                continue
+            version = Version._load(project_id, version_id)
+            for step in version._steps.values():
+                recordings_by_name.setdefault(step.name, set()).update(
+                    (version_id, recording_id) for recording_id in step.recording_ids
+                )
+        step_counts = {name: len(ids) for name, ids in recordings_by_name.items()}
+        return cls(project_id, step_counts)
+
+
+def update_step_index(project_id: str, step_names: List[str]):
+    """Record a call through step_names in the project's step index"""
+    with file_lock(f"{get_step_index_path(project_id)}.lock"):
+        if os.path.exists(get_step_index_path(project_id)):
+            index = StepIndex.load(project_id)
+            index.record_usage(step_names)
+        else:
+            # Built from steps already saved, which include this call
+            index = StepIndex.build(project_id)
+        index.save()
+
+
+def get_step_counts(project_id: str) -> Dict[str, int]:
+    """Calls through each step name used in the project"""
+    with file_lock(f"{get_step_index_path(project_id)}.lock"):
+        return StepIndex.load(project_id).step_counts
+
+
+def get_step_names(project_id: str) -> List[str]:
+    """Step names used in the project, most used first"""
+    with file_lock(f"{get_step_index_path(project_id)}.lock"):
+        return StepIndex.load(project_id).step_names
@@ -0,0 +1,238 @@
+import json
+import os
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Literal, Optional
+
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.recording import get_info_path as get_recording_info_path
+from mixedvoices.core.step import Step, get_info_path
+from mixedvoices.utils import check_cancelled, file_lock, load_json, save_json
+
+if TYPE_CHECKING:
+    from mixedvoices.core.version import Version  # pragma: no cover
+
+ORDERS = ("asc", "desc")
+
+
+def get_step_recordings_path(project_id, version_id, step_id):
+    return os.path.join(
+        os.path.dirname(get_info_path(project_id, version_id, step_id)),
+        "recordings.jsonl",
+    )
+
+
+def make_row(recording: Recording) -> Dict[str, Any]:
+    """What lists of recordings show, without transcripts or explanations"""
+    return {
+        "id": recording.id,
+        "created_at": recording.created_at,
+        "is_successful": recording.is_successful,
+        "duration": recording.duration,
+        "summary": recording.summary,
+        "task_status": recording.task_status,
+        "llm_metrics": {
+            name: {"score": metric["score"]} if metric else None
+            for name, metric in recording.llm_metrics.items()
+        },
+        "sampling": recording.sampling,
+    }
+
+
+def sort_key(entry: List[Any]):
+    return entry[0], entry[1]
+
+
+class StepRecordings:
+    """
+    Rows of the recordings that reached a step, appended to a JSON Lines file.
+
+    Rows are never rewritten in place, a refreshed recording appends a newer row
+    that supersedes its old one. A small index keeps counts and, oldest first, the
+    offset of each recording's latest row, as [created_at, id, is_successful,
+    offset, length]. It takes in rows appended since only when a page is read, so
+    an ingest just appends a row, and a page read loads only the rows it returns.
+    """
+
+    def __init__(self, project_id: str, version_id: str, step_id: str):
+        self.project_id = project_id
+        self.version_id = version_id
+        self.step_id = step_id
+        self.index: Dict[str, Any] = {"size": 0, "successful": 0, "entries": []}
+
+    @property
+    def path(self):
+        return get_step_recordings_path(self.project_id, self.version_id, self.step_id)
+
+    @property
+    def index_path(self):
+        return os.path.join(os.path.dirname(self.path), "recordings_index.json")
+
+    def append(self, recordings: Iterable[Recording]):
+        """Append rows of recordings, superseding the rows they already have"""
+        lines = "".join(f"{json.dumps(make_row(r))}\n" for r in recordings)
+        with open(self.path, "a") as f:
+            f.write(lines)
+
+    def update_index(self):
+        """Take in rows appended since the index was saved"""
+        size = os.path.getsize(self.path)
+        if size < self.index["size"]:
+            # Compacted without its index saved, so take in every row again
+            self.index = {"size": 0, "successful": 0, "entries": []}
+        if size == self.index["size"]:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.index["size"])
+            data = f.read()
+        # A row still being appended is taken in on the next read
+        data = data[: data.rfind(b"\n") + 1]
+        entries = {entry[1]: entry for entry in self.index["entries"]}
+        offset = self.index["size"]
+        for line in data.splitlines(keepends=True):
+            row = json.loads(line)
+            entries[row["id"]] = [
+                row["created_at"],
+                row["id"],
+                bool(row["is_successful"]),
+                offset,
+                len(line),
+            ]
+            offset += len(line)
+        self.index["entries"] = sorted(entries.values(), key=sort_key)
+        self.index["size"] = offset
+        self.index["successful"] = sum(entry[2] for entry in entries.values())
+        # Superseded rows are dropped once they outgrow the rows still read
+        if offset > 2 * sum(entry[4] for entry in entries.values()):
+            self.compact()
+        save_json(self.index, self.index_path)
+
+    def compact(self):
+        """Rewrite the file with only the latest row of each recording"""
+        temp_path = f"{self.path}.tmp"
+        offset = 0
+        with open(self.path, "rb") as f, open(temp_path, "wb") as out:
+            for entry in self.index["entries"]:
+                f.seek(entry[3])
+                out.write(f.read(entry[4]))
+                entry[3] = offset
+                offset += entry[4]
+        os.replace(temp_path, self.path)
+        self.index["size"] = offset
+
+    def read_rows(self, entries: List[List[Any]]) -> List[Dict[str, Any]]:
+        with open(self.path, "rb") as f:
+            rows = []
+            for entry in entries:
+                f.seek(entry[3])
+                rows.append(json.loads(f.read(entry[4])))
+        return rows
+
+    def select(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        is_successful: Optional[bool] = None,
+        order: Literal["asc", "desc"] = "desc",
+    ) -> Dict[str, Any]:
+        """A page of rows, see get_step_recordings"""
+        if order not in ORDERS:
+            raise ValueError(f"order must be one of {', '.join(ORDERS)}")
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        entries = self.index["entries"]
+        total, successful = len(entries), self.index["successful"]
+        ordered = iter(entries) if order == "asc" else reversed(entries)
+        if is_successful is not None:
+            ordered = (entry for entry in ordered if entry[2] == is_successful)
+            total = successful if is_successful else total - successful
+            successful = successful if is_successful else 0
+        page = list(islice(ordered, offset, offset + limit))
+        return {
+            "recordings": self.read_rows(page),
+            "total": total,
+            "successful": successful,
+        }
+
+    @classmethod
+    def load(cls, project_id: str, version_id: str, step_id: str) -> "StepRecordings":
+        """Load the step's index, building rows from its recordings if missing"""
+        step_recordings = cls(project_id, version_id, step_id)
+        if not os.path.exists(step_recordings.path):
+            step_recordings.build()
+        elif os.path.exists(step_recordings.index_path):
+            step_recordings.index = load_json(step_recordings.index_path)
+        return step_recordings
+
+    def build(self):
+        """Append rows by loading only the recordings of the step"""
+        step = Step.load(self.project_id, self.version_id, self.step_id)
+        self.append(
+            Recording._load(self.project_id, self.version_id, recording_id)
+            for recording_id in step.recording_ids
+            if os.path.exists(
+                get_recording_info_path(self.project_id, self.version_id, recording_id)
+            )
+        )
+
+
+def update_step_recordings(
+    project_id: str, version_id: str, step_id: str, recordings: List[Recording]
+):
+    """Add or refresh rows of recordings that reached the step"""
+    path = get_step_recordings_path(project_id, version_id, step_id)
+    with file_lock(f"{path}.lock"):
+        check_cancelled()
+        step_recordings = StepRecordings(project_id, version_id, step_id)
+        if not os.path.exists(path):
+            step_recordings.build()
+        step_recordings.append(recordings)
+
+
+def refresh_recording_rows(version: "Version", recordings: Iterable[Recording]):
+    """Refresh rows of recordings in every step they reached, after they changed"""
+    recordings_by_step: Dict[str, List[Recording]] = {}
+    for recording in recordings:
+        for step_id in recording.step_ids or []:
+            recordings_by_step.setdefault(step_id, []).append(recording)
+    for step_id, step_recordings in recordings_by_step.items():
+        update_step_recordings(version.project_id, version.id, step_id, step_recordings)
+
+
+def get_step_recordings(
+    project_id: str,
+    version_id: str,
+    step_id: str,
+    offset: int = 0,
+    limit: int = 50,
+    is_successful: Optional[bool] = None,
+    order: Literal["asc", "desc"] = "desc",
+) -> Dict[str, Any]:
+    """
+    A page of the recordings that reached a step, as lightweight rows, without
+    loading the version. Unjudged recordings count as failed, like the step's
+    failed calls.
+
+    Args:
+        project_id (str): The project
+        version_id (str): The version
+        step_id (str): The step
+        offset (int): Rows to skip. Defaults to 0.
+        limit (int): Maximum number of rows. Defaults to 50.
+        is_successful (Optional[bool]): Only successful, or only failed recordings.
+            Defaults to None, for all.
+        order (str): "desc" for newest first, "asc" for oldest. Defaults to "desc".
+
+    Returns:
+        Dict[str, Any]: The rows under "recordings", how many recordings match
+            under "total" and how many of those are successful under "successful"
+    """
+    if not os.path.exists(get_info_path(project_id, version_id, step_id)):
+        raise KeyError(f"Step {step_id} not found in version {version_id}")
+    path = get_step_recordings_path(project_id, version_id, step_id)
+    # Held while rows are read, as taking in new rows may compact the file
+    with file_lock(f"{path}.lock"):
+        step_recordings = StepRecordings.load(project_id, version_id, step_id)
+        step_recordings.update_index()
+        return step_recordings.select(offset, limit, is_successful, order)
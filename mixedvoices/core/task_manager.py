@@ -1,3 +1,4 @@
+import contextvars
 import logging
 import os
 import threading
@@ -5,11 +6,25 @@ import time
 from dataclasses import dataclass
 from enum import Enum
 from queue import Empty, Queue
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from uuid import uuid4
 
 import mixedvoices.constants as constants
-from mixedvoices.utils import load_json, save_json
+from mixedvoices import models
+from mixedvoices.core.circuit_breaker import get_breaker, is_provider_down
+from mixedvoices.utils import cancellable, deadline, load_json, save_json
+
+if TYPE_CHECKING:
+    from mixedvoices.core.version import Version  # pragma: no cover
+
+# Seconds past its deadline after which a task is considered stuck
+WATCHDOG_GRACE_SECONDS = 60
+# Times a task that got stuck is started before it's failed, outages don't count
+MAX_TASK_ATTEMPTS = 3
+# Tasks run on a list of a version's recordings
+VERSION_TASK_TYPES = ("rescore_recordings", "recompute_call_metrics", "rejudge_success")
+# Recordings per task of a version, so each task finishes well within TASK_DEADLINE
+VERSION_TASK_BATCH_SIZE = 50
 
 
 class TaskStatus(Enum):
@@ -29,6 +44,8 @@ class Task:
     started_at: Optional[float] = None
     completed_at: Optional[float] = None
     error: Optional[str] = None
+    attempts: int = 0
+    progress: Optional[Dict[str, int]] = None
 
     def to_dict(self):
         return {
@@ -40,9 +57,18 @@ class Task:
             "started_at": self.started_at,
             "completed_at": self.completed_at,
             "error": self.error,
+            "attempts": self.attempts,
+            "progress": self.progress,
         }
 
 
+# Task being run in the current context, threads started with submit_with_context
+# inherit it, so they can report the task's progress
+_CURRENT_TASK: "contextvars.ContextVar[Optional[Task]]" = contextvars.ContextVar(
+    "current_task", default=None
+)
+
+
 class TaskManager:
     _instance = None
     _lock = threading.Lock()
@@ -65,6 +91,10 @@ class TaskManager:
         self.processing_thread = None
         self.monitor_thread = None
         self.is_processing = False
+        self.current_task_id: Optional[str] = None
+        self._watchdog_lock = threading.Lock()
+        # Set to abandon the running task, so its thread stops before writing
+        self._cancel_current: Optional[threading.Event] = None
 
         self.tasks_root = os.path.join(constants.MIXEDVOICES_FOLDER, "_tasks")
         self.create_folders()
@@ -101,8 +131,48 @@ class TaskManager:
                     status_printed = True
                 elif self.task_queue.qsize() == 0 and not self.is_processing:
                     break
+            self._check_stuck_task()
             time.sleep(0.5)
 
+    def _check_stuck_task(self):
+        """Requeue the running task if it is stuck well past its deadline.
+
+        The stuck processing thread is abandoned and a new thread takes over the
+        queue. The abandoned thread is cancelled, it raises TaskCancelledError at
+        its next provider call or write, so it can't overwrite the retry's work.
+        """
+        if not models.TASK_DEADLINE:
+            return
+        with self._watchdog_lock:
+            task = self.tasks.get(self.current_task_id or "")
+            if (
+                task is None
+                or task.status != TaskStatus.IN_PROGRESS
+                or task.started_at is None
+                or time.time() - task.started_at
+                < models.TASK_DEADLINE + WATCHDOG_GRACE_SECONDS
+            ):
+                return
+
+            logging.error(f"Task {task.task_id} is stuck past its deadline")
+            if self._cancel_current is not None:
+                self._cancel_current.set()
+                self._cancel_current = None
+            self.current_task_id = None
+            self.processing_thread = None
+            self.is_processing = False
+            self.task_queue.task_done()
+            if task.attempts >= MAX_TASK_ATTEMPTS:
+                task.status = TaskStatus.FAILED
+                task.error = f"Task stuck past its deadline {task.attempts} times"
+                task.completed_at = time.time()
+            else:
+                task.status = TaskStatus.PENDING
+                task.started_at = None
+                self.task_queue.put(task.task_id)
+            self._save_task(task)
+        self._start_processing_thread()
+
     def _start_monitor_thread(self):
         if self.monitor_thread is None or not self.monitor_thread.is_alive():
             self.monitor_thread = threading.Thread(
@@ -134,17 +204,34 @@ class TaskManager:
                 },
                 "user_channel": params["user_channel"],
             }
+        elif task_type in VERSION_TASK_TYPES:
+            version = params["version"]
+            return {
+                "version_data": {
+                    "version_id": version.id,
+                    "project_id": version.project_id,
+                },
+                "recording_ids": params["recording_ids"],
+            }
         return params
 
     def _deserialize_task_params(
         self, task_type: str, params: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Convert serialized parameters back into required objects."""
-        if task_type != "process_recording":
-            return params
         from mixedvoices.core.recording import Recording
         from mixedvoices.core.version import Version
 
+        if task_type in VERSION_TASK_TYPES:
+            version_data = params["version_data"]
+            version = Version._load(
+                project_id=version_data["project_id"],
+                version_id=version_data["version_id"],
+            )
+            return {"version": version, "recording_ids": params["recording_ids"]}
+        elif task_type != "process_recording":
+            return params
+
         recording_data = params["recording_data"]
         version_data = params["version_data"]
         user_channel = params["user_channel"]
@@ -228,6 +315,8 @@ class TaskManager:
                 started_at=task_data.get("started_at"),
                 completed_at=task_data.get("completed_at"),
                 error=task_data.get("error"),
+                attempts=task_data.get("attempts", 0),
+                progress=task_data.get("progress"),
             )
         except Exception as e:
             logging.error(f"Error loading task {filename}: {str(e)}")
@@ -241,10 +330,54 @@ class TaskManager:
             )
             self.processing_thread.start()
 
+    def _owns_queue(self) -> bool:
+        """Whether the current thread is the processing thread, not an abandoned one"""
+        return self.processing_thread is threading.current_thread()
+
+    def _get_required_providers(self, task_type: str) -> List[str]:
+        if task_type == "recompute_call_metrics":
+            return []  # Runs locally
+        providers = ["openai"]
+        if (
+            task_type == "process_recording"
+            and models.TRANSCRIPTION_MODEL == "deepgram/nova-2"
+        ):
+            providers.append("deepgram")
+        return providers
+
+    def _wait_for_providers(self, task_type: str):
+        """Block until the circuits of all providers the task needs let calls through"""
+        breakers = [get_breaker(p) for p in self._get_required_providers(task_type)]
+        while self._owns_queue():
+            wait = max((breaker.retry_after() for breaker in breakers), default=0)
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 1.0))
+
+    def _run_task(self, task: Task):
+        from mixedvoices.core import utils
+
+        deserialized_params = self._deserialize_task_params(task.task_type, task.params)
+        token = _CURRENT_TASK.set(task)
+        try:
+            with deadline(models.TASK_DEADLINE):
+                if task.task_type == "process_recording":
+                    utils.process_recording(**deserialized_params)
+                elif task.task_type == "rescore_recordings":
+                    utils.rescore_recordings(**deserialized_params)
+                elif task.task_type == "recompute_call_metrics":
+                    utils.recompute_call_metrics(**deserialized_params)
+                elif task.task_type == "rejudge_success":
+                    utils.rejudge_success(**deserialized_params)
+                else:
+                    raise ValueError(f"Unknown task type {task.task_type}")
+        finally:
+            _CURRENT_TASK.reset(token)
+
     def _process_queue(self):
         main_thread = threading.main_thread()
 
-        while not (
+        while self._owns_queue() and not (
             not main_thread.is_alive()
             and self.task_queue.empty()
             and not self.is_processing
@@ -263,25 +396,51 @@ class TaskManager:
                     self.is_processing = False
                     continue
 
-                try:
-                    task.status = TaskStatus.IN_PROGRESS
-                    task.started_at = time.time()
-                    self._save_task(task)
-
-                    if task.task_type == "process_recording":
-                        from mixedvoices.core import utils
+                with self._watchdog_lock:
+                    self.current_task_id = task_id
+                    task.attempts += 1
+
+                while True:
+                    # Dequeueing pauses while a provider the task needs is down
+                    self._wait_for_providers(task.task_type)
+                    cancelled = threading.Event()
+                    with self._watchdog_lock:
+                        if not self._owns_queue():
+                            return
+                        task.status = TaskStatus.IN_PROGRESS
+                        task.started_at = time.time()
+                        self._cancel_current = cancelled
+                        self._save_task(task)
+
+                    status, error = TaskStatus.COMPLETED, None
+                    try:
+                        with cancellable(cancelled):
+                            self._run_task(task)
+                    except Exception as e:
+                        if not is_provider_down(e):
+                            status, error = TaskStatus.FAILED, str(e)
+                            logging.error(f"Task {task_id} failed: {str(e)}")
+                            break
+                        # Requeued until the provider is back, however long it's down
+                        logging.warning(f"Task {task_id} paused: {str(e)}")
+                        with self._watchdog_lock:
+                            if not self._owns_queue():
+                                return
+                            task.status = TaskStatus.PENDING
+                            task.started_at = None
+                            self._save_task(task)
+                        continue
+                    break
 
-                        deserialized_params = self._deserialize_task_params(
-                            task.task_type, task.params
-                        )
-                        utils.process_recording(**deserialized_params)
-                        task.status = TaskStatus.COMPLETED
+                with self._watchdog_lock:
+                    # The watchdog has already requeued the task of an abandoned thread
+                    if not self._owns_queue():
+                        return
+                    task.status = status
+                    task.error = error
+                    if status == TaskStatus.COMPLETED:
                         task.completed_at = time.time()
-                except Exception as e:
-                    task.status = TaskStatus.FAILED
-                    task.error = str(e)
-                    logging.error(f"Task {task_id} failed: {str(e)}")
-                finally:
+                    self.current_task_id = None
                     self._save_task(task)
                     self.task_queue.task_done()
                     self.is_processing = False
@@ -309,9 +468,32 @@ class TaskManager:
         self.task_queue.put(task_id)
         return task_id
 
+    def add_version_tasks(
+        self, task_type: str, version: "Version", recording_ids: List[str]
+    ) -> List[str]:
+        """Add a task per batch of a version's recordings, returns their ids"""
+        return [
+            self.add_task(
+                task_type,
+                version=version,
+                recording_ids=recording_ids[i : i + VERSION_TASK_BATCH_SIZE],
+            )
+            for i in range(0, len(recording_ids), VERSION_TASK_BATCH_SIZE)
+        ]
+
     def get_task(self, task_id: str) -> Optional[Task]:
         return self.tasks.get(task_id)
 
+    def report_progress(self, done: int, total: int):
+        """Record progress of the task running in the current context, if any"""
+        task = _CURRENT_TASK.get()
+        if task is None:
+            return
+        with self._watchdog_lock:
+            task.progress = {"done": done, "total": total}
+            if task.status == TaskStatus.IN_PROGRESS:
+                self._save_task(task)
+
     def get_pending_task_count(self) -> int:
         """Get the number of pending and in-progress tasks."""
         return self.task_queue.unfinished_tasks
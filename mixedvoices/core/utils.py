@@ -1,142 +1,317 @@
-import os
+import threading
 from concurrent import futures  # Preload this to avoid shutdown issues  # noqa: F401
-from typing import TYPE_CHECKING, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 import joblib  # Preload joblib as well # noqa: F401
-import librosa
-import numpy as np
-import soundfile as sf
 
 from mixedvoices import models
-from mixedvoices.core.step import Step
-from mixedvoices.processors.call_metrics import get_call_metrics
+from mixedvoices.core.circuit_breaker import is_provider_down
+from mixedvoices.core.sampling import get_sampling_decision
+from mixedvoices.core.step_graph import update_step_failed_calls, upsert_step_path
+from mixedvoices.core.step_index import get_step_counts
+from mixedvoices.core.step_recordings import refresh_recording_rows
+from mixedvoices.core.task_manager import TASK_MANAGER
+from mixedvoices.metrics.metric import Metric
+from mixedvoices.processors.audio import AudioBuffer, probe_audio
+from mixedvoices.processors.audio_quality import analyze_audio_quality
+from mixedvoices.processors.call_metrics import (
+    analyze_turns,
+    get_call_metrics,
+    get_timing_metrics,
+)
+from mixedvoices.processors.custom_call_metrics import run_custom_call_metrics
 from mixedvoices.processors.llm_metrics import generate_scores
+from mixedvoices.processors.local_transcriber import transcribe_and_combine_local
+from mixedvoices.processors.step_candidates import select_step_candidates
 from mixedvoices.processors.steps import script_to_step_names
 from mixedvoices.processors.success import get_success
 from mixedvoices.processors.summary import summarize_transcript
 from mixedvoices.processors.transcriber import (
+    UploadStats,
     transcribe_and_combine_deepgram,
     transcribe_and_combine_openai,
 )
+from mixedvoices.utils import hash_text, is_timeout_error, submit_with_context
 
 if TYPE_CHECKING:
     from mixedvoices.core.recording import Recording  # pragma: no cover
     from mixedvoices.core.version import Version  # pragma: no cover
 
+# Recordings rescored or judged at a time
+RESCORE_WORKERS = 4
+
 
-def separate_channels(y: np.ndarray, sr: int, output_folder: str, user_channel="left"):
+def get_transcript_and_duration(
+    audio_path,
+    user_channel="left",
+    audio: Optional[AudioBuffer] = None,
+    stats: Optional[UploadStats] = None,
+):
     """
-    Separate stereo audio file into channels and save them as individual files.
+    Transcribe a stereo recording.
 
-    Parameters:
-        y (numpy.ndarray): Audio data
-        sr (int): Sample rate
-        output_folder (str): Path to output folder
+    Args:
+        audio_path (str): Path to the stereo audio file
         user_channel (str): Channel containing user audio ("left" or "right")
+        audio (Optional[AudioBuffer]): Already decoded audio of audio_path, it's
+            decoded here only if transcription needs samples. Defaults to None.
+        stats (Optional[UploadStats]): Upload stats of the recording, to add
+            uploads to transcription providers to. Defaults to None.
 
     Returns:
-        tuple: Paths to the saved channel files and audio duration
+        tuple: Combined transcript, WordTimeline of the call, and duration
     """
-    left_channel, right_channel = y[0], y[1]
-
-    user_filename = "user.wav"
-    agent_filename = "agent.wav"
-    user_path = os.path.join(output_folder, user_filename)
-    agent_path = os.path.join(output_folder, agent_filename)
-    if user_channel == "left":
-        sf.write(user_path, left_channel, sr)
-        sf.write(agent_path, right_channel, sr)
-    else:
-        sf.write(user_path, right_channel, sr)
-        sf.write(agent_path, left_channel, sr)
-    return user_path, agent_path
-
-
-def get_transcript_and_duration(audio_path, output_folder, user_channel="left"):
-    y, sr = librosa.load(audio_path, mono=False)
-    duration = librosa.get_duration(y=y, sr=sr)
     if user_channel not in {"left", "right"}:
         raise ValueError('user_channel must be either "left" or "right"')
-    if len(y.shape) != 2 or y.shape[0] != 2:
+    audio_info = probe_audio(audio_path) if audio is None else audio
+    if audio_info.channels != 2:
         raise ValueError("Input must be a stereo audio file")
+    duration = audio_info.duration
 
     if models.TRANSCRIPTION_MODEL == "openai/whisper-1":
-        user_audio_path, agent_audio_path = separate_channels(
-            y, sr, output_folder, user_channel
-        )
-        combined_transcript, user_words, agent_words = transcribe_and_combine_openai(
-            user_audio_path, agent_audio_path
+        # Only the OpenAI path needs samples, to upload each channel separately
+        audio = audio or AudioBuffer.from_file(audio_path)
+        combined_transcript, timeline = transcribe_and_combine_openai(
+            audio, user_channel, stats
         )
     elif models.TRANSCRIPTION_MODEL == "deepgram/nova-2":
-        combined_transcript, user_words, agent_words = transcribe_and_combine_deepgram(
-            audio_path, user_channel
+        combined_transcript, timeline = transcribe_and_combine_deepgram(
+            audio_path, user_channel, audio, stats
         )
-    return combined_transcript, user_words, agent_words, duration
-
-
-def create_steps_from_names(
-    step_names: List[str], version: "Version", recording: "Recording"
-) -> List[Step]:
-    all_steps: List[Step] = []
-    step_options = version._starting_steps
-    previous_step = None
-    for i, step_name in enumerate(step_names):
-        is_final_step = i == len(step_names) - 1
-        step_option_names = [step.name for step in step_options]
-        if step_name in step_option_names:
-            step_index = step_option_names.index(step_name)
-            step = step_options[step_index]
-        else:
-            step = Step(step_name, version.id, version.project_id)
-            if previous_step is not None:
-                step.previous_step_id = previous_step.step_id
-                step.previous_step = previous_step
-                previous_step.next_step_ids.append(step.step_id)
-                previous_step.next_steps.append(step)
-            version._steps[step.step_id] = step
-        all_steps.append(step)
-        step.record_usage(recording, is_final_step, recording.is_successful)
-        step_options = step.next_steps
-        previous_step = step
-    for step in all_steps:
-        step.save()
-    return all_steps
+    elif models.TRANSCRIPTION_MODEL.startswith("local/"):
+        audio = audio or AudioBuffer.from_file(audio_path)
+        combined_transcript, timeline = transcribe_and_combine_local(
+            audio, user_channel
+        )
+    return combined_transcript, timeline, duration
 
 
 def process_recording(recording: "Recording", version: "Version", user_channel="left"):
+    # Stage being run, recorded on the recording if it times out
+    stage = "transcription"
     try:
         audio_path = recording.audio_path
-        output_folder = os.path.join(version._recordings_path, recording.id)
-        combined_transcript, user_words, agent_words, duration = (
-            get_transcript_and_duration(audio_path, output_folder, user_channel)
+        # Decoded once, shared by every stage that needs samples
+        audio = AudioBuffer.from_file(audio_path)
+        upload_stats = UploadStats(models.UPLOAD_ENCODING)
+        combined_transcript, timeline, duration = get_transcript_and_duration(
+            audio_path, user_channel, audio, upload_stats
         )
+        recording.processing_stats = upload_stats.to_dict()
+        recording._save_timeline(timeline)
         recording.combined_transcript = (
             recording.combined_transcript or combined_transcript
         )
         if version._project._success_criteria and recording.is_successful is None:
+            stage = "success"
             response = get_success(
                 combined_transcript, version._project._success_criteria
             )
             recording.is_successful = response["success"]
             recording.success_explanation = response["explanation"]
-        existing_step_names = version._project._get_step_names()
+            recording.success_criteria_hash = hash_text(
+                version._project._success_criteria
+            )
+        stage = "steps"
+        existing_step_names = select_step_candidates(
+            combined_transcript,
+            get_step_counts(version.project_id),
+            models.STEPS_CANDIDATE_LIMIT,
+        )
         step_names = script_to_step_names(combined_transcript, existing_step_names)
-        all_steps = create_steps_from_names(step_names, version, recording)
-        recording.step_ids = [step.step_id for step in all_steps]
         recording.duration = duration
+        stage = "summary"
         recording.summary = recording.summary or summarize_transcript(
             combined_transcript
         )
-        recording.llm_metrics = generate_scores(
-            combined_transcript, version._prompt, version._project.metrics
+        recording.sampling = get_sampling_decision(
+            version._project.sampling_policy, recording, version
         )
+        # Saved right away, so a retried task reuses the position it claimed
+        recording._save()
+        if recording.sampling["scored"]:
+            stage = "llm_metrics"
+            recording.llm_metrics = generate_scores(
+                combined_transcript, version._prompt, version._project.metrics
+            )
+            recording.llm_metric_hashes = {
+                metric.name: metric.definition_hash
+                for metric in version._project.metrics
+            }
+        # Steps are only updated once all provider calls succeeded, so a task
+        # retried after a provider outage doesn't record its path twice
+        all_steps = upsert_step_path(step_names, version, recording)
+        recording.step_ids = [step.step_id for step in all_steps]
+        stage = "call_metrics"
+        quality = analyze_audio_quality(audio, user_channel)
+        recording._save_audio_quality(quality)
+        turns = analyze_turns(timeline)
+        recording.turn_timing = turns.to_dict()
         recording.call_metrics = get_call_metrics(
-            audio_path, user_words, agent_words, duration, user_channel
+            audio, timeline, duration, user_channel, quality, turns
         )
+        if version._project.call_metrics:
+            custom_metrics, failures = run_custom_call_metrics(
+                version._project.call_metrics, audio, timeline, user_channel
+            )
+            recording.call_metrics.update(custom_metrics)
+            for name, error in failures.items():
+                recording.stage_failures[f"call_metric:{name}"] = error
         recording.task_status = "COMPLETED"
         recording._save()
+        refresh_recording_rows(version, [recording])
 
     except Exception as e:
+        if is_provider_down(e):
+            # Still processing, the task manager retries once the provider is back
+            raise
+        if is_timeout_error(e):
+            recording.stage_failures[stage] = f"Timed out: {e}"
         recording.task_status = "FAILED"
         recording._save()
+        refresh_recording_rows(version, [recording])
         raise e
+
+
+def get_stale_metrics(recording: "Recording", metrics: List[Metric]) -> List[Metric]:
+    """
+    Metrics the recording hasn't been scored on, or whose definition changed since.
+    Recordings scored before definition hashes were kept are stale on every metric.
+    """
+    return [
+        metric
+        for metric in metrics
+        if recording.llm_metric_hashes.get(metric.name) != metric.definition_hash
+    ]
+
+
+def has_real_score(llm_metrics: Dict[str, Any]) -> bool:
+    """Whether any metric got a score, rather than N/A or a failed analysis"""
+    return any(metric and metric["score"] != "N/A" for metric in llm_metrics.values())
+
+
+def run_on_recordings(
+    func: Callable[["Recording"], Any], recordings: List["Recording"]
+):
+    """
+    Apply func to recordings in parallel threads, reporting progress of the
+    running task as each one finishes. Raises the first error, once all finish.
+    """
+    if not recordings:
+        return
+    TASK_MANAGER.report_progress(0, len(recordings))
+    with ThreadPoolExecutor(
+        max_workers=min(RESCORE_WORKERS, len(recordings)),
+        thread_name_prefix="Rescore",
+    ) as executor:
+        futures = [
+            submit_with_context(executor, func, recording) for recording in recordings
+        ]
+        for done, _ in enumerate(as_completed(futures), 1):
+            TASK_MANAGER.report_progress(done, len(recordings))
+    for future in futures:
+        future.result()
+
+
+def rescore_recordings(version: "Version", recording_ids: List[str]):
+    """Score LLM metrics of recordings that are missing or stale, from their stored transcripts"""  # noqa E501
+    metrics = version._project.metrics
+
+    def rescore(recording: "Recording"):
+        if not recording.combined_transcript:
+            return
+        stale_metrics = get_stale_metrics(recording, metrics)
+        if stale_metrics:
+            recording.llm_metrics.update(
+                generate_scores(
+                    recording.combined_transcript, version._prompt, stale_metrics
+                )
+            )
+            recording.llm_metric_hashes.update(
+                {metric.name: metric.definition_hash for metric in stale_metrics}
+            )
+        if recording.sampling and has_real_score(recording.llm_metrics):
+            recording.sampling["scored"] = True
+        recording._save()
+
+    recordings = [version.get_recording(recording_id) for recording_id in recording_ids]
+    try:
+        run_on_recordings(rescore, recordings)
+    finally:
+        refresh_recording_rows(version, recordings)
+
+
+def needs_success_judging(
+    recording: "Recording", success_criteria: Optional[str]
+) -> bool:
+    """
+    Whether the recording's success was judged against other success criteria,
+    or was never judged although there are criteria now. Success given when
+    the recording was added is never judged.
+    """
+    if not recording.combined_transcript:
+        return False
+    judged = (
+        recording.success_criteria_hash is not None
+        or recording.success_explanation is not None
+    )
+    if judged:
+        criteria_hash = hash_text(success_criteria) if success_criteria else None
+        return recording.success_criteria_hash != criteria_hash
+    return bool(success_criteria) and recording.is_successful is None
+
+
+def rejudge_success(version: "Version", recording_ids: List[str]):
+    """
+    Judge success of recordings again against the project's current success criteria.
+    Failed call counts of each recording's final step are updated to match.
+    """
+    success_criteria = version._project._success_criteria
+    # Change in failed calls of each final step
+    failed_call_changes: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def rejudge(recording: "Recording"):
+        if not recording.combined_transcript:
+            return
+        was_failed = not recording.is_successful
+        if success_criteria:
+            response = get_success(recording.combined_transcript, success_criteria)
+            recording.is_successful = response["success"]
+            recording.success_explanation = response["explanation"]
+            recording.success_criteria_hash = hash_text(success_criteria)
+        else:
+            recording.is_successful = None
+            recording.success_explanation = None
+            recording.success_criteria_hash = None
+        recording._save()
+        change = int(not recording.is_successful) - int(was_failed)
+        if change and recording.step_ids:
+            with lock:
+                final_step_id = recording.step_ids[-1]
+                failed_call_changes[final_step_id] = (
+                    failed_call_changes.get(final_step_id, 0) + change
+                )
+
+    recordings = [version.get_recording(recording_id) for recording_id in recording_ids]
+    try:
+        run_on_recordings(rejudge, recordings)
+    finally:
+        update_step_failed_calls(version, failed_call_changes)
+        refresh_recording_rows(version, recordings)
+
+
+def recompute_call_metrics(version: "Version", recording_ids: List[str]):
+    """Recompute timing call metrics of recordings from their saved word timelines"""
+    for recording_id in recording_ids:
+        recording = version.get_recording(recording_id)
+        timeline = recording._load_timeline()
+        if timeline is None or recording.duration is None:
+            continue
+        turns = analyze_turns(timeline)
+        recording.turn_timing = turns.to_dict()
+        recording.call_metrics.update(
+            get_timing_metrics(timeline, recording.duration, turns)
+        )
+        recording._save()
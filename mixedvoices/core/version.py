@@ -1,35 +1,22 @@
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional, Sequence
 from uuid import uuid4
 from warnings import warn
 
+import numpy as np
+
 import mixedvoices
 import mixedvoices.constants as constants
 from mixedvoices.core import utils
+from mixedvoices.core.circuit_breaker import is_provider_down
+from mixedvoices.core.paths import load_path_stats, select_paths
 from mixedvoices.core.recording import Recording
 from mixedvoices.core.step import Step
+from mixedvoices.core.step_recordings import get_step_recordings
 from mixedvoices.core.task_manager import TASK_MANAGER
 from mixedvoices.utils import load_json, save_json
 
 
-def dfs(
-    current_step: Step,
-    current_path: list[Step],
-    all_paths: List[str],
-):
-    current_path.append(current_step)
-
-    if not current_step.next_steps:  # leaf node => complete path
-        current_path_names = [step.name for step in current_path]
-        current_path_str = "->".join(current_path_names)
-        all_paths.append(current_path_str)
-    else:
-        for next_step in current_step.next_steps:
-            dfs(next_step, current_path, all_paths)
-
-    current_path.pop()  # Backtrack
-
-
 def get_info_path(project_id, version_id):
     return os.path.join(
         constants.PROJECTS_FOLDER, project_id, "versions", version_id, "info.json"
@@ -53,7 +40,6 @@ class Version:
         self._create_flowchart()
         self._all_step_names = None
         self._cached_project = None
-        self._all_paths: Optional[List[str]] = None
 
     @property
     def id(self) -> str:
@@ -97,7 +83,7 @@ class Version:
 
     def get_step(self, step_id: str) -> Step:
         """Get a step by id
-        
+
         Args:
             step_id (str): The id of the step
         """
@@ -105,12 +91,55 @@ class Version:
             raise KeyError(f"Step {step_id} not found in version {self.id}")
         return self._steps[step_id]
 
+    def get_step_recordings(
+        self,
+        step_id: str,
+        offset: int = 0,
+        limit: int = 50,
+        is_successful: Optional[bool] = None,
+        order: Literal["asc", "desc"] = "desc",
+    ) -> Dict[str, Any]:
+        """
+        Get a page of the recordings that reached a step, as lightweight rows without transcripts, sorted by creation time
+
+        Args:
+            step_id (str): The id of the step
+            offset (int): Number of recordings to skip. Defaults to 0.
+            limit (int): Maximum number of recordings to return. Defaults to 50.
+            is_successful (Optional[bool]): Only return successful, or only failed recordings. Unjudged recordings count as failed. Defaults to None, for all.
+            order (str): "desc" for newest first, "asc" for oldest first. Defaults to "desc".
+
+        Returns:
+            Dict[str, Any]: The rows under "recordings", the number of matching recordings under "total" and of those successful under "successful"
+        """  # noqa E501
+        return get_step_recordings(
+            self.project_id, self.id, step_id, offset, limit, is_successful, order
+        )
+
+    def get_path_stats(
+        self,
+        top_k: Optional[int] = None,
+        sort_by: Literal["calls", "failure_rate"] = "calls",
+    ) -> List[Dict[str, Any]]:
+        """
+        Get paths through the conversation flow with the calls that took each, counted from the steps' recordings. Paths are saved with the steps until the flow changes
+
+        Args:
+            top_k (Optional[int]): Only return this many paths, ranked by sort_by. Defaults to None, for every path in flow order.
+            sort_by (str): Rank paths by "calls" or "failure_rate". Defaults to "calls".
+
+        Returns:
+            List[Dict[str, Any]]: path, calls, failed_calls and failure_rate of each path
+        """  # noqa E501
+        path_stats = load_path_stats(self.project_id, self.id)
+        return select_paths(path_stats, top_k, sort_by)
+
     def update_prompt(self, prompt: str) -> None:
         """Update the prompt of the version
 
         Args:
             prompt (str): The new prompt
-        
+
         """
         self._prompt = prompt
         self._save()
@@ -192,7 +221,14 @@ class Version:
         recording._save()
 
         if blocking:
-            utils.process_recording(recording, self, user_channel)
+            try:
+                utils.process_recording(recording, self, user_channel)
+            except Exception as e:
+                # Nothing retries a blocking call once the provider is back
+                if is_provider_down(e):
+                    recording.task_status = "FAILED"
+                    recording._save()
+                raise
         else:
             recording.processing_task_id = TASK_MANAGER.add_task(
                 "process_recording",
@@ -201,6 +237,124 @@ class Version:
                 user_channel=user_channel,
             )
 
+    def backfill_metrics(self, blocking: bool = True):
+        """
+        Score LLM metrics of recordings that were left unscored by the project's sampling policy
+
+        Args:
+            blocking (bool): If True, block until recordings are scored, otherwise adds to queue and scores in the background. Defaults to True.
+        """  # noqa E501
+        recording_ids = [
+            recording.id
+            for recording in self._recordings.values()
+            if recording.sampling and not recording.sampling["scored"]
+        ]
+        if not recording_ids:
+            return
+        if blocking:
+            utils.rescore_recordings(self, recording_ids)
+        else:
+            TASK_MANAGER.add_version_tasks("rescore_recordings", self, recording_ids)
+
+    def rescore_stale_metrics(self, blocking: bool = True) -> List[str]:
+        """
+        Score scored recordings on metrics added to the project since, or whose definition changed. Only those metrics are scored, from the stored transcripts
+
+        Args:
+            blocking (bool): If True, block until recordings are scored, otherwise adds to queue and scores in the background. Defaults to True.
+
+        Returns:
+            List[str]: Ids of the background tasks, one per batch of recordings, to follow their progress. Empty if blocking or there are no recordings to score
+        """  # noqa E501
+        metrics = self._project.metrics
+        recording_ids = [
+            recording.id
+            for recording in self._recordings.values()
+            if recording.task_status == "COMPLETED"
+            and (not recording.sampling or recording.sampling["scored"])
+            and utils.get_stale_metrics(recording, metrics)
+        ]
+        if not recording_ids:
+            return []
+        if blocking:
+            utils.rescore_recordings(self, recording_ids)
+            return []
+        return TASK_MANAGER.add_version_tasks("rescore_recordings", self, recording_ids)
+
+    def rejudge_success(self, blocking: bool = True) -> List[str]:
+        """
+        Judge success of recordings again, if it was judged against different success criteria than the project's current ones. Recordings with success given when they were added are kept as is
+
+        Args:
+            blocking (bool): If True, block until recordings are judged, otherwise adds to queue and judges in the background. Defaults to True.
+
+        Returns:
+            List[str]: Ids of the background tasks, one per batch of recordings, to follow their progress. Empty if blocking or there are no recordings to judge
+        """  # noqa E501
+        success_criteria = self._project._success_criteria
+        recording_ids = [
+            recording.id
+            for recording in self._recordings.values()
+            if recording.task_status == "COMPLETED"
+            and utils.needs_success_judging(recording, success_criteria)
+        ]
+        if not recording_ids:
+            return []
+        if blocking:
+            utils.rejudge_success(self, recording_ids)
+            return []
+        return TASK_MANAGER.add_version_tasks("rejudge_success", self, recording_ids)
+
+    def recompute_call_metrics(self, blocking: bool = True):
+        """
+        Recompute latency, interruption and WPM call metrics of recordings from their saved word timestamps, without transcribing again
+
+        Args:
+            blocking (bool): If True, block until metrics are recomputed, otherwise adds to queue and recomputes in the background. Defaults to True.
+        """  # noqa E501
+        recording_ids = [
+            recording.id
+            for recording in self._recordings.values()
+            if os.path.exists(recording._timeline_path)
+        ]
+        if not recording_ids:
+            return
+        if blocking:
+            utils.recompute_call_metrics(self, recording_ids)
+        else:
+            TASK_MANAGER.add_version_tasks(
+                "recompute_call_metrics", self, recording_ids
+            )
+
+    def get_latency_percentiles(
+        self, percentiles: Sequence[float] = (50, 90, 99)
+    ) -> Dict[str, Any]:
+        """
+        Percentiles of agent response latency over every turn of every recording
+
+        Args:
+            percentiles (Sequence[float]): Percentiles to compute. Defaults to (50, 90, 99).
+
+        Returns:
+            Dict[str, Any]: Latency in seconds for each percentile, like p90_latency, the number of turns, and total overlap in seconds
+        """  # noqa E501
+        latencies, overlaps = [], []
+        for recording in self._recordings.values():
+            latencies.extend(recording.turn_timing.get("latencies", []))
+            overlaps.extend(recording.turn_timing.get("overlaps", []))
+        values = (
+            np.percentile(latencies, percentiles).tolist()
+            if latencies
+            else [None] * len(percentiles)
+        )
+        res: Dict[str, Any] = {
+            f"p{percentile:g}_latency": value
+            for percentile, value in zip(percentiles, values)
+        }
+        res["turns"] = len(latencies)
+        res["overlap_seconds"] = float(np.sum(overlaps))
+        return res
+
     def _save(self):
         d = {
             "prompt": self._prompt,
@@ -265,36 +419,32 @@ class Version:
         return [step for step in self._steps.values() if step.previous_step_id is None]
 
     def _create_flowchart(self):
-        for starting_step in self._starting_steps:
-            self._recursively_assign_steps(starting_step)
-
-    def _recursively_assign_steps(self, step: Step):
-        step.next_steps = [
-            self._steps[next_step_id] for next_step_id in step.next_step_ids
-        ]
-        step.previous_step = (
-            self._steps[step.previous_step_id]
-            if step.previous_step_id is not None
-            else None
-        )
-        for next_step in step.next_steps:
-            self._recursively_assign_steps(next_step)
+        for step in self._steps.values():
+            step.next_steps = [
+                self._steps[next_step_id] for next_step_id in step.next_step_ids
+            ]
+            step.previous_step = (
+                self._steps[step.previous_step_id]
+                if step.previous_step_id is not None
+                else None
+            )
 
-    def _get_paths(self) -> List[str]:
+    def _get_paths(
+        self,
+        top_k: Optional[int] = None,
+        sort_by: Literal["calls", "failure_rate"] = "calls",
+    ) -> List[str]:
         """
-        Returns all possible paths through the conversation flow using DFS.
-        Each path is a list of Step objects representing a complete conversation path.
+        Returns paths through the conversation flow, as "A->B->C" strings.
 
-        Returns:
-            List[str]: List of all possible paths through the conversation
-        """
-        if self._all_paths is None:
-            all_paths = []
-            for start_step in self._starting_steps:
-                dfs(start_step, [], all_paths)
+        Args:
+            top_k (Optional[int]): Only return this many paths, ranked by sort_by. Defaults to None, for every path.
+            sort_by (str): Rank paths by "calls" or "failure_rate". Defaults to "calls".
 
-            self._all_paths = all_paths
-        return self._all_paths
+        Returns:
+            List[str]: Paths through the conversation
+        """  # noqa E501
+        return [stats["path"] for stats in self.get_path_stats(top_k, sort_by)]
 
     def _get_step_names(self) -> List[str]:
         return list({step.name for step in self._steps.values()})
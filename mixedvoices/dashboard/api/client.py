@@ -65,11 +65,12 @@ class APIClient:
         st.error(error_msg)
 
     @staticmethod
-    def fetch_data(endpoint: str) -> Dict:
+    def fetch_data(endpoint: str, params: Optional[Dict] = None) -> Dict:
         """Fetch data from the FastAPI backend
 
         Args:
             endpoint: API endpoint to fetch from
+            params: Query parameters to include
 
         Returns:
             Dict: Response data from API
@@ -79,7 +80,9 @@ class APIClient:
         """
         try:
             response = requests.get(
-                f"{API_BASE_URL}/{endpoint}", timeout=30  # Add reasonable timeout
+                f"{API_BASE_URL}/{endpoint}",
+                params=params or None,
+                timeout=30,  # Add reasonable timeout
             )
             response.raise_for_status()
             return response.json()
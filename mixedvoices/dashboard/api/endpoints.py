@@ -38,6 +38,10 @@ def step_recordings_ep(project_id: str, version_id: str, step_id: str) -> str:
     return f"projects/{project_id}/versions/{version_id}/steps/{step_id}/recordings"
 
 
+def recording_ep(project_id: str, version_id: str, recording_id: str) -> str:
+    return f"projects/{project_id}/versions/{version_id}/recordings/{recording_id}"
+
+
 def recording_flow_ep(project_id: str, version_id: str, recording_id: str) -> str:
     return f"projects/{project_id}/versions/{version_id}/recordings/{recording_id}/flow"
 
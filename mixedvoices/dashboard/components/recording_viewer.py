@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 import streamlit as st
 
 from mixedvoices.dashboard.api.client import APIClient
-from mixedvoices.dashboard.api.endpoints import recording_flow_ep
+from mixedvoices.dashboard.api.endpoints import recording_ep, recording_flow_ep
 from mixedvoices.dashboard.utils import (
     data_to_df_with_dates,
     display_llm_metrics,
@@ -78,6 +78,13 @@ class RecordingViewer:
     @st.dialog("Details", width="large")
     def show_recording_dialog(self, recording: dict) -> None:
         """Show recording details in a dialog"""
+        if "combined_transcript" not in recording:
+            # Rows of a step's recordings are lightweight, fetch the rest
+            recording = self.api_client.fetch_data(
+                recording_ep(self.project_id, self.version, recording["id"])
+            )
+            if not recording:
+                return
         st.subheader(f"Recording ID: {recording['id']}")
 
         audio_path = recording["audio_path"]
@@ -16,13 +16,18 @@ class SuccessCriteriaManager:
             height=150,
             key="success_criteria_editor",
         )
+        rejudge = st.checkbox(
+            "Judge success of existing recordings again",
+            value=True,
+            key="success_criteria_rejudge",
+        )
 
         cols = st.columns([1, 4])
         with cols[0]:
             if st.button("Save", icon=":material/check:"):
                 response = self.api_client.post_data(
                     project_success_criteria_ep(self.project_id),
-                    {"success_criteria": new_criteria},
+                    {"success_criteria": new_criteria, "rejudge": rejudge},
                 )
                 if response.get("message"):
                     st.session_state.show_success_success_criteria = True
@@ -15,6 +15,7 @@ def load_logo():
 API_PORT: Final = 7760
 DASHBOARD_PORT: Final = 7761
 API_BASE_URL: Final = f"http://localhost:{API_PORT}/api"
+STEP_RECORDINGS_PAGE_SIZE: Final = 50
 page_icon = load_logo()
 DEFAULT_PAGE_CONFIG = {
     "page_title": "MixedVoices Dashboard",
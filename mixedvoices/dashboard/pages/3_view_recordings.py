@@ -8,6 +8,7 @@ from mixedvoices.dashboard.api.endpoints import (
 from mixedvoices.dashboard.components.recording_viewer import RecordingViewer
 from mixedvoices.dashboard.components.sidebar import Sidebar
 from mixedvoices.dashboard.components.version_selector import render_version_selector
+from mixedvoices.dashboard.config import STEP_RECORDINGS_PAGE_SIZE
 from mixedvoices.dashboard.visualizations.metrics import display_metrics
 
 
@@ -43,18 +44,37 @@ def view_recordings_page():
             st.rerun()
 
     if st.session_state.get("selected_node_id"):
-        # Fetch recordings for selected node
+        outcome_col, page_col = st.columns(2)
+        outcome = outcome_col.selectbox(
+            "Outcome", ["All", "Successful", "Failed"], key="step_outcome"
+        )
+        page = page_col.number_input("Page", min_value=1, step=1, key="step_page")
+        offset = (page - 1) * STEP_RECORDINGS_PAGE_SIZE
+        params = {"offset": offset, "limit": STEP_RECORDINGS_PAGE_SIZE}
+        if outcome != "All":
+            params["is_successful"] = str(outcome == "Successful").lower()
+
+        # Fetch a page of recordings for selected node, newest first
         recordings = api_client.fetch_data(
             step_recordings_ep(
                 st.session_state.current_project,
                 st.session_state.current_version,
                 st.session_state.selected_node_id,
-            )
+            ),
+            params,
         )
 
         if recordings.get("recordings"):
-            display_metrics(recordings["recordings"])
+            display_metrics(
+                recordings["recordings"],
+                recordings["total"],
+                recordings["successful"],
+            )
             recording_viewer.display_recordings_list(recordings["recordings"])
+            st.caption(
+                f"Showing {offset + 1}-{offset + len(recordings['recordings'])}"
+                f" of {recordings['total']}, newest first"
+            )
         else:
             st.warning("No recordings found for the selected path.")
 
@@ -1,12 +1,56 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import streamlit as st
 
+from mixedvoices.core.sampling import get_sampling_weights
 
-def display_metrics(recordings: List[Dict]) -> None:
-    """Display recording metrics"""
-    total = len(recordings)
-    successful = sum(1 for r in recordings if r["is_successful"])
+
+def estimate_llm_metrics(recordings: List[Dict]) -> Dict[str, str]:
+    """Estimate each LLM metric over all recordings from the scored ones.
+
+    Continuous metrics are averaged, binary metrics are shown as pass rate.
+    Scored recordings are weighted by how many recordings of their sampling
+    stratum they stand in for.
+    """
+    totals: Dict[str, float] = {}
+    weight_sums: Dict[str, float] = {}
+    is_binary: Dict[str, bool] = {}
+    weights = get_sampling_weights(recordings)
+    for recording, weight in zip(recordings, weights):
+        if weight is None:
+            continue
+        for name, metric in (recording.get("llm_metrics") or {}).items():
+            score = metric["score"] if metric else "N/A"
+            if score in ("PASS", "FAIL"):
+                value = 1.0 if score == "PASS" else 0.0
+                is_binary[name] = True
+            elif isinstance(score, (int, float)):
+                value = float(score)
+            else:
+                continue
+            totals[name] = totals.get(name, 0) + weight * value
+            weight_sums[name] = weight_sums.get(name, 0) + weight
+
+    estimates = {}
+    for name, total in totals.items():
+        estimate = total / weight_sums[name]
+        if is_binary.get(name):
+            estimates[name] = f"{estimate * 100:.1f}% PASS"
+        else:
+            estimates[name] = f"{estimate:.1f}/10"
+    return estimates
+
+
+def display_metrics(
+    recordings: List[Dict],
+    total: Optional[int] = None,
+    successful: Optional[int] = None,
+) -> None:
+    """Display recording metrics, counted over all recordings unless given"""
+    if total is None:
+        total = len(recordings)
+    if successful is None:
+        successful = sum(1 for r in recordings if r["is_successful"])
     success_rate = (successful / total * 100) if total > 0 else 0
 
     col1, col2, col3, col4 = st.columns([3,3,3,1])
@@ -16,3 +60,14 @@ def display_metrics(recordings: List[Dict]) -> None:
     with col4:
         if st.button("Refresh", help="Refresh recordings"):
             st.rerun()
+
+    estimates = estimate_llm_metrics(recordings)
+    if estimates:
+        scored = sum(1 for w in get_sampling_weights(recordings) if w is not None)
+        st.caption(
+            f"LLM metrics scored for {scored} of {len(recordings)} recordings shown, "
+            "averages are weighted to represent all of them"
+        )
+        estimate_cols = st.columns(min(len(estimates), 4))
+        for i, (name, estimate) in enumerate(estimates.items()):
+            estimate_cols[i % len(estimate_cols)].metric(name, estimate)
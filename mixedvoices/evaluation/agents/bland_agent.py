@@ -1,6 +1,7 @@
 import requests
 
 from mixedvoices.evaluation.agents.base_agent import BaseAgent
+from mixedvoices.utils import get_timeout
 
 
 class BlandAgent(BaseAgent):
@@ -16,7 +17,10 @@ class BlandAgent(BaseAgent):
         json = {"message": input_text} if input_text else None
         try:
             response = requests.post(
-                self.chat_with_pathway_endpoint(), json=json, headers=self.headers
+                self.chat_with_pathway_endpoint(),
+                json=json,
+                headers=self.headers,
+                timeout=get_timeout(),
             ).json()
             return response["data"]["assistant_response"], False
         except Exception as e:
@@ -35,7 +39,10 @@ class BlandAgent(BaseAgent):
         }
         try:
             response = requests.post(
-                self.create_pathway_chat_endpoint(), json=json, headers=self.headers
+                self.create_pathway_chat_endpoint(),
+                json=json,
+                headers=self.headers,
+                timeout=get_timeout(),
             ).json()
             return response["data"]["chat_id"]
         except Exception as e:
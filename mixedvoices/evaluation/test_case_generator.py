@@ -1,11 +1,11 @@
-import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import TYPE_CHECKING, List, Literal, Optional
 
 from tqdm import tqdm
 
 from mixedvoices import models
 from mixedvoices.core.utils import get_transcript_and_duration
-from mixedvoices.utils import get_openai_client
+from mixedvoices.utils import get_openai_client, submit_with_context
 
 if TYPE_CHECKING:
     from mixedvoices.core.project import Project  # pragma: no cover
@@ -208,13 +208,22 @@ def generate_test_cases_from_recordings(
             {"progress": f"0/{len(recording_paths)} recordings processed"}
         )
 
-    transcripts = []
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for idx, (path, user_channel) in enumerate(
-            zip(recording_paths, user_channels), 1
-        ):
-            out = get_transcript_and_duration(path, temp_dir, user_channel)
-            transcripts.append(out[0])
+    # Recordings are transcribed side by side, their chunks share one upload pool
+    transcripts = [""] * len(recording_paths)
+    num_workers = max(min(models.TRANSCRIPTION_WORKERS, len(recording_paths)), 1)
+    with ThreadPoolExecutor(
+        max_workers=num_workers, thread_name_prefix="Recording"
+    ) as executor:
+        futures = {
+            submit_with_context(
+                executor, get_transcript_and_duration, path, user_channel
+            ): i
+            for i, (path, user_channel) in enumerate(
+                zip(recording_paths, user_channels)
+            )
+        }
+        for idx, future in enumerate(as_completed(futures), 1):
+            transcripts[futures[future]] = future.result()[0]
             if progress:
                 progress.set_postfix(
                     {"progress": f"{idx}/{len(recording_paths)} recordings processed"}
@@ -304,32 +313,44 @@ class TestCaseGenerator:
         return self
 
     def add_from_version(
-        self, version: "Version", cases_per_path: int = 1
+        self,
+        version: "Version",
+        cases_per_path: int = 1,
+        top_k: Optional[int] = None,
+        sort_by: Literal["calls", "failure_rate"] = "calls",
     ) -> "TestCaseGenerator":
         """Add test cases from a version. 1 test case will be generated for each path in the version
 
         Args:
             version (Version): Version object
             cases_per_path (int, optional): Number of test cases to generate for each path. Defaults to 1.
+            top_k (Optional[int], optional): Only use this many paths, ranked by sort_by. Defaults to None, for every path.
+            sort_by (str, optional): Rank paths by "calls" or "failure_rate". Defaults to "calls".
         """
         self._check_generation()
         self.versions.append(version)
-        self.versions_paths.append(version._get_paths())
+        self.versions_paths.append(version._get_paths(top_k, sort_by))
         self.version_cases_per_path.append(cases_per_path)
         return self
 
     def add_from_project(
-        self, project: "Project", cases_per_path: int = 1
+        self,
+        project: "Project",
+        cases_per_path: int = 1,
+        top_k: Optional[int] = None,
+        sort_by: Literal["calls", "failure_rate"] = "calls",
     ) -> "TestCaseGenerator":
         """Add test cases from a project. 1 test case will be generated for each path in the project
 
         Args:
             project (Project): Project object
             cases_per_path (int, optional): Number of test cases to generate for each path. Defaults to 1.
+            top_k (Optional[int], optional): Only use this many paths, ranked by sort_by. Defaults to None, for every path.
+            sort_by (str, optional): Rank paths by "calls" or "failure_rate". Defaults to "calls".
         """
         self._check_generation()
         self.projects.append(project)
-        self.projects_paths.append(project._get_paths())
+        self.projects_paths.append(project._get_paths(top_k, sort_by))
         self.project_cases_per_path.append(cases_per_path)
         return self
 
@@ -1,3 +1,4 @@
+from mixedvoices.metrics.call_metric import CallMetric as CallMetric
 from mixedvoices.metrics.definitions import (
     adaptive_qa,
     conciseness,
@@ -0,0 +1,56 @@
+import importlib
+from dataclasses import dataclass
+from functools import reduce
+from typing import Callable, Union
+
+
+@dataclass
+class CallMetric:
+    """Define a custom call metric, computed from a recording's audio and words.
+
+    The function is called with the decoded AudioBuffer of the recording, its WordTimeline
+    and the user channel ("left" or "right"), and returns a JSON serializable value.
+    It runs in a worker process, so it's stored as an import path and must be importable there.
+
+    Args:
+        name (str): The name of the metric, its value is stored under this key in Recording.call_metrics.
+        function (Union[str, Callable]): The function, or its import path as "module:function".
+            Example: "my_package.metrics:count_fillers"
+        timeout (float, optional): Seconds the function may run for before it's stopped. Defaults to 60.
+    """  # noqa E501
+
+    name: str
+    "The name of the metric."
+    function: Union[str, Callable]
+    "Import path of the function, as 'module:function'."
+    timeout: float = 60.0
+    "Seconds the function may run for before it's stopped."
+
+    def __post_init__(self):
+        if callable(self.function):
+            qualname = self.function.__qualname__
+            if "<" in qualname:  # <lambda> or <locals>
+                raise ValueError(
+                    "Call metric functions must be defined at the top level of a module"
+                )
+            self.function = f"{self.function.__module__}:{qualname}"
+        module, separator, attribute = self.function.partition(":")
+        if not (module and separator and attribute):
+            raise ValueError("function must be an import path like 'module:function'")
+        if self.timeout <= 0:
+            raise ValueError("timeout must be positive")
+        self.name = self.name.lower()
+
+    def load_function(self) -> Callable:
+        """Import the metric's function"""
+        module_name, _, attribute = self.function.partition(":")
+        module = importlib.import_module(module_name)
+        return reduce(getattr, attribute.split("."), module)
+
+    def to_dict(self):
+        """Returns a dictionary representation of the call metric."""
+        return {
+            "name": self.name,
+            "function": self.function,
+            "timeout": self.timeout,
+        }
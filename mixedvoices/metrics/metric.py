@@ -1,8 +1,10 @@
+import json
 from dataclasses import dataclass
 from typing import Literal
 
+from mixedvoices.utils import hash_text
+
 # TODO: add more metrics, define better
-# TODO: allow creation of custom call metrics
 
 
 @dataclass
@@ -40,6 +42,11 @@ class Metric:
         elif self.scoring == "continuous":
             return list(range(11)) + ["N/A"]
 
+    @property
+    def definition_hash(self) -> str:
+        """Hash of everything that affects the metric's scores."""
+        return hash_text(json.dumps(self.to_dict(), sort_keys=True))
+
     def to_dict(self):
         """Returns a dictionary representation of the metric."""
         return {
@@ -7,3 +7,32 @@ SUMMARY_MODEL = get_value_from_config("SUMMARY_MODEL")
 STEPS_MODEL = get_value_from_config("STEPS_MODEL")
 EVAL_AGENT_MODEL = get_value_from_config("EVAL_AGENT_MODEL")
 TEST_CASE_GENERATOR_MODEL = get_value_from_config("TEST_CASE_GENERATOR_MODEL")
+
+# Routing between the stage models above and a smaller model, see processors/routing.py
+MODEL_ROUTING = get_value_from_config("MODEL_ROUTING")
+ROUTING_SMALL_MODEL = get_value_from_config("ROUTING_SMALL_MODEL")
+ROUTING_TOKEN_THRESHOLD = int(float(get_value_from_config("ROUTING_TOKEN_THRESHOLD")))
+ROUTING_BUDGET = get_value_from_config("ROUTING_BUDGET")
+
+# Map-reduce analysis of long transcripts, see processors/chunking.py
+TRANSCRIPT_CHUNKING = get_value_from_config("TRANSCRIPT_CHUNKING")
+TRANSCRIPT_CHUNK_TOKENS = int(float(get_value_from_config("TRANSCRIPT_CHUNK_TOKENS")))
+
+# Seconds, every network call is capped by REQUEST_TIMEOUT and the task's deadline
+REQUEST_TIMEOUT = float(get_value_from_config("REQUEST_TIMEOUT"))
+TASK_DEADLINE = float(get_value_from_config("TASK_DEADLINE"))
+
+# Encoding of audio uploaded for transcription, see processors/transcriber.py
+UPLOAD_ENCODING = get_value_from_config("UPLOAD_ENCODING")
+# Only upload speech found by a local voice activity pass, see processors/vad.py
+TRANSCRIPTION_VAD = get_value_from_config("TRANSCRIPTION_VAD")
+# Threads uploading audio chunks, shared by every recording being transcribed
+TRANSCRIPTION_WORKERS = int(float(get_value_from_config("TRANSCRIPTION_WORKERS")))
+# Processes running local/whisper-* models, see processors/local_transcriber.py
+LOCAL_TRANSCRIPTION_PROCESSES = int(
+    float(get_value_from_config("LOCAL_TRANSCRIPTION_PROCESSES"))
+)
+# Processes running projects' custom call metrics, see processors/custom_call_metrics.py
+CALL_METRIC_PROCESSES = int(float(get_value_from_config("CALL_METRIC_PROCESSES")))
+# Existing step names offered to STEPS_MODEL, see processors/step_candidates.py
+STEPS_CANDIDATE_LIMIT = int(float(get_value_from_config("STEPS_CANDIDATE_LIMIT")))
@@ -0,0 +1,138 @@
+import math
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import librosa
+import numpy as np
+import soundfile as sf
+from scipy.io import wavfile
+from scipy.signal import resample_poly
+
+
+@dataclass
+class AudioInfo:
+    """Properties of an audio file, read without decoding it when possible"""
+
+    duration: float
+    "Duration in seconds."
+    channels: int
+    "Number of channels."
+    sample_rate: int
+    "Native sample rate in Hz."
+
+
+def probe_audio(audio_path: str) -> AudioInfo:
+    """
+    Read duration, channel count and sample rate of an audio file from its header.
+    Falls back to decoding at native rate for formats libsndfile can't read.
+
+    Args:
+        audio_path (str): Path to the audio file
+
+    Returns:
+        AudioInfo: Properties of the audio file
+    """
+    try:
+        info = sf.info(audio_path)
+        return AudioInfo(info.duration, info.channels, info.samplerate)
+    except RuntimeError:
+        y, sr = load_channels(audio_path)
+        return AudioInfo(y.shape[1] / sr, y.shape[0], sr)
+
+
+def load_channels(audio_path: str) -> Tuple[np.ndarray, int]:
+    """
+    Decode an audio file at its native sample rate, without resampling.
+
+    Args:
+        audio_path (str): Path to the audio file
+
+    Returns:
+        tuple: Samples with shape (channels, samples) as float32, and sample rate
+    """
+    try:
+        y, sr = sf.read(audio_path, dtype="float32", always_2d=True)
+        return y.T, sr
+    except RuntimeError:
+        y, sr = librosa.load(audio_path, sr=None, mono=False)
+        return np.atleast_2d(y), sr
+
+
+def to_float32(samples: np.ndarray) -> np.ndarray:
+    """Convert samples of any PCM dtype to float32 in [-1, 1]"""
+    if np.issubdtype(samples.dtype, np.floating):
+        return samples.astype(np.float32, copy=False)
+    info = np.iinfo(samples.dtype)
+    offset = (info.max + info.min + 1) / 2  # 128 for unsigned 8 bit, else 0
+    # Exact in float32, as the scale is a power of two
+    return (samples.astype(np.float32) - offset) / np.float32(info.max - offset + 1)
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Resample along the first axis, samples are returned as is if rates match"""
+    if sample_rate == target_rate:
+        return samples
+    divisor = math.gcd(target_rate, sample_rate)
+    return resample_poly(
+        to_float32(samples), target_rate // divisor, sample_rate // divisor, axis=0
+    )
+
+
+class AudioBuffer:
+    """
+    Audio of a recording, decoded once and shared read only by every stage that
+    needs samples. PCM WAV files are memory mapped instead of read into memory.
+
+    Args:
+        samples (np.ndarray): Samples with shape (channels, samples)
+        sample_rate (int): Sample rate in Hz
+    """
+
+    def __init__(
+        self, samples: np.ndarray, sample_rate: int, mapped_path: Optional[str] = None
+    ):
+        samples.flags.writeable = False
+        self._samples = samples
+        self._sample_rate = sample_rate
+        self._mapped_path = mapped_path
+
+    @classmethod
+    def from_file(cls, audio_path: str) -> "AudioBuffer":
+        """Decode an audio file, memory mapping it if it's a PCM WAV file"""
+        if os.path.splitext(audio_path)[1].lower() == ".wav":
+            try:
+                sr, data = wavfile.read(audio_path, mmap=True)
+                samples = data.reshape(len(data), -1).T
+                return cls(samples, sr, mapped_path=audio_path)
+            except ValueError:
+                pass  # Formats that can't be memory mapped, like 24 bit PCM
+        samples, sr = load_channels(audio_path)
+        return cls(samples, sr)
+
+    @property
+    def samples(self) -> np.ndarray:
+        """Read only samples with shape (channels, samples), in the file's dtype"""
+        return self._samples
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    @property
+    def mapped_path(self) -> Optional[str]:
+        """Path of the WAV file the samples are memory mapped from, None if decoded"""
+        return self._mapped_path
+
+    @property
+    def channels(self) -> int:
+        return self._samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds"""
+        return self._samples.shape[1] / self._sample_rate
+
+    def channel(self, index: int) -> np.ndarray:
+        """Read only view of a single channel's samples"""
+        return self._samples[index]
@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from mixedvoices.processors.audio import AudioBuffer, to_float32
+from mixedvoices.processors.vad import MIN_SPEECH_DBFS, SPEECH_THRESHOLD_DB
+
+FRAME_SECONDS = 0.02
+# Frames are summarised into windows of this length for the saved timeline
+WINDOW_SECONDS = 1.0
+# Percentile of frame energy taken as a channel's noise floor, low enough for
+# channels that are speaking most of the time
+NOISE_FLOOR_PERCENTILE = 5
+# Noise floors below this are quantization noise of digital silence, too quiet
+# for SNR to be meaningful
+NOISELESS_DBFS = -90.0
+# Samples at or above this fraction of full scale are clipped
+CLIP_LEVEL = 0.999
+# Silence on both channels at least this long is dead air
+MIN_DEAD_AIR_SECONDS = 3.0
+# Frames analysed at a time, bounding memory on multi hour recordings
+BLOCK_FRAMES = 30_000
+
+
+def find_runs(mask: np.ndarray):
+    """Start and end (exclusive) index of each run of True values"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+@dataclass
+class AudioQuality:
+    """
+    Framewise levels of a call's channels, with the user's channel first.
+    Computed in a single pass over the samples by analyze_audio_quality.
+    """
+
+    energy_db: np.ndarray
+    "Mean energy of each frame in dB relative to full scale, shape (2, frames)."
+    clipped: np.ndarray
+    "Number of clipped samples in each frame, shape (2, frames)."
+    frame_size: int
+    "Samples in each frame."
+    sample_rate: int
+
+    @property
+    def frame_seconds(self) -> float:
+        return self.frame_size / self.sample_rate
+
+    @property
+    def noise_floor_db(self) -> np.ndarray:
+        """Noise floor of each channel in dBFS"""
+        if self.energy_db.shape[1] == 0:
+            return np.full(len(self.energy_db), -120.0)
+        return np.percentile(self.energy_db, NOISE_FLOOR_PERCENTILE, axis=1)
+
+    @property
+    def is_speech(self) -> np.ndarray:
+        """Whether each frame of each channel is louder than its noise floor"""
+        threshold = np.maximum(
+            self.noise_floor_db + SPEECH_THRESHOLD_DB, MIN_SPEECH_DBFS
+        )
+        return self.energy_db > threshold[:, None]
+
+    def snr_db(self) -> np.ndarray:
+        """
+        SNR of each channel, mean energy of speech frames over the noise floor.
+        NaN for channels without speech or noise to measure.
+        """
+        noise_floor = self.noise_floor_db
+        is_speech = self.is_speech
+        snr = np.full(len(noise_floor), np.nan)
+        for i, (floor, speech) in enumerate(zip(noise_floor, is_speech)):
+            if floor < NOISELESS_DBFS or not speech.any():
+                continue
+            signal_energy = np.mean(10 ** (self.energy_db[i, speech] / 10))
+            snr[i] = 10 * np.log10(signal_energy) - floor
+        return snr
+
+    def clipped_percent(self) -> np.ndarray:
+        """Percentage of each channel's samples that are clipped"""
+        total = self.clipped.shape[1] * self.frame_size
+        if total == 0:
+            return np.zeros(len(self.clipped))
+        return 100 * self.clipped.sum(axis=1) / total
+
+    def dead_air(self, min_seconds: float = MIN_DEAD_AIR_SECONDS) -> np.ndarray:
+        """
+        Stretches with no speech on either channel.
+
+        Returns:
+            np.ndarray: Start and end in seconds of each stretch, shape (n, 2)
+        """
+        starts, ends = find_runs(~self.is_speech.any(axis=0))
+        keep = (ends - starts) * self.frame_seconds >= min_seconds
+        return np.stack([starts[keep], ends[keep]], axis=1) * self.frame_seconds
+
+    def windows(self, window_seconds: float = WINDOW_SECONDS) -> dict:
+        """
+        Per window timeline of both channels.
+
+        Returns:
+            dict: Window starts in seconds, and with shape (2, windows), the level
+                in dBFS, fraction of frames with speech and clipped samples
+        """
+        frames_per_window = max(round(window_seconds / self.frame_seconds), 1)
+        num_frames = self.energy_db.shape[1]
+        first_frames = np.arange(0, num_frames, frames_per_window)
+        frame_counts = np.diff(np.append(first_frames, num_frames))
+        if num_frames == 0:
+            empty = np.zeros((len(self.energy_db), 0))
+            return {
+                "starts": np.zeros(0),
+                "level_db": empty,
+                "speech": empty,
+                "clipped": empty.astype(np.int64),
+            }
+        energy = np.add.reduceat(10 ** (self.energy_db / 10), first_frames, axis=1)
+        speech = np.add.reduceat(self.is_speech, first_frames, axis=1)
+        return {
+            "starts": first_frames * self.frame_seconds,
+            "level_db": 10 * np.log10(np.maximum(energy / frame_counts, 1e-12)),
+            "speech": speech / frame_counts,
+            "clipped": np.add.reduceat(self.clipped, first_frames, axis=1),
+        }
+
+    def summary(self) -> dict:
+        """Summary stats, in the format of Recording.call_metrics"""
+        snr = self.snr_db()
+        noise_floor = self.noise_floor_db
+        clipped = self.clipped_percent()
+        dead_air = self.dead_air()
+        dead_air_lengths = dead_air[:, 1] - dead_air[:, 0]
+        res = {}
+        for i, speaker in enumerate(["user", "agent"]):
+            res[f"{speaker}_snr"] = (
+                "N/A" if np.isnan(snr[i]) else f"{round(float(snr[i]), 2)} dB"
+            )
+            res[f"{speaker}_noise_floor"] = f"{round(float(noise_floor[i]), 2)} dBFS"
+            res[f"{speaker}_clipped_percent"] = round(float(clipped[i]), 4)
+        res["dead_air_seconds"] = round(float(dead_air_lengths.sum()), 2)
+        res["longest_dead_air"] = round(float(dead_air_lengths.max(initial=0)), 2)
+        return res
+
+    def save(self, path: str, window_seconds: float = WINDOW_SECONDS):
+        """Save the per window timeline as a compressed .npz file"""
+        windows = self.windows(window_seconds)
+        np.savez_compressed(
+            path,
+            window_seconds=window_seconds,
+            starts=windows["starts"],
+            level_db=windows["level_db"].astype(np.float32),
+            speech=windows["speech"].astype(np.float32),
+            clipped=windows["clipped"].astype(np.int32),
+        )
+
+
+def analyze_audio_quality(
+    audio: AudioBuffer, user_channel: str = "left", block_frames: int = BLOCK_FRAMES
+) -> AudioQuality:
+    """
+    Energy and clipping of each 20 ms frame of both channels of a stereo call.
+    Samples are read once, a block of frames at a time, so memory mapped audio
+    is never copied whole.
+
+    Args:
+        audio (AudioBuffer): Decoded stereo audio of the recording
+        user_channel (str): Channel containing user audio ("left" or "right")
+        block_frames (int): Frames analysed at a time. Defaults to BLOCK_FRAMES.
+    """
+    order = [0, 1] if user_channel == "left" else [1, 0]
+    frame_size = max(int(FRAME_SECONDS * audio.sample_rate), 1)
+    num_frames = audio.samples.shape[1] // frame_size
+    energy = np.empty((2, num_frames))
+    clipped = np.empty((2, num_frames), dtype=np.int64)
+    for first in range(0, num_frames, block_frames):
+        last = min(first + block_frames, num_frames)
+        block = audio.samples[:2, first * frame_size : last * frame_size]
+        # Interleaved WAV channels are strided, each frame is made contiguous
+        frames = to_float32(np.ascontiguousarray(block))
+        frames = frames.reshape(2, last - first, frame_size)
+        block_energy = np.einsum("cfs,cfs->cf", frames, frames)
+        energy[:, first:last] = block_energy[order] / frame_size
+        # Samples are only compared in the few frames that peak at full scale
+        peaks = np.maximum(frames.max(axis=2), -frames.min(axis=2))
+        block_clipped = np.zeros(peaks.shape, dtype=np.int64)
+        loud = peaks >= CLIP_LEVEL
+        block_clipped[loud] = np.count_nonzero(
+            np.abs(frames[loud]) >= CLIP_LEVEL, axis=1
+        )
+        clipped[:, first:last] = block_clipped[order]
+    energy_db = 10 * np.log10(np.maximum(energy, 1e-12))
+    return AudioQuality(energy_db, clipped, frame_size, audio.sample_rate)
+
+
+def load_windows(path: str) -> dict:
+    """Per window timeline saved by AudioQuality.save"""
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
@@ -1,82 +1,97 @@
-from statistics import mean
-from typing import List
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
 
 import numpy as np
-from openai.types.audio import TranscriptionWord
-from scipy.io import wavfile
 
-
-def calculate_stereo_snr(audio_file_path, user_channel="left"):
+from mixedvoices.processors.audio import AudioBuffer
+from mixedvoices.processors.audio_quality import AudioQuality, analyze_audio_quality
+from mixedvoices.processors.timeline import AGENT, USER, WordTimeline
+
+# Keys of Recording.call_metrics computed for every recording
+BUILTIN_CALL_METRICS = (
+    "average_latency",
+    "p50_latency",
+    "p90_latency",
+    "p99_latency",
+    "user_interruptions_per_minute",
+    "agent_interruptions_per_minute",
+    "overlap_seconds",
+    "user_talk_ratio",
+    "agent_talk_ratio",
+    "wpm",
+    "user_snr",
+    "user_noise_floor",
+    "user_clipped_percent",
+    "agent_snr",
+    "agent_noise_floor",
+    "agent_clipped_percent",
+    "dead_air_seconds",
+    "longest_dead_air",
+)
+
+
+def calculate_stereo_snr(audio: Union[str, AudioBuffer], user_channel="left"):
     """
-    Calculate SNR for both channels of a stereo audio file.
-    Uses first 1000 samples for noise measurement.
+    Calculate SNR for both channels of a stereo audio file, from the energy of
+    speech frames over a percentile noise floor.
 
     Args:
-        audio_file_path (str): Path to the stereo audio file
+        audio (Union[str, AudioBuffer]): Stereo audio file path, or its decoded audio
 
     Returns:
         tuple: (user_channel_snr, agent_channel_snr)
     """
     try:
-        _, audio_data = wavfile.read(audio_file_path)
-        audio_data = audio_data.astype(float)
-        left_channel = audio_data[:, 0]
-        right_channel = audio_data[:, 1]
-
-        results = []
-        for channel in [left_channel, right_channel]:
-            signal_rms = np.sqrt(np.mean(channel**2))  # Calculate RMS of full signal
-            noise_sample = channel[:1000]  # Use first 1000 samples for noise
-            noise_rms = np.sqrt(np.mean(noise_sample**2))
-            if noise_rms > 0:
-                snr = 20 * np.log10(signal_rms / noise_rms)
-                results.append(f"{round(snr, 2)} dB")
-            else:
-                results.append("N/A")
-
-        if user_channel == "left":
-            return results[0], results[1]
-        else:
-            return results[1], results[0]
+        if isinstance(audio, str):
+            audio = AudioBuffer.from_file(audio)
+        summary = analyze_audio_quality(audio, user_channel).summary()
+        return summary["user_snr"], summary["agent_snr"]
     except Exception:
         print("Error calculating SNR")
         return "N/A", "N/A"
 
 
-def calculate_wpm(agent_words: List[TranscriptionWord]) -> float:
+def find_segments(
+    starts: np.ndarray, ends: np.ndarray, breaks: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split consecutive words into segments.
+
+    Args:
+        starts (np.ndarray): Start of each word
+        ends (np.ndarray): End of each word
+        breaks (np.ndarray): For each word but the first, whether it starts a segment
+
+    Returns:
+        tuple: Start, end and word count of each segment
+    """
+    if len(starts) == 0:
+        return starts, ends, np.zeros(0, dtype=np.int64)
+    first = np.flatnonzero(np.concatenate([[True], breaks]))
+    last = np.append(first[1:], len(starts)) - 1
+    return starts[first], ends[last], last - first + 1
+
+
+def calculate_wpm(words: WordTimeline) -> float:
     """
     Calculate the average Words Per Minute (WPM).
 
     Args:
-        words (List[TranscriptionWord]): List of TranscriptionWord objects
+        words (WordTimeline): Words of a single speaker
 
     Returns:
         float: Average WPM
     """
     try:
-        segments = []
-        current_segment = None
-
-        for word in agent_words:
-            if current_segment is None:
-                current_segment = {"start": word.start, "end": word.end, "words": 1}
-            else:
-                # If words are close (<1 second gap), consider them same segment
-                if word.start - current_segment["end"] < 1.0:
-                    current_segment["end"] = word.end
-                    current_segment["words"] += 1
-                else:
-                    segments.append(current_segment)
-                    current_segment = {"start": word.start, "end": word.end, "words": 1}
-
-        if current_segment is not None:
-            segments.append(current_segment)
-
-        if not segments:
+        if len(words) == 0:
             return 0.0
-
-        total_words = sum(segment["words"] for segment in segments)
-        total_duration = sum(segment["end"] - segment["start"] for segment in segments)
+        # Words less than a second apart are in the same segment
+        gaps = words.starts[1:] - words.ends[:-1]
+        segment_starts, segment_ends, counts = find_segments(
+            words.starts, words.ends, gaps >= 1.0
+        )
+        total_words = int(counts.sum())
+        total_duration = float(np.sum(segment_ends - segment_starts))
 
         return total_words / (total_duration / 60)
     except Exception:
@@ -84,98 +99,182 @@ def calculate_wpm(agent_words: List[TranscriptionWord]) -> float:
         return "N/A"
 
 
-def group_utterances(words: List[TranscriptionWord]) -> List[List[TranscriptionWord]]:
-    if not words:
-        return []
+def group_utterances(words: WordTimeline) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end of each utterance, words more than a second apart split them"""
+    gaps = words.starts[1:] - words.ends[:-1]
+    utterance_starts, utterance_ends, _ = find_segments(
+        words.starts, words.ends, gaps > 1.0
+    )
+    return utterance_starts, utterance_ends
 
-    utterances = []
-    current_utterance = [words[0]]
 
-    for word in words[1:]:
-        if word.start - current_utterance[-1].end > 1.0:
-            utterances.append(current_utterance)
-            current_utterance = [word]
-        else:
-            current_utterance.append(word)
+@dataclass
+class TurnTiming:
+    """Per turn timing of a call, from a single sweep over its utterances"""
+
+    latencies: np.ndarray
+    "Agent response latency of each turn in seconds, in call order."
+    overlaps: np.ndarray
+    "Duration of each stretch where both speakers talk over each other."
+    user_interruptions: int
+    agent_interruptions: int
+    user_talk_time: float
+    agent_talk_time: float
 
-    utterances.append(current_utterance)
-    return utterances
+    def to_dict(self, decimals: int = 3) -> dict:
+        """Compact form kept on the recording, times rounded to milliseconds"""
+        return {
+            "latencies": np.round(self.latencies, decimals).tolist(),
+            "overlaps": np.round(self.overlaps, decimals).tolist(),
+        }
+
+
+def analyze_turns(
+    timeline: WordTimeline, interruption_threshold: float = 0.2
+) -> TurnTiming:
+    """
+    Sweep the utterances of both speakers in order of start. An utterance
+    starting before the other speaker's latest utterance ended interrupts it,
+    one starting after it is a turn, with the gap as its latency. Agent turns
+    faster than interruption_threshold are counted as agent interruptions.
+
+    Args:
+        timeline: Words of the call
+        interruption_threshold: Threshold in seconds below which a response is considered an interruption
+    """  # noqa E501
+    user_starts, user_ends = group_utterances(timeline.channel(USER))
+    agent_starts, agent_ends = group_utterances(timeline.channel(AGENT))
+    # Agent first on equal starts, as in the timeline
+    starts = np.concatenate([agent_starts, user_starts])
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    ends = np.concatenate([agent_ends, user_ends])[order]
+    speakers = np.concatenate(
+        [np.full(len(agent_starts), AGENT), np.full(len(user_starts), USER)]
+    )[order]
+
+    # Latest end of each speaker's utterances before each utterance
+    latest_end = {}
+    for speaker in (USER, AGENT):
+        speaker_ends = np.where(speakers == speaker, ends, -np.inf)
+        latest_end[speaker] = np.concatenate(
+            [[-np.inf], np.maximum.accumulate(speaker_ends)[:-1]]
+        )
+    other_end = np.where(speakers == USER, latest_end[AGENT], latest_end[USER])
+
+    interrupts = starts < other_end
+    previous_speakers = np.concatenate([[-1], speakers[:-1]])
+    # The first utterance after the other speaker's, without talking over them
+    is_turn = ~interrupts & (previous_speakers == 1 - speakers)
+    gaps = starts - other_end
+    agent_turns = is_turn & (speakers == AGENT)
+    fast_turns = agent_turns & (gaps < interruption_threshold)
+
+    return TurnTiming(
+        latencies=gaps[agent_turns & ~fast_turns],
+        overlaps=np.minimum(ends, other_end)[interrupts] - starts[interrupts],
+        user_interruptions=int(np.sum(interrupts & (speakers == USER))),
+        agent_interruptions=int(
+            np.sum(interrupts & (speakers == AGENT)) + np.sum(fast_turns)
+        ),
+        user_talk_time=float(np.sum(user_ends - user_starts)),
+        agent_talk_time=float(np.sum(agent_ends - agent_starts)),
+    )
 
 
 def calculate_latency_and_interruptions(
-    user_words: List[TranscriptionWord],
-    agent_words: List[TranscriptionWord],
+    timeline: WordTimeline,
     duration: float,
     interruption_threshold: float = 0.2,
+    turns: Optional[TurnTiming] = None,
 ) -> dict:
     """
-    Calculate agent response latency and identify interruptions using a single pass.
+    Calculate agent response latency, its percentiles, interruptions, overlap and talk time.
 
     Args:
-        user_words: List of user TranscriptionWord objects
-        agent_words: List of agent TranscriptionWord objects
+        timeline: Words of the call
         duration: Total duration of the call in seconds
         interruption_threshold: Threshold in seconds below which a response is considered an interruption
+        turns: Turn timing already analyzed from timeline, analyzed here if not given
 
     Returns:
         Dictionary containing latency statistics and interruption data
-    """
+    """  # noqa E501
     try:
-        user_utterances = group_utterances(user_words)
-        agent_utterances = group_utterances(agent_words)
-
-        latencies = []
-        user_interruptions = 0
-        agent_interruptions = 0
-
-        i, j = 0, 0  # Pointers for user and agent utterances
-
-        while i < len(user_utterances) and j < len(agent_utterances):
-            user_utt = user_utterances[i]
-            agent_utt = agent_utterances[j]
-
-            user_start, user_end = user_utt[0].start, user_utt[-1].end
-            asst_start, asst_end = agent_utt[0].start, agent_utt[-1].end
-
-            # Check for overlaps and calculate latencies
-            if asst_start < user_start < asst_end:
-                user_interruptions += 1
-                i += 1
-            elif user_start < asst_start < user_end:
-                agent_interruptions += 1
-                j += 1
-            else:
-                # No overlap - check if it's a normal response
-                if asst_start > user_end:
-                    if asst_start - user_end >= interruption_threshold:
-                        latencies.append(asst_start - user_end)
-                    i += 1
-                else:
-                    j += 1
+        if turns is None:
+            turns = analyze_turns(timeline, interruption_threshold)
+        latencies = turns.latencies
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99]).tolist()
+        else:
+            p50 = p90 = p99 = 0
 
         return {
-            "average_latency": mean(latencies) if latencies else 0,
-            "user_interruptions_per_minute": user_interruptions / (duration / 60),
-            "agent_interruptions_per_minute": agent_interruptions
+            "average_latency": float(np.mean(latencies)) if len(latencies) else 0,
+            "p50_latency": p50,
+            "p90_latency": p90,
+            "p99_latency": p99,
+            "user_interruptions_per_minute": turns.user_interruptions / (duration / 60),
+            "agent_interruptions_per_minute": turns.agent_interruptions
             / (duration / 60),
+            "overlap_seconds": float(np.sum(turns.overlaps)),
+            "user_talk_ratio": turns.user_talk_time / duration,
+            "agent_talk_ratio": turns.agent_talk_time / duration,
         }
 
     except Exception:
         print("Error calculating latency and interruptions")
         return {
             "average_latency": "N/A",
+            "p50_latency": "N/A",
+            "p90_latency": "N/A",
+            "p99_latency": "N/A",
             "user_interruptions_per_minute": "N/A",
             "agent_interruptions_per_minute": "N/A",
+            "overlap_seconds": "N/A",
+            "user_talk_ratio": "N/A",
+            "agent_talk_ratio": "N/A",
         }
 
 
+def get_timing_metrics(
+    timeline: WordTimeline, duration, turns: Optional[TurnTiming] = None
+) -> dict:
+    """Call metrics computed from word timestamps alone, without the audio"""
+    res = calculate_latency_and_interruptions(timeline, duration, turns=turns)
+    res["wpm"] = calculate_wpm(timeline.channel(AGENT))
+    return res
+
+
 def get_call_metrics(
-    audio_file_path, user_words, agent_words, duration, user_channel="left"
+    audio: Union[str, AudioBuffer],
+    timeline: WordTimeline,
+    duration,
+    user_channel="left",
+    quality: Optional[AudioQuality] = None,
+    turns: Optional[TurnTiming] = None,
 ):
-    stereo_snr = calculate_stereo_snr(audio_file_path, user_channel)
-    wpm = calculate_wpm(agent_words)
-    res = calculate_latency_and_interruptions(user_words, agent_words, duration)
-    res["user_snr"] = stereo_snr[0]
-    res["agent_snr"] = stereo_snr[1]
-    res["wpm"] = wpm
+    """
+    Timing metrics of the call, with audio quality stats of both channels.
+
+    Args:
+        audio (Union[str, AudioBuffer]): Stereo audio file path, or its decoded audio
+        timeline (WordTimeline): Words of the call
+        duration: Duration of the call in seconds
+        user_channel (str): Channel containing user audio ("left" or "right")
+        quality (Optional[AudioQuality]): Audio quality already analyzed from
+            audio, analyzed here if not given. Defaults to None.
+        turns (Optional[TurnTiming]): Turn timing already analyzed from timeline,
+            analyzed here if not given. Defaults to None.
+    """
+    res = get_timing_metrics(timeline, duration, turns)
+    try:
+        if quality is None:
+            if isinstance(audio, str):
+                audio = AudioBuffer.from_file(audio)
+            quality = analyze_audio_quality(audio, user_channel)
+        res.update(quality.summary())
+    except Exception:
+        print("Error calculating audio quality")
+        res["user_snr"] = res["agent_snr"] = "N/A"
     return res
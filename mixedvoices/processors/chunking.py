@@ -0,0 +1,86 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Sequence, TypeVar
+
+from mixedvoices import models
+from mixedvoices.processors.routing import estimate_tokens
+from mixedvoices.utils import submit_with_context
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Turns produced by create_combined_transcript look like "12. bot: Hello there"
+TURN_START_PATTERN = re.compile(r"^\s*\d+\.\s")
+CHUNK_WORKERS = 4
+
+
+def should_chunk(transcript: str) -> bool:
+    """Whether a transcript is long enough to be analyzed in chunks"""
+    return (
+        models.TRANSCRIPT_CHUNKING == "auto"
+        and estimate_tokens(transcript) > models.TRANSCRIPT_CHUNK_TOKENS
+    )
+
+
+def split_into_turns(transcript: str) -> List[str]:
+    """Split transcript into numbered turns, unnumbered lines stay with their turn"""
+    turns: List[str] = []
+    for line in transcript.split("\n"):
+        if not turns or TURN_START_PATTERN.match(line):
+            turns.append(line)
+        else:
+            turns[-1] = f"{turns[-1]}\n{line}"
+    return turns
+
+
+def split_transcript(transcript: str, max_tokens: int) -> List[str]:
+    """
+    Split transcript into chunks of whole turns, each under max_tokens when possible.
+    A single turn longer than max_tokens becomes a chunk of its own.
+
+    Args:
+        transcript (str): Transcript, ideally numbered as by create_combined_transcript
+        max_tokens (int): Maximum estimated tokens per chunk
+
+    Returns:
+        List[str]: Chunks in transcript order, turn numbering is kept as is
+    """
+    chunks: List[str] = []
+    current_turns: List[str] = []
+    current_tokens = 0
+    for turn in split_into_turns(transcript):
+        turn_tokens = estimate_tokens(turn)
+        if current_turns and current_tokens + turn_tokens > max_tokens:
+            chunks.append("\n".join(current_turns))
+            current_turns, current_tokens = [], 0
+        current_turns.append(turn)
+        current_tokens += turn_tokens
+    if current_turns:
+        chunks.append("\n".join(current_turns))
+    return chunks
+
+
+def map_in_parallel(func: Callable[[T], R], items: Sequence[T]) -> List[R]:
+    """Apply func to each item in parallel threads, results keep the items' order"""
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(
+        max_workers=min(CHUNK_WORKERS, len(items)), thread_name_prefix="Chunk"
+    ) as executor:
+        futures = [submit_with_context(executor, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def stitch_step_names(chunk_step_names: List[List[str]]) -> List[str]:
+    """Join steps extracted from consecutive chunks into a single ordered path.
+
+    A step that continues across a chunk boundary shows up at the end of one
+    chunk and the start of the next, so it is only kept once.
+    """
+    stitched: List[str] = []
+    for step_names in chunk_step_names:
+        for i, step_name in enumerate(step_names):
+            if i == 0 and stitched and stitched[-1] == step_name:
+                continue
+            stitched.append(step_name)
+    return stitched
@@ -0,0 +1,219 @@
+import atexit
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy.io import wavfile
+
+from mixedvoices import models
+from mixedvoices.metrics.call_metric import CallMetric
+from mixedvoices.processors.audio import AudioBuffer
+from mixedvoices.processors.timeline import WordTimeline
+from mixedvoices.utils import get_time_remaining
+
+# How often running metrics are checked against their timeouts
+TIMEOUT_POLL_SECONDS = 0.1
+
+
+class CallMetricTimeoutError(TimeoutError):
+    """A custom call metric ran for longer than its timeout"""
+
+
+# Audio last mapped in each worker process, shared by a recording's metrics
+_AUDIO: Optional[Tuple[Tuple[str, int], AudioBuffer]] = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+@contextmanager
+def shared_audio_path(audio: AudioBuffer) -> Iterator[str]:
+    """
+    Path of a WAV file worker processes memory map the decoded audio from. It's
+    the recording's own file if the audio is already mapped from it, else the
+    samples are written once to a temporary file instead of decoded per worker.
+    """
+    if audio.mapped_path is not None:
+        yield audio.mapped_path
+        return
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        wavfile.write(path, audio.sample_rate, audio.samples.T)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Still mapped by a worker, on Windows
+
+
+def _get_audio(audio_path: str) -> AudioBuffer:
+    global _AUDIO
+    # A temporary file's path may be reused by a later recording
+    key = (audio_path, os.stat(audio_path).st_mtime_ns)
+    if _AUDIO is None or _AUDIO[0] != key:
+        _AUDIO = (key, AudioBuffer.from_file(audio_path))
+    return _AUDIO[1]
+
+
+def _run_in_worker(
+    call_metric: CallMetric,
+    audio_path: str,
+    timeline: WordTimeline,
+    user_channel: str,
+) -> Any:
+    """Runs in a worker process, audio is memory mapped there instead of pickled"""
+    function = call_metric.load_function()
+    value = function(_get_audio(audio_path), timeline, user_channel)
+    # NumPy values as Python ones, so they can be saved as JSON
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return value
+
+
+def get_call_metric_pool() -> ProcessPoolExecutor:
+    """Process pool running custom call metrics, sized by CALL_METRIC_PROCESSES"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, as forking a process with running threads isn't safe
+            _pool = ProcessPoolExecutor(
+                max_workers=max(models.CALL_METRIC_PROCESSES, 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_call_metric_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+atexit.register(shutdown_call_metric_pool)
+
+
+def discard_call_metric_pool(pool: ProcessPoolExecutor, terminate: bool = False):
+    """
+    Drop a pool, so the next get_call_metric_pool starts new workers. Its workers
+    are terminated if one is stuck running a metric past its timeout.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    processes = list((pool._processes or {}).values()) if terminate else []
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def run_custom_call_metrics(
+    call_metrics: List[CallMetric],
+    audio: AudioBuffer,
+    timeline: WordTimeline,
+    user_channel="left",
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Run a project's custom call metrics in parallel in the process pool.
+
+    Args:
+        call_metrics (List[CallMetric]): Custom call metrics of the project
+        audio (AudioBuffer): Decoded stereo audio of the recording
+        timeline (WordTimeline): Words of the call
+        user_channel (str): Channel containing user audio ("left" or "right")
+
+    Returns:
+        tuple: Value of each metric by name, "N/A" for metrics that failed or
+            timed out, and the error of each of those by name
+
+    Raises:
+        DeadlineExceededError: If the task's deadline passes while waiting
+    """
+    results: Dict[str, Any] = {}
+    failures: Dict[str, str] = {}
+
+    def record_failure(name: str, error: Exception):
+        print(f"Error calculating call metric {name}: {error}")
+        results[name] = "N/A"
+        failures[name] = f"{type(error).__name__}: {error}"
+
+    with shared_audio_path(audio) as audio_path:
+        futures: Dict[str, Tuple[CallMetric, ProcessPoolExecutor, Future]] = {}
+        try:
+            for call_metric in call_metrics:
+                pool = get_call_metric_pool()
+                try:
+                    future = pool.submit(
+                        _run_in_worker, call_metric, audio_path, timeline, user_channel
+                    )
+                except BrokenProcessPool as e:
+                    # Later metrics are submitted to a new pool
+                    discard_call_metric_pool(pool)
+                    record_failure(call_metric.name, e)
+                    continue
+                futures[call_metric.name] = (call_metric, pool, future)
+            _wait_for_metrics(futures, results, record_failure)
+        finally:
+            # A pool with a metric still running has a worker stuck on it
+            stuck_pools = {
+                pool: None
+                for _, pool, future in futures.values()
+                if not future.cancel() and not future.done()
+            }
+            for pool in stuck_pools:
+                discard_call_metric_pool(pool, terminate=True)
+    return results, failures
+
+
+def _wait_for_metrics(
+    futures: Dict[str, Tuple[CallMetric, ProcessPoolExecutor, Future]],
+    results: Dict[str, Any],
+    record_failure,
+):
+    """
+    Collect results of metrics as they finish. Timeouts are enforced here rather
+    than in the workers, counted from when a metric was handed to a worker.
+    """
+    started: Dict[str, float] = {}
+    pending = dict(futures)
+    while pending:
+        timeout = get_time_remaining()
+        now = time.monotonic()
+        for name, (call_metric, pool, future) in list(pending.items()):
+            if future.done():
+                del pending[name]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        # A worker died, e.g. a metric crashed or ran out of memory
+                        discard_call_metric_pool(pool)
+                    record_failure(name, e)
+            elif future.running():
+                started.setdefault(name, now)
+                if now - started[name] >= call_metric.timeout:
+                    # Left running, its pool is restarted once all metrics finish
+                    del pending[name]
+                    record_failure(
+                        name,
+                        CallMetricTimeoutError(
+                            f"Timed out after {call_metric.timeout:g}s"
+                        ),
+                    )
+        if pending:
+            wait(
+                [future for _, _, future in pending.values()],
+                timeout=min(TIMEOUT_POLL_SECONDS, timeout or TIMEOUT_POLL_SECONDS),
+                return_when=FIRST_COMPLETED,
+            )
@@ -0,0 +1,218 @@
+import asyncio
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Iterator, Optional, Union
+
+import aiohttp
+import requests
+from httpx import RequestError
+from requests.adapters import HTTPAdapter
+
+from mixedvoices import models
+from mixedvoices.core.circuit_breaker import get_breaker, is_outage_error
+from mixedvoices.utils import DeadlineExceededError, get_timeout
+
+DEEPGRAM_URL = "https://api.deepgram.com/v1/listen"
+DEEPGRAM_PARAMS = {
+    "utterances": "true",
+    "multichannel": "true",
+    "punctuate": "true",
+    "model": "nova-2",
+    "numerals": "true",
+}
+# Retries of a request that failed with 429, 5xx or a connection error
+MAX_RETRIES = 3
+BASE_RETRY_SECONDS = 1.0
+MAX_RETRY_SECONDS = 30.0
+
+
+@dataclass
+class DeepgramUpload:
+    """Audio to send to Deepgram, a file path is streamed from disk"""
+
+    source: Union[str, bytes]
+    content_type: str = "audio/wav"
+
+    @contextmanager
+    def open(self) -> Iterator[Union[IO[bytes], bytes]]:
+        """Body of a single attempt, files are reopened so retries start over"""
+        if isinstance(self.source, bytes):
+            yield self.source
+        else:
+            with open(self.source, "rb") as f:
+                yield f
+
+
+def get_api_key() -> str:
+    api_key = os.getenv("DEEPGRAM_API_KEY")
+    if not api_key:
+        raise ValueError("DEEPGRAM_API_KEY environment variable not set")
+    return api_key
+
+
+def get_retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying a failed attempt, None if it can't be retried"""
+    if not is_outage_error(error) or attempt >= MAX_RETRIES:
+        return None
+    delay = min(BASE_RETRY_SECONDS * 2**attempt, MAX_RETRY_SECONDS)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    retry_after = (headers or {}).get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        delay = min(float(retry_after), MAX_RETRY_SECONDS)
+    try:
+        if delay >= get_timeout():  # Task deadline would pass while waiting
+            return None
+    except DeadlineExceededError:
+        return None
+    return delay
+
+
+class DeepgramClient:
+    """
+    Client for Deepgram's pre-recorded audio API. Keeps one pooled session,
+    so connections and TLS sessions are reused across recordings.
+
+    Args:
+        url (str): Endpoint to send audio to
+    """
+
+    def __init__(self, url: str = DEEPGRAM_URL):
+        self.url = url
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                # Enough connections for every transcription worker
+                adapter = HTTPAdapter(pool_maxsize=max(models.TRANSCRIPTION_WORKERS, 1))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def listen(self, upload: DeepgramUpload) -> dict:
+        """
+        Transcribe audio, retrying with backoff while Deepgram is overloaded.
+
+        Raises:
+            ProviderUnavailableError: If Deepgram is still down after retries
+            RequestError: If the request failed for any other reason
+        """
+        headers = {
+            "Authorization": f"Token {get_api_key()}",
+            "Content-Type": upload.content_type,
+        }
+        try:
+            # All attempts of a request count as a single call to the circuit
+            with get_breaker("deepgram").guard():
+                return self._post(upload, headers)
+        except requests.exceptions.RequestException as e:
+            raise RequestError(f"API request failed: {str(e)}") from e
+
+    def _post(self, upload: DeepgramUpload, headers: dict) -> dict:
+        attempt = 0
+        while True:
+            try:
+                with upload.open() as body:
+                    response = self.session.post(
+                        self.url,
+                        params=DEEPGRAM_PARAMS,
+                        headers=headers,
+                        data=body,
+                        timeout=get_timeout(),
+                    )
+                    response.raise_for_status()
+                return response.json()
+            except requests.exceptions.RequestException as e:
+                delay = get_retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    def close(self):
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+
+class AsyncDeepgramClient:
+    """
+    Async variant of DeepgramClient, for use inside an event loop.
+    Use as an async context manager so its session is closed.
+
+    Args:
+        url (str): Endpoint to send audio to
+    """
+
+    def __init__(self, url: str = DEEPGRAM_URL):
+        self.url = url
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncDeepgramClient":
+        connector = aiohttp.TCPConnector(limit=max(models.TRANSCRIPTION_WORKERS, 1))
+        self._session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def listen(self, upload: DeepgramUpload) -> dict:
+        """
+        Transcribe audio, retrying with backoff while Deepgram is overloaded.
+
+        Raises:
+            ProviderUnavailableError: If Deepgram is still down after retries
+            RequestError: If the request failed for any other reason
+        """
+        if self._session is None:
+            raise ValueError("Use AsyncDeepgramClient as an async context manager")
+        headers = {
+            "Authorization": f"Token {get_api_key()}",
+            "Content-Type": upload.content_type,
+        }
+        try:
+            # All attempts of a request count as a single call to the circuit
+            with get_breaker("deepgram").guard():
+                return await self._post(upload, headers)
+        except aiohttp.ClientError as e:
+            raise RequestError(f"API request failed: {str(e)}") from e
+
+    async def _post(self, upload: DeepgramUpload, headers: dict) -> dict:
+        attempt = 0
+        while True:
+            try:
+                with upload.open() as body:
+                    async with self._session.post(
+                        self.url,
+                        params=DEEPGRAM_PARAMS,
+                        headers=headers,
+                        data=body,
+                        timeout=aiohttp.ClientTimeout(total=get_timeout()),
+                        raise_for_status=True,
+                    ) as response:
+                        return await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = get_retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def close(self):
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+
+DEEPGRAM_CLIENT = DeepgramClient()
+atexit.register(DEEPGRAM_CLIENT.close)
@@ -1,9 +1,17 @@
-from typing import List
+from statistics import mean
+from typing import List, Optional
 
 from mixedvoices import models
+from mixedvoices.core.circuit_breaker import get_breaker
 from mixedvoices.metrics.metric import Metric
+from mixedvoices.processors.chunking import (
+    map_in_parallel,
+    should_chunk,
+    split_transcript,
+)
+from mixedvoices.processors.routing import get_model
 from mixedvoices.processors.utils import parse_explanation_response
-from mixedvoices.utils import get_openai_client
+from mixedvoices.utils import get_openai_client, get_timeout
 
 
 def analyze_metric(transcript: str, prompt: str, metric: Metric):
@@ -31,30 +39,117 @@ def analyze_metric(transcript: str, prompt: str, metric: Metric):
     """  # noqa E501
 
     num_tries = 3
-    for _ in range(num_tries):
+    for attempt in range(num_tries):
+        # Retries after invalid output escalate to the stage's configured model
+        model = get_model("metrics", transcript, escalate=attempt > 0)
         try:
+            with get_breaker("openai").guard():
+                response = client.chat.completions.create(
+                    model=model,
+                    timeout=get_timeout(),
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You're an expert at analyzing transcripts",  # noqa E501,
+                        },
+                        {"role": "user", "content": prompt},
+                        {"role": "assistant", "content": "Output:-"},
+                    ],
+                )
+
+            result = parse_explanation_response(response.choices[0].message.content)
+            if result["score"] in expected_values:
+                return result
+            raise ValueError(f"Unexpected score: {result['score']}")
+        except ValueError as e:
+            # Provider errors propagate, only invalid output is worth a retry
+            print(f"Error parsing metric: {e}")
+
+
+def combine_chunk_scores(metric: Metric, chunk_results: List[dict]) -> dict:
+    """Deterministic fallback for combining scores of a transcript's chunks"""
+    scores = [r["score"] for r in chunk_results if r["score"] != "N/A"]
+    explanation = " ".join(
+        f"Part {i + 1}: {r['explanation']}" for i, r in enumerate(chunk_results)
+    )
+    if not scores:
+        score = "N/A"
+    elif metric.scoring == "binary":
+        score = "FAIL" if "FAIL" in scores else "PASS"
+    else:
+        score = round(mean(scores))
+    return {"explanation": explanation, "score": score}
+
+
+def aggregate_chunk_scores(metric: Metric, chunk_results: List[Optional[dict]]):
+    """Reduce scores of a transcript's chunks into one score using the small model"""
+    chunk_results = [r for r in chunk_results if r is not None]
+    if not chunk_results:
+        return {"explanation": "Analysis failed", "score": "N/A"}
+    if len(chunk_results) == 1:
+        return chunk_results[0]
+
+    expected_values = metric.expected_values
+    part_results = "\n".join(
+        f"Part {i + 1}: Score: {r['score']}, Explanation: {r['explanation']}"
+        for i, r in enumerate(chunk_results)
+    )
+    prompt = f"""A transcript was split into {len(chunk_results)} consecutive parts and each part was scored on {metric.name}.
+    Metric:
+    {metric.definition}
+    Expected Score Values: {expected_values}
+
+    Part results:
+    {part_results}
+
+    Respond with short 1 line explanation of how the bot performed on {metric.name} over the whole call, followed by score.
+    >Format example
+
+    Output:-
+    Explanation: Lorem ipsum
+    Score:
+    """  # noqa E501
+
+    try:
+        client = get_openai_client()
+        with get_breaker("openai").guard():
             response = client.chat.completions.create(
-                model=models.METRICS_MODEL,
+                model=models.ROUTING_SMALL_MODEL,
+                timeout=get_timeout(),
                 messages=[
                     {
                         "role": "system",
-                        "content": "You're an expert at analyzing transcripts",  # noqa E501,
+                        "content": "You're an expert at combining "
+                        "analyses of transcripts",
                     },
                     {"role": "user", "content": prompt},
                     {"role": "assistant", "content": "Output:-"},
                 ],
             )
+        result = parse_explanation_response(response.choices[0].message.content)
+        if result["score"] in expected_values:
+            return result
+        raise ValueError(f"Unexpected score: {result['score']}")
+    except ValueError as e:
+        print(f"Error aggregating metric: {e}")
+        return combine_chunk_scores(metric, chunk_results)
 
-            result = parse_explanation_response(response.choices[0].message.content)
-            if result["score"] in expected_values:
-                return result
-            raise ValueError(f"Unexpected score: {result['score']}")
-        except ValueError as e:
-            print(f"Error parsing metric: {e}")
-        except Exception as e:
-            print(f"Error analyzing metric: {e}")
-            return {"explanation": "Analysis failed", "score": "N/A"}
+
+def generate_chunked_scores(transcript: str, prompt: str, metrics: List[Metric]):
+    """Score each chunk of a long transcript in parallel, then reduce per metric"""
+    chunks = split_transcript(transcript, models.TRANSCRIPT_CHUNK_TOKENS)
+    jobs = [(metric, chunk) for metric in metrics for chunk in chunks]
+    results = map_in_parallel(lambda job: analyze_metric(job[1], prompt, job[0]), jobs)
+    num_chunks = len(chunks)
+    return {
+        metric.name: aggregate_chunk_scores(
+            metric, results[i * num_chunks : (i + 1) * num_chunks]
+        )
+        for i, metric in enumerate(metrics)
+    }
 
 
 def generate_scores(transcript: str, prompt: str, metrics: List[Metric]):
+    if should_chunk(transcript):
+        return generate_chunked_scores(transcript, prompt, metrics)
     return {m.name: analyze_metric(transcript, prompt, m) for m in metrics}
@@ -0,0 +1,162 @@
+import atexit
+import importlib.util
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+import numpy as np
+from openai.types.audio import TranscriptionWord
+
+from mixedvoices import models
+from mixedvoices.processors.audio import AudioBuffer, resample, to_float32
+from mixedvoices.processors.timeline import WordTimeline
+from mixedvoices.processors.transcriber import create_combined_transcript
+from mixedvoices.utils import DeadlineExceededError, get_time_remaining
+
+# Whisper models expect 16 kHz mono float32 audio
+WHISPER_SAMPLE_RATE = 16000
+# 8 bit weights, the fastest compute type on CPUs
+COMPUTE_TYPE = "int8"
+
+# Model loaded once in each worker process
+_MODEL = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_model_size(transcription_model: str) -> str:
+    """Whisper model size of a local TRANSCRIPTION_MODEL, like local/whisper-base"""
+    prefix = "local/whisper-"
+    if not transcription_model.startswith(prefix):
+        raise ValueError(f"Not a local transcription model: {transcription_model}")
+    return transcription_model[len(prefix) :]
+
+
+def _load_model(model_size: str, cpu_threads: int):
+    global _MODEL
+    from faster_whisper import WhisperModel
+
+    _MODEL = WhisperModel(
+        model_size, device="cpu", compute_type=COMPUTE_TYPE, cpu_threads=cpu_threads
+    )
+
+
+def _transcribe_in_worker(
+    samples: np.ndarray, vad_filter: bool
+) -> List[Tuple[str, float, float]]:
+    """Runs in a worker process, returns (word, start, end) of each word"""
+    segments, _ = _MODEL.transcribe(
+        samples, word_timestamps=True, vad_filter=vad_filter
+    )
+    return [
+        (word.word.strip(), word.start, word.end)
+        for segment in segments
+        for word in segment.words
+    ]
+
+
+def get_local_pool() -> ProcessPoolExecutor:
+    """
+    Process pool with the model loaded in each worker. Sized by
+    LOCAL_TRANSCRIPTION_PROCESSES, with the CPU's cores split between workers.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Checked here, as an import error in a worker only breaks the pool
+            if importlib.util.find_spec("faster_whisper") is None:
+                raise ImportError(
+                    "Local transcription needs faster-whisper. "
+                    "Install it with: pip install 'mixedvoices[local]'"
+                )
+            processes = max(models.LOCAL_TRANSCRIPTION_PROCESSES, 1)
+            cpu_threads = max((os.cpu_count() or 1) // processes, 1)
+            # Spawned, as forking a process with running threads isn't safe
+            _pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_model,
+                initargs=(get_model_size(models.TRANSCRIPTION_MODEL), cpu_threads),
+            )
+        return _pool
+
+
+def shutdown_local_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+atexit.register(shutdown_local_pool)
+
+
+def discard_local_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool, so the next get_local_pool starts new workers"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def submit_local(samples: np.ndarray, sample_rate: int) -> Future:
+    """Transcribe a channel in the process pool"""
+    samples = to_float32(resample(samples, sample_rate, WHISPER_SAMPLE_RATE))
+    vad_filter = models.TRANSCRIPTION_VAD == "on"
+    return get_local_pool().submit(_transcribe_in_worker, samples, vad_filter)
+
+
+def get_words(future: Future) -> List[TranscriptionWord]:
+    """
+    Raises:
+        DeadlineExceededError: If the task's deadline passes while waiting
+    """
+    try:
+        words = future.result(timeout=get_time_remaining())
+    except FutureTimeoutError as e:
+        raise DeadlineExceededError("Task deadline exceeded") from e
+    return [TranscriptionWord(word=w, start=start, end=end) for w, start, end in words]
+
+
+def transcribe_channels(
+    audio: AudioBuffer, user_idx: int
+) -> List[List[TranscriptionWord]]:
+    futures: List[Future] = []
+    try:
+        for channel_idx in [user_idx, 1 - user_idx]:
+            futures.append(submit_local(audio.channel(channel_idx), audio.sample_rate))
+        return [get_words(future) for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def transcribe_and_combine_local(audio: AudioBuffer, user_channel="left"):
+    """
+    Transcribe both channels with a local Whisper model, in parallel processes.
+    If a worker dies, the pool is started again once before failing.
+
+    Args:
+        audio (AudioBuffer): Decoded stereo audio of the recording
+        user_channel (str): Channel containing user audio ("left" or "right")
+
+    Raises:
+        BrokenProcessPool: If a worker died in the new pool too
+    """
+    user_idx = 0 if user_channel == "left" else 1
+    pool = get_local_pool()
+    try:
+        user_words, agent_words = transcribe_channels(audio, user_idx)
+    except BrokenProcessPool:
+        # A worker died, e.g. killed for running out of memory
+        discard_local_pool(pool)
+        user_words, agent_words = transcribe_channels(audio, user_idx)
+    timeline = WordTimeline.from_words(user_words, agent_words)
+    return create_combined_transcript(timeline), timeline
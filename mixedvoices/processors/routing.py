@@ -0,0 +1,61 @@
+from mixedvoices import models
+
+# Model configured for each stage, used as is when routing is fixed or on escalation
+STAGE_MODELS = {
+    "metrics": "METRICS_MODEL",
+    "success": "SUCCESS_MODEL",
+    "summary": "SUMMARY_MODEL",
+    "steps": "STEPS_MODEL",
+}
+
+# How much longer than the base threshold a transcript can be for each stage
+# before the small model stops being trusted with it
+STAGE_THRESHOLD_SCALE = {
+    "metrics": 1.0,
+    "success": 1.0,
+    "summary": 2.0,
+    "steps": 0.5,
+}
+
+BUDGET_THRESHOLD_SCALE = {
+    "cost": 2.0,
+    "balanced": 1.0,
+    "quality": 0.5,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, English text averages ~4 characters per token"""
+    return len(text or "") // 4
+
+
+def get_model(stage: str, transcript: str = "", escalate: bool = False) -> str:
+    """
+    Pick the model to use for a stage of analysis.
+
+    With adaptive routing, short transcripts go to the small model, while longer
+    ones, and retries after the small model's output failed validation, go to the
+    model configured for the stage.
+
+    Args:
+        stage (str): One of "metrics", "success", "summary", "steps"
+        transcript (str): Transcript that will be sent to the model
+        escalate (bool): If True, always use the model configured for the stage
+
+    Returns:
+        str: Name of the model
+    """
+    if stage not in STAGE_MODELS:
+        raise ValueError(f"Unknown stage {stage}")
+    stage_model = getattr(models, STAGE_MODELS[stage])
+    if escalate or models.MODEL_ROUTING != "adaptive":
+        return stage_model
+
+    threshold = (
+        models.ROUTING_TOKEN_THRESHOLD
+        * BUDGET_THRESHOLD_SCALE[models.ROUTING_BUDGET]
+        * STAGE_THRESHOLD_SCALE[stage]
+    )
+    if estimate_tokens(transcript) <= threshold:
+        return models.ROUTING_SMALL_MODEL
+    return stage_model
@@ -0,0 +1,76 @@
+import math
+import re
+from typing import Dict, List, Set
+
+from mixedvoices.processors.utils import STANDARD_STEP_NAMES, STANDARD_STEPS
+
+# Weight of a step's usage, relative to how well its name matches the transcript
+FREQUENCY_WEIGHT = 0.3
+# Words are cut to this many characters, so apology matches apologize
+STEM_LENGTH = 5
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in is it of on or the to with".split()
+)
+# Line labels of combined transcripts, like "3. bot:"
+SPEAKER_LABEL = re.compile(r"^\s*\d+\.\s*(bot|user):", re.MULTILINE)
+# Names offered to the model for every transcript, they need no candidate slot
+OFFERED_STEP_NAMES = STANDARD_STEP_NAMES | {
+    variant for step in STANDARD_STEPS for variant in step["variants"] or []
+}
+
+
+def get_stems(text: str) -> Set[str]:
+    words = re.findall(r"[a-z][a-z0-9]*", text.lower())
+    return {word[:STEM_LENGTH] for word in words if word not in STOP_WORDS}
+
+
+def select_step_candidates(
+    script: str, step_counts: Dict[str, int], limit: int
+) -> List[str]:
+    """
+    Pick the existing steps most likely to be reused for a transcript, to offer
+    to the steps model alongside the standard steps.
+
+    Steps are ranked by the words of their name found in the transcript, each
+    weighted by how rare it is among step names, plus a smaller weight for how
+    many calls went through them.
+
+    Args:
+        script (str): The transcript
+        step_counts (Dict[str, int]): Calls through each existing step name
+        limit (int): Maximum number of steps to return
+
+    Returns:
+        List[str]: Selected step names, most used first, so the prompt changes
+            little between similar transcripts
+    """
+    counts = {
+        name: count
+        for name, count in step_counts.items()
+        if name not in OFFERED_STEP_NAMES
+    }
+    if len(counts) > limit:
+        name_stems = {name: get_stems(name) for name in counts}
+        document_frequency: Dict[str, int] = {}
+        for stems in name_stems.values():
+            for stem in stems:
+                document_frequency[stem] = document_frequency.get(stem, 0) + 1
+        weights = {
+            stem: math.log(1 + len(counts) / frequency)
+            for stem, frequency in document_frequency.items()
+        }
+        script_stems = get_stems(SPEAKER_LABEL.sub("", script))
+        max_usage = math.log1p(max(counts.values()))
+
+        # Weight of a word used by a single step
+        max_weight = math.log(1 + len(counts))
+
+        def score(name: str) -> float:
+            matched = name_stems[name] & script_stems
+            relevance = sum(weights[stem] for stem in matched) / max_weight
+            usage = math.log1p(counts[name]) / max_usage if max_usage else 0.0
+            return relevance + FREQUENCY_WEIGHT * usage
+
+        ranked = sorted(counts, key=lambda name: (-score(name), name))
+        counts = {name: counts[name] for name in ranked[: max(limit, 0)]}
+    return sorted(counts, key=lambda name: (-counts[name], name))
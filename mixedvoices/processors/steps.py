@@ -1,8 +1,16 @@
 from typing import List, Optional
 
 from mixedvoices import models
+from mixedvoices.core.circuit_breaker import get_breaker
+from mixedvoices.processors.chunking import (
+    map_in_parallel,
+    should_chunk,
+    split_transcript,
+    stitch_step_names,
+)
+from mixedvoices.processors.routing import get_model
 from mixedvoices.processors.utils import get_standard_steps_string
-from mixedvoices.utils import get_openai_client
+from mixedvoices.utils import get_openai_client, get_timeout
 
 
 def script_to_step_names(
@@ -17,21 +25,56 @@ def script_to_step_names(
         List[str]: Ordered list of steps for the flow chart
     """
     standard_steps_list_str = get_standard_steps_string(existing_step_names)
+    if should_chunk(script):
+        chunks = split_transcript(script, models.TRANSCRIPT_CHUNK_TOKENS)
+        chunk_step_names = map_in_parallel(
+            lambda chunk: extract_step_names(chunk, standard_steps_list_str), chunks
+        )
+        return stitch_step_names(chunk_step_names)
+    return extract_step_names(script, standard_steps_list_str)
+
+
+def extract_step_names(script: str, standard_steps_list_str: str) -> List[str]:
+    model = get_model("steps", script)
+    response_text = get_steps_response(script, standard_steps_list_str, model)
+    escalated_model = get_model("steps", script, escalate=True)
+    if not is_valid_steps_response(response_text) and escalated_model != model:
+        print(f"Invalid steps from {model}, retrying with {escalated_model}")
+        response_text = get_steps_response(
+            script, standard_steps_list_str, escalated_model
+        )
+    return parse_step_names(response_text)
+
+
+def is_valid_steps_response(response_text: str) -> bool:
+    if "#Output#" not in response_text:
+        return False
+    return all(parse_step_names(response_text))
+
+
+def parse_step_names(response_text: str) -> List[str]:
+    final_steps_section = response_text.split("#Output#")[-1].strip()
+    return [step.strip() for step in final_steps_section.split(",")]
+
+
+def get_steps_response(script: str, standard_steps_list_str: str, model: str):
     client = get_openai_client()
     try:
-        completion = client.chat.completions.create(
-            model=models.STEPS_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You're an expert at analyzing transcripts and "
-                    "breaking them into essential, reusable flow chart steps. "
-                    "GOAL: create steps that can be used to analyze "
-                    "patterns across multiple transcripts.",
-                },
-                {
-                    "role": "system",
-                    "content": f"""Rules for creating steps:
+        with get_breaker("openai").guard():
+            completion = client.chat.completions.create(
+                model=model,
+                timeout=get_timeout(),
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You're an expert at analyzing transcripts and "
+                        "breaking them into essential, reusable flow chart steps. "
+                        "GOAL: create steps that can be used to analyze "
+                        "patterns across multiple transcripts.",
+                    },
+                    {
+                        "role": "system",
+                        "content": f"""Rules for creating steps:
                     - Focus on the core flow
                     - 1-6 words and self-explanatory name
                     - Combine related exchanges into single meaningful steps
@@ -66,22 +109,20 @@ def script_to_step_names(
 
                     {standard_steps_list_str}
                     """,
-                },
-                {
-                    "role": "user",
-                    "content": f"Transcript: {script}",
-                },
-                {
-                    "role": "assistant",
-                    "content": "#Thinking#",
-                },
-            ],
-            temperature=0,
-        )
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Transcript: {script}",
+                    },
+                    {
+                        "role": "assistant",
+                        "content": "#Thinking#",
+                    },
+                ],
+                temperature=0,
+            )
 
-        response_text = completion.choices[0].message.content
-        final_steps_section = response_text.split("#Output#")[-1].strip()
-        return [step.strip() for step in final_steps_section.split(",")]
+        return completion.choices[0].message.content
     except Exception as e:
         print(f"Error processing script: {str(e)}")
         raise
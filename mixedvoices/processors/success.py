@@ -1,26 +1,119 @@
+from typing import List, Optional
+
 from mixedvoices import models
+from mixedvoices.core.circuit_breaker import get_breaker
+from mixedvoices.processors.chunking import (
+    map_in_parallel,
+    should_chunk,
+    split_transcript,
+)
+from mixedvoices.processors.routing import get_model
 from mixedvoices.processors.utils import parse_explanation_response
-from mixedvoices.utils import get_openai_client
+from mixedvoices.utils import get_openai_client, get_timeout
 
 
-# TODO check for prompt injection
 def get_success(transcript: str, success_criteria: str):
+    if should_chunk(transcript):
+        return get_chunked_success(transcript, success_criteria)
+    return assess_success(transcript, success_criteria)
+
+
+# TODO check for prompt injection
+def assess_success(
+    transcript: str, success_criteria: str, part_note: Optional[str] = None
+):
     client = get_openai_client()
+    # Escalate to the stage's configured model if the routed one gives invalid output
+    models_to_try = [get_model("success", transcript)]
+    escalated_model = get_model("success", transcript, escalate=True)
+    if escalated_model not in models_to_try:
+        models_to_try.append(escalated_model)
+
+    for model in models_to_try:
+        try:
+            with get_breaker("openai").guard():
+                response = client.chat.completions.create(
+                    model=model,
+                    timeout=get_timeout(),
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You're an expert at assessing whether a call b/w human and AI was successful. "
+                            "Output a short explanation in under 5 words along with TRUE or FALSE or N/A",
+                        },
+                        {
+                            "role": "user",
+                            "content": f"""
+                        Transcript:
+                        ---
+                        {transcript}
+                        ---
+
+                        Success Criteria:
+                        ---
+                        {success_criteria}
+                        ---
+                        {part_note or ""}
+
+                        Format example
+
+                        Output:-
+                        Explanation: Lorem ipsum
+                        Success: TRUE or FALSE or N/A
+                        """,
+                        },
+                        {"role": "assistant", "content": "Output:-"},
+                    ],
+                )
+            result = parse_explanation_response(response.choices[0].message.content)
+            if "success" in result:
+                return result
+            raise ValueError("Could not parse success")
+        except ValueError as e:
+            # Provider errors propagate, only invalid output is worth another model
+            print(f"Error parsing success: {e}")
+    return {"explanation": "Analysis failed", "success": "N/A"}
+
+
+def combine_chunk_success(chunk_results: List[dict]) -> dict:
+    """Deterministic fallback, the last part with a verdict decides the outcome"""
+    explanation = " ".join(
+        f"Part {i + 1}: {r['explanation']}" for i, r in enumerate(chunk_results)
+    )
+    verdicts = [r["success"] for r in chunk_results if r["success"] in (True, False)]
+    success = verdicts[-1] if verdicts else "N/A"
+    return {"explanation": explanation, "success": success}
+
+
+def aggregate_chunk_success(chunk_results: List[dict], success_criteria: str):
+    """Reduce verdicts on a transcript's chunks into one using the small model"""
+    if len(chunk_results) == 1:
+        return chunk_results[0]
+    part_results = "\n".join(
+        f"Part {i + 1}: Success: {r['success']}, Explanation: {r['explanation']}"
+        for i, r in enumerate(chunk_results)
+    )
     try:
-        response = client.chat.completions.create(
-            model=models.SUCCESS_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You're an expert at assessing whether a call b/w human and AI was successful. "
-                    "Output a short explanation in under 5 words along with TRUE or FALSE or N/A",
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                    Transcript:
+        client = get_openai_client()
+        with get_breaker("openai").guard():
+            response = client.chat.completions.create(
+                model=models.ROUTING_SMALL_MODEL,
+                timeout=get_timeout(),
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You're an expert at assessing whether a call "
+                        "b/w human and AI was successful. The call was assessed in "
+                        "consecutive parts, combine them into a verdict for the "
+                        "whole call. Output a short explanation in under 5 words "
+                        "along with TRUE or FALSE or N/A",
+                    },
+                    {
+                        "role": "user",
+                        "content": f"""
+                    Part results:
                     ---
-                    {transcript}
+                    {part_results}
                     ---
 
                     Success Criteria:
@@ -34,11 +127,29 @@ def get_success(transcript: str, success_criteria: str):
                     Explanation: Lorem ipsum
                     Success: TRUE or FALSE or N/A
                     """,
-                },
-                {"role": "assistant", "content": "Output:-"},
-            ],
-        )
-        return parse_explanation_response(response.choices[0].message.content)
-    except Exception as e:
-        print(f"Error analyzing metric: {e}")
-        return {"explanation": "Analysis failed", "success": "N/A"}
+                    },
+                    {"role": "assistant", "content": "Output:-"},
+                ],
+            )
+        result = parse_explanation_response(response.choices[0].message.content)
+        if "success" in result:
+            return result
+        raise ValueError("Could not parse success")
+    except ValueError as e:
+        print(f"Error aggregating success: {e}")
+        return combine_chunk_success(chunk_results)
+
+
+def get_chunked_success(transcript: str, success_criteria: str):
+    """Assess each chunk of a long transcript in parallel, then reduce"""
+    chunks = split_transcript(transcript, models.TRANSCRIPT_CHUNK_TOKENS)
+    chunk_results = map_in_parallel(
+        lambda indexed_chunk: assess_success(
+            indexed_chunk[1],
+            success_criteria,
+            part_note=f"NOTE: Transcript is only part {indexed_chunk[0] + 1} of "
+            f"{len(chunks)} of the call. Judge only what happens in this part.",
+        ),
+        list(enumerate(chunks)),
+    )
+    return aggregate_chunk_success(chunk_results, success_criteria)
@@ -1,19 +1,22 @@
-from mixedvoices import models
-from mixedvoices.utils import get_openai_client
+from mixedvoices.core.circuit_breaker import get_breaker
+from mixedvoices.processors.routing import get_model
+from mixedvoices.utils import get_openai_client, get_timeout
 
 
 def summarize_transcript(transcript: str):
     client = get_openai_client()
-    response = client.chat.completions.create(
-        model=models.SUMMARY_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "You're an expert note taker. "
-                "Summarize given transcript in 2-3 sentences.",
-            },
-            {"role": "user", "content": f"Transcript: {transcript}"},
-            {"role": "assistant", "content": "Summary:-"},
-        ],
-    )
+    with get_breaker("openai").guard():
+        response = client.chat.completions.create(
+            model=get_model("summary", transcript),
+            timeout=get_timeout(),
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You're an expert note taker. "
+                    "Summarize given transcript in 2-3 sentences.",
+                },
+                {"role": "user", "content": f"Transcript: {transcript}"},
+                {"role": "assistant", "content": "Summary:-"},
+            ],
+        )
     return response.choices[0].message.content
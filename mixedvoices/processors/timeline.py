@@ -0,0 +1,105 @@
+import sys
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+from openai.types.audio import TranscriptionWord
+
+# Values of WordTimeline.speakers
+USER = 0
+AGENT = 1
+SPEAKER_LABELS = ("user", "bot")
+
+
+@dataclass
+class WordTimeline:
+    """
+    Words of a call as parallel arrays, in the order they were said.
+    Word strings are interned, as the same words repeat throughout a call.
+    """
+
+    words: np.ndarray
+    "Word strings, with object dtype."
+    starts: np.ndarray
+    "Start of each word in seconds."
+    ends: np.ndarray
+    "End of each word in seconds."
+    speakers: np.ndarray
+    "USER or AGENT, for each word."
+
+    @classmethod
+    def from_channel(
+        cls, words: Sequence[TranscriptionWord], speaker: int
+    ) -> "WordTimeline":
+        """Timeline of a single speaker's words, as returned by a transcriber"""
+        n = len(words)
+        return cls(
+            np.array([sys.intern(word.word) for word in words], dtype=object),
+            np.fromiter((word.start for word in words), dtype=np.float64, count=n),
+            np.fromiter((word.end for word in words), dtype=np.float64, count=n),
+            np.full(n, speaker, dtype=np.int8),
+        )
+
+    @classmethod
+    def from_words(
+        cls,
+        user_words: Sequence[TranscriptionWord],
+        agent_words: Sequence[TranscriptionWord],
+    ) -> "WordTimeline":
+        """Merge both speakers' words, the agent's word goes first on equal starts"""
+        agent = cls.from_channel(agent_words, AGENT)
+        user = cls.from_channel(user_words, USER)
+        starts = np.concatenate([agent.starts, user.starts])
+        order = np.argsort(starts, kind="stable")
+        return cls(
+            np.concatenate([agent.words, user.words])[order],
+            starts[order],
+            np.concatenate([agent.ends, user.ends])[order],
+            np.concatenate([agent.speakers, user.speakers])[order],
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def channel(self, speaker: int) -> "WordTimeline":
+        """Timeline of only one speaker's words"""
+        mask = self.speakers == speaker
+        return WordTimeline(
+            self.words[mask], self.starts[mask], self.ends[mask], self.speakers[mask]
+        )
+
+    def save(self, path: str):
+        """Save as a compressed .npz file, each distinct word is stored once"""
+        vocabulary, word_indices = np.unique(
+            self.words.astype(str), return_inverse=True
+        )
+        np.savez_compressed(
+            path,
+            vocabulary=vocabulary,
+            word_indices=word_indices.astype(np.int32),
+            starts=self.starts,
+            ends=self.ends,
+            speakers=self.speakers,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "WordTimeline":
+        with np.load(path) as data:
+            vocabulary = np.array(
+                [sys.intern(word) for word in data["vocabulary"].tolist()],
+                dtype=object,
+            )
+            return cls(
+                vocabulary[data["word_indices"]],
+                data["starts"],
+                data["ends"],
+                data["speakers"],
+            )
+
+    def to_words(self) -> List[TranscriptionWord]:
+        return [
+            TranscriptionWord(word=word, start=start, end=end)
+            for word, start, end in zip(
+                self.words.tolist(), self.starts.tolist(), self.ends.tolist()
+            )
+        ]
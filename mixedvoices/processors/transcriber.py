@@ -1,23 +1,170 @@
 import atexit
+import io
 import os
-from concurrent.futures import ThreadPoolExecutor
-from typing import List
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Union
 
-import requests
-from httpx import RequestError
+import numpy as np
+import soundfile as sf
 from openai.types.audio import TranscriptionVerbose, TranscriptionWord
 
-from mixedvoices.utils import get_openai_client
+from mixedvoices import models
+from mixedvoices.core.circuit_breaker import get_breaker
+from mixedvoices.processors.audio import AudioBuffer, probe_audio, resample
+from mixedvoices.processors.deepgram import DEEPGRAM_CLIENT, DeepgramUpload
+from mixedvoices.processors.timeline import SPEAKER_LABELS, WordTimeline
+from mixedvoices.processors.vad import (
+    TimestampMap,
+    compact,
+    find_speech_regions,
+    union_regions,
+)
+from mixedvoices.utils import get_openai_client, get_timeout, submit_with_context
 
-TRANSCRIPTION_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="Transcriber")
-atexit.register(lambda: TRANSCRIPTION_POOL.shutdown(wait=True))
 
+class TranscriptionExecutor:
+    """
+    Thread pool shared by every recording being transcribed, so chunks of
+    concurrent recordings are uploaded side by side. Sized by
+    TRANSCRIPTION_WORKERS when first used, and recreated after a shutdown.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._workers = 0
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._peak_queued = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Run fn in the pool, in the caller's context so deadlines carry over"""
+
+        def run():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        with self._lock:
+            if self._executor is None:
+                self._workers = max(models.TRANSCRIPTION_WORKERS, 1)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="Transcriber"
+                )
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+            future = submit_with_context(self._executor, run)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future):
+        if future.cancelled():  # Never ran, so it's still counted as queued
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> dict:
+        """Queue depth and throughput of the pool"""
+        with self._lock:
+            return {
+                "workers": self._workers if self._executor else 0,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "peak_queued": self._peak_queued,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the pool after queued work is done, the next submit starts a new one"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+TRANSCRIPTION_POOL = TranscriptionExecutor()
+atexit.register(TRANSCRIPTION_POOL.shutdown)
+
+# Whisper rejects uploads larger than 25 MB
+WHISPER_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+WHISPER_CHUNK_SECONDS = 600
+# Each cut is moved back by up to this much, to the quietest frame
+SILENCE_SEARCH_SECONDS = 30
+FRAME_SECONDS = 0.02
+
+# libsndfile format and subtype, file extension and content type of each encoding
+UPLOAD_ENCODINGS = {
+    "wav": ("WAV", "PCM_16", ".wav", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", ".flac", "audio/flac"),
+    "opus": ("OGG", "OPUS", ".ogg", "audio/ogg"),
+}
+# Compressed uploads are resampled to this, plenty for speech recognition
+UPLOAD_SAMPLE_RATE = 16000
+
+
+@dataclass
+class EncodedAudio:
+    data: bytes
+    filename: str
+    content_type: str
+
+
+@dataclass
+class UploadStats:
+    """Audio uploaded to transcription providers for a recording"""
+
+    encoding: str
+    upload_bytes: int = 0
+    "Total bytes uploaded."
+    upload_seconds: float = 0.0
+    "Time spent in upload requests, summed over requests made in parallel."
+    audio_seconds: float = 0.0
+    "Duration of audio uploaded, summed over channels uploaded separately."
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def record(self, num_bytes: int, seconds: float, audio_seconds: float):
+        with self._lock:
+            self.upload_bytes += num_bytes
+            self.upload_seconds += seconds
+            self.audio_seconds += audio_seconds
+
+    def to_dict(self):
+        return {
+            "upload_encoding": self.encoding,
+            "upload_bytes": self.upload_bytes,
+            "upload_seconds": round(self.upload_seconds, 3),
+            "audio_seconds": round(self.audio_seconds, 3),
+        }
+
+
+def transcribe_with_openai(audio_file: Union[str, Tuple[str, bytes]]):
+    """
+    Transcribe audio with Whisper, with word timestamps.
+
+    Args:
+        audio_file (Union[str, Tuple[str, bytes]]): Path to the audio file, or
+            a (filename, contents) tuple of an encoded audio file
+    """
+    if isinstance(audio_file, str):
+        with open(audio_file, "rb") as f:
+            return transcribe_with_openai((os.path.basename(audio_file), f.read()))
 
-def transcribe_with_openai(audio_path):
     client = get_openai_client()
-    with open(audio_path, "rb") as audio_file:
+    with get_breaker("openai").guard():
         json_response: TranscriptionVerbose = client.audio.transcriptions.create(
             model="whisper-1",
+            timeout=get_timeout(),
             file=audio_file,
             response_format="verbose_json",
             timestamp_granularities=["word"],
@@ -27,29 +174,118 @@ def transcribe_with_openai(audio_path):
     return json_response.text, json_response.words
 
 
-def make_deepgram_request(audio_path):
-    api_key = os.getenv("DEEPGRAM_API_KEY")
-    if not api_key:
-        raise ValueError("DEEPGRAM_API_KEY environment variable not set")
-    url = "https://api.deepgram.com/v1/listen"
-    params = {
-        "utterances": "true",
-        "multichannel": "true",
-        "punctuate": "true",
-        "model": "nova-2",
-        "numerals": "true",
-    }
-    headers = {"Authorization": f"Token {api_key}", "Content-Type": "audio/wav"}
-
-    with open(audio_path, "rb") as audio_file:
-        try:
-            response = requests.post(
-                url, params=params, headers=headers, data=audio_file
-            )
-            response.raise_for_status()  # Raise exception for error status codes
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            raise RequestError(f"API request failed: {str(e)}") from e
+def get_upload_sample_rate(sample_rate: int) -> int:
+    if models.UPLOAD_ENCODING == "wav":
+        return sample_rate
+    return UPLOAD_SAMPLE_RATE
+
+
+def get_chunk_seconds(sample_rate: int) -> float:
+    """Longest chunk, in seconds, Whisper accepts even if uploaded as 16 bit WAV"""
+    upload_sample_rate = get_upload_sample_rate(sample_rate)
+    max_seconds = 0.95 * WHISPER_MAX_UPLOAD_BYTES / (2 * upload_sample_rate)
+    return min(WHISPER_CHUNK_SECONDS, max_seconds)
+
+
+def find_chunk_boundaries(
+    samples: np.ndarray, sample_rate: int, chunk_seconds: float
+) -> List[int]:
+    """
+    Sample indices to cut a channel at, so that no chunk is longer than
+    chunk_seconds. Each cut is made in the quietest frame of the
+    SILENCE_SEARCH_SECONDS before the chunk's end, so words aren't split.
+
+    Returns:
+        List[int]: Boundaries, starting with 0 and ending with len(samples)
+    """
+    num_samples = len(samples)
+    chunk_size = int(chunk_seconds * sample_rate)
+    frame_size = max(int(FRAME_SECONDS * sample_rate), 1)
+    search_size = min(int(SILENCE_SEARCH_SECONDS * sample_rate), chunk_size // 2)
+
+    boundaries = [0]
+    while num_samples - boundaries[-1] > chunk_size:
+        end = boundaries[-1] + chunk_size
+        search_start = end - search_size
+        num_frames = search_size // frame_size
+        if num_frames == 0:
+            boundaries.append(end)
+            continue
+        window = samples[search_start : search_start + num_frames * frame_size]
+        frames = window.reshape(num_frames, frame_size).astype(np.float64)
+        energy = np.mean(frames**2, axis=1)
+        boundaries.append(search_start + int(np.argmin(energy)) * frame_size)
+    boundaries.append(num_samples)
+    return boundaries
+
+
+def encode_audio(samples: np.ndarray, sample_rate: int, name: str) -> EncodedAudio:
+    """
+    Encode audio for upload as configured by UPLOAD_ENCODING.
+
+    Args:
+        samples (np.ndarray): Samples with shape (samples,) or (samples, channels)
+        sample_rate (int): Sample rate in Hz
+        name (str): File name to upload as, without extension
+    """
+    audio_format, subtype, extension, content_type = UPLOAD_ENCODINGS[
+        models.UPLOAD_ENCODING
+    ]
+    upload_sample_rate = get_upload_sample_rate(sample_rate)
+    samples = resample(samples, sample_rate, upload_sample_rate)
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, upload_sample_rate, format=audio_format, subtype=subtype)
+    return EncodedAudio(buffer.getvalue(), f"{name}{extension}", content_type)
+
+
+def transcribe_chunk(
+    samples: np.ndarray,
+    sample_rate: int,
+    offset: float,
+    stats: Optional[UploadStats] = None,
+) -> List[TranscriptionWord]:
+    """Transcribe a chunk of a channel, with timestamps relative to the channel"""
+    encoded = encode_audio(samples, sample_rate, "chunk")
+    start = time.perf_counter()
+    _, words = transcribe_with_openai((encoded.filename, encoded.data))
+    if stats is not None:
+        stats.record(
+            len(encoded.data), time.perf_counter() - start, len(samples) / sample_rate
+        )
+    return [
+        TranscriptionWord(
+            word=word.word, start=word.start + offset, end=word.end + offset
+        )
+        for word in words
+    ]
+
+
+def remap_words(
+    words: List[TranscriptionWord], timestamp_map: Optional[TimestampMap]
+) -> List[TranscriptionWord]:
+    """Map timestamps of words transcribed from compacted audio to call time"""
+    if timestamp_map is None:
+        return words
+    return [
+        TranscriptionWord(
+            word=word.word,
+            start=timestamp_map.to_original(word.start),
+            end=timestamp_map.to_original(word.end),
+        )
+        for word in words
+    ]
+
+
+def make_deepgram_request(audio: Union[str, EncodedAudio]):
+    """
+    Args:
+        audio (Union[str, EncodedAudio]): Path to the audio file, or encoded audio
+    """
+    if isinstance(audio, EncodedAudio):
+        upload = DeepgramUpload(audio.data, audio.content_type)
+    else:
+        upload = DeepgramUpload(audio)
+    return DEEPGRAM_CLIENT.listen(upload)
 
 
 def format_deepgram_words(words):
@@ -61,15 +297,47 @@ def format_deepgram_words(words):
     ]
 
 
-def transcribe_with_deepgram(audio_path, user_channel="left"):
+def transcribe_with_deepgram(
+    audio_path,
+    user_channel="left",
+    audio: Optional[AudioBuffer] = None,
+    stats: Optional[UploadStats] = None,
+):
     """
     Transcribe audio using Deepgram API
 
     Args:
         audio_file_path (str): Path to the audio file to transcribe
         user_channel (str): Channel containing user audio ("left" or "right")
+        audio (Optional[AudioBuffer]): Decoded audio_path, decoded here if needed
+        stats (Optional[UploadStats]): Upload stats to add this upload to
     """
-    response = make_deepgram_request(audio_path)
+    timestamp_map = None
+    if models.UPLOAD_ENCODING == "wav" and models.TRANSCRIPTION_VAD != "on":
+        upload = audio_path
+        num_bytes = os.path.getsize(audio_path)
+        audio_seconds = probe_audio(audio_path).duration
+    else:
+        audio = audio or AudioBuffer.from_file(audio_path)
+        samples, sample_rate = audio.samples.T, audio.sample_rate
+        if models.TRANSCRIPTION_VAD == "on":
+            # Both channels go in one request, so keep speech of either
+            regions = union_regions(
+                *(
+                    find_speech_regions(audio.channel(i), sample_rate)
+                    for i in range(audio.channels)
+                )
+            )
+            samples, timestamp_map = compact(samples, sample_rate, regions)
+            if len(samples) == 0:
+                return "", [], "", []
+        upload = encode_audio(samples, sample_rate, "call")
+        num_bytes = len(upload.data)
+        audio_seconds = len(samples) / sample_rate
+    start = time.perf_counter()
+    response = make_deepgram_request(upload)
+    if stats is not None:
+        stats.record(num_bytes, time.perf_counter() - start, audio_seconds)
 
     user_idx = 0 if user_channel == "left" else 1
     agent_idx = 1 - user_idx
@@ -78,75 +346,99 @@ def transcribe_with_deepgram(audio_path, user_channel="left"):
     agent_response = response["results"]["channels"][agent_idx]["alternatives"][
         0
     ]
-    user_words = format_deepgram_words(user_response["words"])
+    user_words = remap_words(
+        format_deepgram_words(user_response["words"]), timestamp_map
+    )
     user_transcript = user_response["transcript"]
-    agent_words = format_deepgram_words(agent_response["words"])
+    agent_words = remap_words(
+        format_deepgram_words(agent_response["words"]), timestamp_map
+    )
     agent_transcript = agent_response["transcript"]
 
     return user_transcript, user_words, agent_transcript, agent_words
 
 
-def create_combined_transcript(
-    user_words: List[TranscriptionWord], agent_words: List[TranscriptionWord]
+def create_combined_transcript(timeline: WordTimeline) -> str:
+    """Numbered transcript with a line for each turn, like '1. user: Hello'"""
+    # Each turn starts where the speaker changes
+    turn_starts = np.flatnonzero(np.diff(timeline.speakers)) + 1
+    bounds = [0, *turn_starts.tolist(), len(timeline)] if len(timeline) else []
+    words, speakers = timeline.words.tolist(), timeline.speakers.tolist()
+    return "\n".join(
+        f"{i}. {SPEAKER_LABELS[speakers[start]]}: {' '.join(words[start:end])}"
+        for i, (start, end) in enumerate(zip(bounds, bounds[1:]), 1)
+    )
+
+
+def transcribe_and_combine_openai(
+    audio: AudioBuffer, user_channel="left", stats: Optional[UploadStats] = None
 ):
-    last_speaker = None
-    user_index, agent_index = 0, 0
-    all_segments = []
-    current_segment = []
-    while user_index < len(user_words) or agent_index < len(agent_words):
-        user_word = user_words[user_index] if user_index < len(user_words) else None
-        agent_word = (
-            agent_words[agent_index]
-            if agent_index < len(agent_words)
-            else None
+    """
+    Transcribe each channel with Whisper and combine them into a transcript.
+
+    With TRANSCRIPTION_VAD on, silence is first cut out of each channel and
+    word timestamps are mapped back to call time. Channels are cut into chunks
+    at silences, and the chunks of both channels are transcribed in parallel.
+
+    Args:
+        audio (AudioBuffer): Decoded stereo audio
+        user_channel (str): Channel containing user audio ("left" or "right")
+        stats (Optional[UploadStats]): Upload stats to add the uploads to
+    """
+    user_idx = 0 if user_channel == "left" else 1
+    sample_rate = audio.sample_rate
+    chunk_seconds = get_chunk_seconds(sample_rate)
+
+    channel_futures = []
+    timestamp_maps: List[Optional[TimestampMap]] = []
+    for channel_idx in [user_idx, 1 - user_idx]:
+        samples = audio.channel(channel_idx)
+        timestamp_map = None
+        if models.TRANSCRIPTION_VAD == "on":
+            regions = find_speech_regions(samples, sample_rate)
+            samples, timestamp_map = compact(samples, sample_rate, regions)
+        timestamp_maps.append(timestamp_map)
+        boundaries = find_chunk_boundaries(samples, sample_rate, chunk_seconds)
+        channel_futures.append(
+            [
+                TRANSCRIPTION_POOL.submit(
+                    transcribe_chunk,
+                    samples[start:end],
+                    sample_rate,
+                    start / sample_rate,
+                    stats,
+                )
+                for start, end in zip(boundaries, boundaries[1:])
+                if end > start
+            ]
         )
 
-        if not agent_word or (user_word and user_word.start < agent_word.start):
-            speaker = "user"
-            current_word = user_word
-            user_index += 1
-        else:
-            speaker = "bot"
-            current_word = agent_word
-            agent_index += 1
-
-        if last_speaker != speaker:
-            if current_segment:
-                all_segments.append(current_segment)
-            current_segment = [f"{speaker}:", current_word.word]
-            last_speaker = speaker
-        else:
-            current_segment.append(current_word.word)
-
-    if current_segment:
-        all_segments.append(current_segment)
-
-    all_sentences = [" ".join(segment) for segment in all_segments]
-    all_sentences = [f"{i+1}. {sentence}" for i, sentence in enumerate(all_sentences)]
-    return "\n".join(all_sentences)
-
-
-def transcribe_and_combine_openai(user_audio_path, agent_audio_path):
-    with TRANSCRIPTION_POOL as executor:
-        user_future = executor.submit(transcribe_with_openai, user_audio_path)
-        agent_future = executor.submit(transcribe_with_openai, agent_audio_path)
-
-        _, user_words = user_future.result()
-        _, agent_words = agent_future.result()
-
-    return (
-        create_combined_transcript(user_words, agent_words),
-        user_words,
-        agent_words,
-    )
+    try:
+        user_words, agent_words = [
+            remap_words(
+                [word for future in futures for word in future.result()],
+                timestamp_map,
+            )
+            for futures, timestamp_map in zip(channel_futures, timestamp_maps)
+        ]
+    finally:
+        # Don't leave chunks of a failed recording queued for nothing
+        for futures in channel_futures:
+            for future in futures:
+                future.cancel()
+
+    timeline = WordTimeline.from_words(user_words, agent_words)
+    return create_combined_transcript(timeline), timeline
 
 
-def transcribe_and_combine_deepgram(audio_path, user_channel="left"):
+def transcribe_and_combine_deepgram(
+    audio_path,
+    user_channel="left",
+    audio: Optional[AudioBuffer] = None,
+    stats: Optional[UploadStats] = None,
+):
     _, user_words, _, agent_words = transcribe_with_deepgram(
-        audio_path, user_channel
-    )
-    return (
-        create_combined_transcript(user_words, agent_words),
-        user_words,
-        agent_words,
+        audio_path, user_channel, audio, stats
     )
+    timeline = WordTimeline.from_words(user_words, agent_words)
+    return create_combined_transcript(timeline), timeline
@@ -1,6 +1,60 @@
+import copy
 import re
 from typing import List, Optional
 
+# Steps offered to STEPS_MODEL for every transcript, with existing steps of the project
+STANDARD_STEPS = [
+    {"name": "Greeting", "subpoints": None, "variants": None},
+    {
+        "name": "Inquiry Handling",
+        "subpoints": ["Address, timings etc."],
+        "variants": None,
+    },
+    {
+        "name": "Caller Complaint Handling",
+        "subpoints": [
+            "Complaints regarding product/service",
+            "Complaint regarding bot",
+        ],
+        "variants": None,
+    },
+    {
+        "name": "Collect Caller Information",
+        "subpoints": ["name, phone number, id, etc"],
+        "variants": None,
+    },
+    {
+        "name": "Request Expert Callback",
+        "subpoints": None,
+        "variants": ["Request Doctor Callback"],
+    },
+    {
+        "name": "Call Transfer to Human Agent",
+        "subpoints": [
+            "Only use if caller asks to connect with a human",
+            "OR if bot transfers to human agent",
+            "DONT use in any other case",
+        ],
+        "variants": None,
+    },
+    {
+        "name": "Set Appointment",
+        "subpoints": [
+            "Request for appointment, determining purpose, time, place, confirmation etc",
+            "Create this only *ONE* time at end of appointment discussion",
+        ],
+        "variants": None,
+    },
+    {"name": "Offer Further Assistance", "subpoints": None, "variants": None},
+    {"name": "Farewell", "subpoints": None, "variants": None},
+    {
+        "name": "Check Availability",
+        "subpoints": ["Only used to check availability of product/service"],
+        "variants": ["Check Medicine Availability", "Check Inventory Availability"],
+    },
+]
+STANDARD_STEP_NAMES = frozenset(step["name"] for step in STANDARD_STEPS)
+
 
 def stringify_subpoints_and_variants(standard_steps: List[dict]):
     for step in standard_steps:
@@ -22,9 +76,11 @@ def combine_existing_steps(
     standard_steps: List[dict], existing_step_names: Optional[List[str]] = None
 ):
     existing_step_names = existing_step_names or []
+    # Names in the list being built, kept in step as steps are added
+    step_names = {s["name"] for s in standard_steps}
 
     for step in existing_step_names:
-        if step in {s["name"] for s in standard_steps}:
+        if step in step_names:
             continue
         elif "Request" in step and "Callback" in step:
             request_callback_step = next(
@@ -42,60 +98,11 @@ def combine_existing_steps(
                 check_step["variants"].append(step)
         else:
             standard_steps.append({"name": step, "subpoints": None, "variants": None})
+            step_names.add(step)
 
 
 def get_standard_steps_string(existing_step_names: Optional[List[str]] = None):
-    standard_steps = [
-        {"name": "Greeting", "subpoints": None, "variants": None},
-        {
-            "name": "Inquiry Handling",
-            "subpoints": ["Address, timings etc."],
-            "variants": None,
-        },
-        {
-            "name": "Caller Complaint Handling",
-            "subpoints": [
-                "Complaints regarding product/service",
-                "Complaint regarding bot",
-            ],
-            "variants": None,
-        },
-        {
-            "name": "Collect Caller Information",
-            "subpoints": ["name, phone number, id, etc"],
-            "variants": None,
-        },
-        {
-            "name": "Request Expert Callback",
-            "subpoints": None,
-            "variants": ["Request Doctor Callback"],
-        },
-        {
-            "name": "Call Transfer to Human Agent",
-            "subpoints": [
-                "Only use if caller asks to connect with a human",
-                "OR if bot transfers to human agent",
-                "DONT use in any other case",
-            ],
-            "variants": None,
-        },
-        {
-            "name": "Set Appointment",
-            "subpoints": [
-                "Request for appointment, determining purpose, time, place, confirmation etc",
-                "Create this only *ONE* time at end of appointment discussion",
-            ],
-            "variants": None,
-        },
-        {"name": "Offer Further Assistance", "subpoints": None, "variants": None},
-        {"name": "Farewell", "subpoints": None, "variants": None},
-        {
-            "name": "Check Availability",
-            "subpoints": ["Only used to check availability of product/service"],
-            "variants": ["Check Medicine Availability", "Check Inventory Availability"],
-        },
-    ]
-
+    standard_steps = copy.deepcopy(STANDARD_STEPS)
     combine_existing_steps(standard_steps, existing_step_names)
     stringify_subpoints_and_variants(standard_steps)
     return "\n".join(
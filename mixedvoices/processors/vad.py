@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from mixedvoices.processors.audio import to_float32
+
+FRAME_SECONDS = 0.03
+# Frames this much louder than the channel's noise floor are speech
+SPEECH_THRESHOLD_DB = 12.0
+# Frames quieter than this are never speech, relative to full scale
+MIN_SPEECH_DBFS = -50.0
+# Pauses shorter than this don't split a speech region
+MIN_SILENCE_SECONDS = 0.5
+PADDING_SECONDS = 0.2
+# Silence kept between regions in compacted audio, so they aren't run together
+GAP_SECONDS = 0.3
+
+Region = Tuple[int, int]
+
+
+def frame_energy_db(samples: np.ndarray, frame_size: int) -> np.ndarray:
+    """Energy of each full frame in dB relative to full scale"""
+    num_frames = len(samples) // frame_size
+    frames = samples[: num_frames * frame_size].reshape(num_frames, frame_size)
+    energy = np.mean(to_float32(frames).astype(np.float64) ** 2, axis=1)
+    return 10 * np.log10(np.maximum(energy, 1e-12))
+
+
+def find_speech_regions(samples: np.ndarray, sample_rate: int) -> List[Region]:
+    """
+    Find regions of a channel with speech, using frame energy above the noise floor.
+
+    Args:
+        samples (np.ndarray): Samples of a single channel
+        sample_rate (int): Sample rate in Hz
+
+    Returns:
+        List[Region]: Sorted, non overlapping (start, end) sample indices
+    """
+    frame_size = max(int(FRAME_SECONDS * sample_rate), 1)
+    energy = frame_energy_db(samples, frame_size)
+    if len(energy) == 0:
+        return []
+    noise_floor = np.percentile(energy, 10)
+    is_speech = energy > max(noise_floor + SPEECH_THRESHOLD_DB, MIN_SPEECH_DBFS)
+
+    # Start and end frame of each run of speech frames
+    edges = np.diff(np.concatenate([[0], is_speech.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    padding = int(PADDING_SECONDS * sample_rate)
+    min_silence = int(MIN_SILENCE_SECONDS * sample_rate)
+    regions: List[Region] = []
+    for start_frame, end_frame in zip(starts, ends):
+        start = max(int(start_frame) * frame_size - padding, 0)
+        end = min(int(end_frame) * frame_size + padding, len(samples))
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def union_regions(*channel_regions: Sequence[Region]) -> List[Region]:
+    """Merge regions of several channels into regions covering speech on any"""
+    union: List[Region] = []
+    for start, end in sorted(r for regions in channel_regions for r in regions):
+        if union and start <= union[-1][1]:
+            union[-1] = (union[-1][0], max(union[-1][1], end))
+        else:
+            union.append((start, end))
+    return union
+
+
+@dataclass
+class TimestampMap:
+    """Maps times in compacted audio back to times in the original audio"""
+
+    compact_starts: np.ndarray
+    "Start of each region in compacted audio, in seconds."
+    original_starts: np.ndarray
+    "Start of each region in original audio, in seconds."
+    durations: np.ndarray
+    "Duration of each region, in seconds."
+
+    def to_original(self, time: float) -> float:
+        if len(self.compact_starts) == 0:
+            return time
+        idx = max(int(np.searchsorted(self.compact_starts, time, "right")) - 1, 0)
+        # Times in the gap after a region are clamped to the region's end
+        offset = min(max(time - self.compact_starts[idx], 0), self.durations[idx])
+        return float(self.original_starts[idx] + offset)
+
+
+def compact(
+    samples: np.ndarray, sample_rate: int, regions: Sequence[Region]
+) -> Tuple[np.ndarray, TimestampMap]:
+    """
+    Cut silence out of audio, keeping a short gap between speech regions.
+
+    Args:
+        samples (np.ndarray): Samples with shape (samples,) or (samples, channels)
+        sample_rate (int): Sample rate in Hz
+        regions (Sequence[Region]): Sorted, non overlapping regions to keep
+
+    Returns:
+        tuple: Compacted samples, and the map from compacted to original time
+    """
+    gap = np.zeros((int(GAP_SECONDS * sample_rate),) + samples.shape[1:], samples.dtype)
+    pieces = []
+    compact_starts, original_starts, durations = [], [], []
+    position = 0
+    for start, end in regions:
+        if pieces:
+            pieces.append(gap)
+            position += len(gap)
+        pieces.append(samples[start:end])
+        compact_starts.append(position / sample_rate)
+        original_starts.append(start / sample_rate)
+        durations.append((end - start) / sample_rate)
+        position += end - start
+    compacted = np.concatenate(pieces) if pieces else samples[:0]
+    timestamp_map = TimestampMap(
+        np.array(compact_starts), np.array(original_starts), np.array(durations)
+    )
+    return compacted, timestamp_map
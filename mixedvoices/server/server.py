@@ -9,9 +9,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 import mixedvoices
-from mixedvoices import TestCaseGenerator
+from mixedvoices import SamplingPolicy, TestCaseGenerator
+from mixedvoices.core.recording import load_recording
+from mixedvoices.core.step_recordings import get_step_recordings
+from mixedvoices.core.task_manager import TASK_MANAGER
 from mixedvoices.metrics.metric import Metric
-from mixedvoices.server.utils import copy_file_content, process_vapi_webhook
+from mixedvoices.processors.transcriber import TRANSCRIPTION_POOL
+from mixedvoices.server.utils import (
+    copy_file_content,
+    get_recording_data,
+    process_vapi_webhook,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -64,6 +72,14 @@ class EvalCreate(BaseModel):
 
 class SuccessCriteria(BaseModel):
     success_criteria: str
+    rejudge: bool = False
+
+
+class SamplingPolicyUpdate(BaseModel):
+    rate: float = 1.0
+    always_score_failed: bool = True
+    short_call_seconds: float = 0
+    stratify_by_version: bool = True
 
 
 # API Routes
@@ -149,6 +165,15 @@ async def list_default_metrics():
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@app.get("/api/transcription/stats")
+async def get_transcription_stats():
+    try:
+        return TRANSCRIPTION_POOL.stats()
+    except Exception as e:
+        logger.error(f"Error getting transcription stats: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
 @app.get("/api/projects/{project_id}/metrics")
 async def list_metrics(project_id: str):
     """List all metrics for a project"""
@@ -273,7 +298,9 @@ async def update_success_criteria(project_id: str, success_criteria: SuccessCrit
     """Update the success criteria for a version"""
     try:
         project = mixedvoices.load_project(project_id)
-        project.update_success_criteria(success_criteria.success_criteria)
+        project.update_success_criteria(
+            success_criteria.success_criteria, rejudge=success_criteria.rejudge
+        )
         return {"message": "Success criteria updated successfully"}
     except KeyError as e:
         logger.error(f"Project '{project_id}' not found: {str(e)}")
@@ -286,6 +313,161 @@ async def update_success_criteria(project_id: str, success_criteria: SuccessCrit
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@app.get("/api/projects/{project_id}/sampling_policy")
+async def get_sampling_policy(project_id: str):
+    """Get the policy deciding which recordings get LLM metrics scored"""
+    try:
+        project = mixedvoices.load_project(project_id)
+        return {"sampling_policy": project.sampling_policy.to_dict()}
+    except KeyError as e:
+        logger.error(f"Project '{project_id}' not found: {str(e)}")
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error getting sampling policy for project '{project_id}': {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.post("/api/projects/{project_id}/sampling_policy")
+async def update_sampling_policy(
+    project_id: str, sampling_policy: SamplingPolicyUpdate
+):
+    """Update the policy deciding which recordings get LLM metrics scored"""
+    try:
+        project = mixedvoices.load_project(project_id)
+        project.update_sampling_policy(SamplingPolicy(**sampling_policy.model_dump()))
+        return {"message": "Sampling policy updated successfully"}
+    except KeyError as e:
+        logger.error(f"Project '{project_id}' not found: {str(e)}")
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        logger.error(f"Invalid sampling policy: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error updating sampling policy for project '{project_id}': {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.post("/api/projects/{project_id}/versions/{version_id}/backfill_metrics")
+async def backfill_metrics(project_id: str, version_id: str):
+    """Score metrics of recordings left unscored by the sampling policy"""
+    try:
+        project = mixedvoices.load_project(project_id)
+        version = project.load_version(version_id)
+        version.backfill_metrics(blocking=False)
+        return {"message": "Recordings are being scored"}
+    except KeyError as e:
+        logger.error(
+            f"Version '{version_id}' or project '{project_id}' not found: {str(e)}"
+        )
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error backfilling metrics for version '{version_id}'"
+            f" in project '{project_id}': {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.post("/api/projects/{project_id}/versions/{version_id}/rescore_metrics")
+async def rescore_metrics(project_id: str, version_id: str):
+    """Score recordings on metrics that were added or changed since they were scored"""
+    try:
+        project = mixedvoices.load_project(project_id)
+        version = project.load_version(version_id)
+        task_ids = version.rescore_stale_metrics(blocking=False)
+        if not task_ids:
+            return {"message": "No recordings have stale metrics", "task_ids": []}
+        return {"message": "Recordings are being scored", "task_ids": task_ids}
+    except KeyError as e:
+        logger.error(
+            f"Version '{version_id}' or project '{project_id}' not found: {str(e)}"
+        )
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error rescoring metrics for version '{version_id}'"
+            f" in project '{project_id}': {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.get("/api/tasks/{task_id}")
+async def get_task(task_id: str):
+    """Status of a background task, with its progress for tasks that report it"""
+    task = TASK_MANAGER.get_task(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    return task.to_dict()
+
+
+@app.post("/api/projects/{project_id}/versions/{version_id}/recompute_call_metrics")
+async def recompute_call_metrics(project_id: str, version_id: str):
+    """Recompute call metrics of recordings from their saved word timestamps"""
+    try:
+        project = mixedvoices.load_project(project_id)
+        version = project.load_version(version_id)
+        version.recompute_call_metrics(blocking=False)
+        return {"message": "Call metrics are being recomputed"}
+    except KeyError as e:
+        logger.error(
+            f"Version '{version_id}' or project '{project_id}' not found: {str(e)}"
+        )
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error recomputing call metrics for version '{version_id}'"
+            f" in project '{project_id}': {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.get("/api/projects/{project_id}/versions/{version_id}/latency")
+async def get_latency_percentiles(project_id: str, version_id: str):
+    """Agent response latency percentiles over every turn of the version"""
+    try:
+        project = mixedvoices.load_project(project_id)
+        version = project.load_version(version_id)
+        return version.get_latency_percentiles()
+    except KeyError as e:
+        logger.error(
+            f"Version '{version_id}' or project '{project_id}' not found: {str(e)}"
+        )
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error getting latency for version '{version_id}'"
+            f" in project '{project_id}': {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.get("/api/projects/{project_id}/flow")
+async def get_project_flow(project_id: str):
+    """Get the flow chart data of all versions of a project, merged"""
+    try:
+        project = mixedvoices.load_project(project_id)
+        return {"steps": project.get_flow()}
+    except KeyError as e:
+        logger.error(f"Project '{project_id}' not found: {str(e)}")
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error getting flow data for project '{project_id}': {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
 @app.get("/api/projects/{project_id}/versions/{version_id}/flow")
 async def get_version_flow(project_id: str, version_id: str):
     """Get the flow chart data for a version"""
@@ -358,22 +540,7 @@ async def list_recordings(project_id: str, version_id: str):
         project = mixedvoices.load_project(project_id)
         version = project.load_version(version_id)
         recordings_data = [
-            {
-                "id": recording_id,
-                "audio_path": recording.audio_path,
-                "created_at": recording.created_at,
-                "combined_transcript": recording.combined_transcript,
-                "step_ids": recording.step_ids,
-                "summary": recording.summary,
-                "duration": recording.duration,
-                "is_successful": recording.is_successful,
-                "success_explanation": recording.success_explanation,
-                "metadata": recording.metadata,
-                "task_status": recording.task_status,
-                "llm_metrics": recording.llm_metrics,
-                "call_metrics": recording.call_metrics,
-            }
-            for recording_id, recording in version._recordings.items()
+            get_recording_data(recording) for recording in version._recordings.values()
         ]
         return {"recordings": recordings_data}
     except KeyError as e:
@@ -430,40 +597,50 @@ async def add_recording(
             temp_dir.cleanup()
 
 
-@app.get("/api/projects/{project_id}/versions/{version_id}/steps/{step_id}/recordings")
-async def list_step_recordings(project_id: str, version_id: str, step_id: str):
-    """Get all recordings that reached a specific step"""
+@app.get("/api/projects/{project_id}/versions/{version_id}/recordings/{recording_id}")
+async def get_recording(project_id: str, version_id: str, recording_id: str):
+    """Get all details of a recording"""
     try:
-        project = mixedvoices.load_project(project_id)
-        version = project.load_version(version_id)
-        step = version.get_step(step_id)
-        recordings_data = []
-        for recording_id in step.recording_ids:
-            recording = version._recordings[recording_id]
-            recordings_data.append(
-                {
-                    "id": recording.id,
-                    "audio_path": recording.audio_path,
-                    "created_at": recording.created_at,
-                    "combined_transcript": recording.combined_transcript,
-                    "step_ids": recording.step_ids,
-                    "summary": recording.summary,
-                    "duration": recording.duration,
-                    "is_successful": recording.is_successful,
-                    "success_explanation": recording.success_explanation,
-                    "metadata": recording.metadata,
-                    "task_status": recording.task_status,
-                    "llm_metrics": recording.llm_metrics,
-                    "call_metrics": recording.call_metrics,
-                }
-            )
+        recording = load_recording(project_id, version_id, recording_id)
+        return get_recording_data(recording)
+    except KeyError as e:
+        logger.error(
+            f"Recording '{recording_id}' or version '{version_id}'"
+            f" or project '{project_id}' not found: {str(e)}"
+        )
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except Exception as e:
+        logger.error(
+            f"Error getting recording '{recording_id}' in version '{version_id}'"
+            f" of project '{project_id}': {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
-        return {"recordings": recordings_data}
+
+@app.get("/api/projects/{project_id}/versions/{version_id}/steps/{step_id}/recordings")
+async def list_step_recordings(
+    project_id: str,
+    version_id: str,
+    step_id: str,
+    offset: int = 0,
+    limit: int = 50,
+    is_successful: Optional[bool] = None,
+    order: str = "desc",
+):
+    """Get a page of the recordings that reached a specific step, as lightweight rows"""
+    try:
+        return get_step_recordings(
+            project_id, version_id, step_id, offset, limit, is_successful, order
+        )
     except KeyError as e:
         logger.error(
             f"Step '{step_id}' or version '{version_id}' or project '{project_id}' not found: {str(e)}"
         )
         raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        logger.error(f"Invalid input: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
         logger.error(
             f"Error getting recordings for step '{step_id}' in version '{version_id}' of project '{project_id}': {str(e)}",
@@ -4,6 +4,8 @@ import tempfile
 
 from fastapi import UploadFile
 
+from mixedvoices.core.recording import Recording
+
 
 def process_vapi_webhook(webhook_data):
     message_data = webhook_data["message"]
@@ -51,3 +53,22 @@ def copy_file_content(file: UploadFile):
         shutil.copyfileobj(file.file, buffer)
 
     return temp_path, temp_dir
+
+
+def get_recording_data(recording: Recording):
+    return {
+        "id": recording.id,
+        "audio_path": recording.audio_path,
+        "created_at": recording.created_at,
+        "combined_transcript": recording.combined_transcript,
+        "step_ids": recording.step_ids,
+        "summary": recording.summary,
+        "duration": recording.duration,
+        "is_successful": recording.is_successful,
+        "success_explanation": recording.success_explanation,
+        "metadata": recording.metadata,
+        "task_status": recording.task_status,
+        "llm_metrics": recording.llm_metrics,
+        "call_metrics": recording.call_metrics,
+        "sampling": recording.sampling,
+    }
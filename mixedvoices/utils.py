@@ -1,16 +1,161 @@
+import asyncio
+import contextvars
+import hashlib
 import json
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Dict, Optional
 
+import openai
+import requests
 from openai import OpenAI
 
 import mixedvoices
+from mixedvoices import models
+
+try:
+    import fcntl
+except ImportError:  # Windows, locks only hold within the process
+    fcntl = None
+
+# Monotonic time by which the current task must finish, None if there is no deadline
+_DEADLINE: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar(
+    "deadline", default=None
+)
+# Set once the watchdog abandons the task running in the current context
+_CANCELLED: "contextvars.ContextVar[Optional[threading.Event]]" = (
+    contextvars.ContextVar("cancelled", default=None)
+)
+
+
+# Locks of file_lock, by absolute path
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_lock = threading.Lock()
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a task runs past its deadline"""
+
+
+class TaskCancelledError(DeadlineExceededError):
+    """Raised when a task abandoned by the watchdog tries to continue"""
 
 
 def get_openai_client():
     if mixedvoices.OPEN_AI_CLIENT is None:
-        mixedvoices.OPEN_AI_CLIENT = OpenAI()
+        mixedvoices.OPEN_AI_CLIENT = OpenAI(timeout=models.REQUEST_TIMEOUT)
     return mixedvoices.OPEN_AI_CLIENT
 
 
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Run the enclosed code with a deadline, nested deadlines can only shorten it"""
+    new_deadline = time.monotonic() + seconds if seconds else None
+    current_deadline = _DEADLINE.get()
+    if current_deadline is not None and (
+        new_deadline is None or current_deadline < new_deadline
+    ):
+        new_deadline = current_deadline
+    token = _DEADLINE.set(new_deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+@contextmanager
+def cancellable(cancelled: threading.Event):
+    """Run the enclosed code as a task that is abandoned once cancelled is set"""
+    token = _CANCELLED.set(cancelled)
+    try:
+        yield
+    finally:
+        _CANCELLED.reset(token)
+
+
+def check_cancelled():
+    """Stop an abandoned task before it writes, as a retry of it may be running
+
+    Raises:
+        TaskCancelledError: If the task running in the current context was abandoned
+    """
+    cancelled = _CANCELLED.get()
+    if cancelled is not None and cancelled.is_set():
+        raise TaskCancelledError("Task was abandoned past its deadline")
+
+
+def get_time_remaining() -> Optional[float]:
+    """Seconds left until the current task's deadline, None if there is no deadline
+
+    Raises:
+        DeadlineExceededError: If the current task's deadline has already passed
+    """
+    check_cancelled()
+    current_deadline = _DEADLINE.get()
+    if current_deadline is None:
+        return None
+    remaining = current_deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError("Task deadline exceeded")
+    return remaining
+
+
+def get_timeout() -> float:
+    """Timeout in seconds for a network call made now.
+
+    Raises:
+        DeadlineExceededError: If the current task's deadline has already passed
+    """
+    timeout = models.REQUEST_TIMEOUT
+    remaining = get_time_remaining()
+    if remaining is not None:
+        timeout = min(timeout, remaining)
+    return timeout
+
+
+def submit_with_context(executor: Executor, fn, *args, **kwargs) -> Future:
+    """Submit to an executor so that fn runs under the caller's deadline"""
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    """Whether an error, or any error it was raised from, is a timeout"""
+    timeout_errors = (
+        TimeoutError,
+        asyncio.TimeoutError,
+        openai.APITimeoutError,
+        requests.exceptions.Timeout,
+    )
+    while error is not None:
+        if isinstance(error, timeout_errors):
+            return True
+        error = error.__cause__
+    return False
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive lock on path, shared by threads of this process and, where
+    fcntl is available, by other processes. The lock file is created if missing.
+    """
+    with _file_locks_lock:
+        thread_lock = _file_locks.setdefault(os.path.abspath(path), threading.Lock())
+    with thread_lock, open(path, "a") as f:
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
 def validate_name(name: str, identifier: str):
     allowed_special_chars = {"-", "_"}
     if (
@@ -22,9 +167,17 @@ def validate_name(name: str, identifier: str):
         )
 
 
+def hash_text(text: str) -> str:
+    """Short stable hash, to tell if a definition changed since it was used"""
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
 def save_json(d, filename):
-    with open(filename, "w") as f:
+    # Written aside and moved in place, so readers never see a partial file
+    temp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_filename, "w") as f:
         f.write(json.dumps(d))
+    os.replace(temp_filename, filename)
 
 
 def load_json(filename):
@@ -0,0 +1,170 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from mixedvoices.core import circuit_breaker
+from mixedvoices.core.circuit_breaker import (
+    CircuitBreaker,
+    ProviderUnavailableError,
+    get_breaker,
+)
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.task_manager import MAX_TASK_ATTEMPTS, TASK_MANAGER, TaskStatus
+from mixedvoices.core.utils import process_recording
+from mixedvoices.processors.success import assess_success
+from mixedvoices.utils import DeadlineExceededError
+
+
+def connection_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return openai.APIConnectionError(request=request)
+
+
+def timeout_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return openai.APITimeoutError(request=request)
+
+
+def call(breaker, error=None):
+    with breaker.guard():
+        if error:
+            raise error
+
+
+@patch("mixedvoices.core.circuit_breaker.BASE_BACKOFF_SECONDS", 0.05)
+def test_circuit_breaker():
+    breaker = CircuitBreaker("openai")
+
+    # Errors caused by the request itself don't count towards an outage
+    with pytest.raises(ValueError):
+        call(breaker, ValueError("Bad request"))
+    assert breaker.consecutive_failures == 0
+
+    # Timeouts may come from the task's deadline, so they aren't outages either
+    with pytest.raises(openai.APITimeoutError):
+        call(breaker, timeout_error())
+    with pytest.raises(DeadlineExceededError):
+        call(breaker, DeadlineExceededError("Task deadline exceeded"))
+    assert breaker.consecutive_failures == 0
+
+    # Outage errors are raised as they are until the circuit opens
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD - 1):
+        with pytest.raises(openai.APIConnectionError):
+            call(breaker, connection_error())
+    assert not breaker.is_open
+    with pytest.raises(ProviderUnavailableError):
+        call(breaker, connection_error())
+    assert breaker.is_open
+    assert breaker.retry_after() > 0
+    with pytest.raises(ProviderUnavailableError, match="circuit open"):
+        call(breaker)
+
+    # Failed trial call after the backoff reopens with double the backoff
+    time.sleep(0.06)
+    with pytest.raises(ProviderUnavailableError):
+        call(breaker, connection_error())
+    assert breaker.backoff == pytest.approx(0.1)
+
+    # Only a single trial call is let through once the backoff passes
+    time.sleep(0.11)
+    with breaker.guard():
+        assert breaker.retry_after() == circuit_breaker.TRIAL_POLL_SECONDS
+        with pytest.raises(ProviderUnavailableError, match="trial call in flight"):
+            call(breaker)
+    assert not breaker.is_open
+    assert not breaker.trial_in_flight
+    assert breaker.consecutive_failures == 0
+    assert breaker.backoff == pytest.approx(0.05)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [ProviderUnavailableError("openai", "connection error"), connection_error()],
+)
+def test_provider_outage_keeps_recording_processing(empty_project, error):
+    version = empty_project.load_version("v1")
+    recording = Recording("recording1", "audio.wav", version.id, version.project_id)
+    version._recordings[recording.id] = recording
+    recording._save()
+
+    with patch("mixedvoices.core.utils.AudioBuffer"), patch(
+        "mixedvoices.core.utils.get_transcript_and_duration", side_effect=error
+    ):
+        with pytest.raises(type(error)):
+            process_recording(recording, version)
+
+    recording = Recording._load(version.project_id, version.id, "recording1")
+    assert recording.task_status == "Processing"
+    assert recording.step_ids is None
+
+
+def test_outage_error_not_saved_as_failed_analysis():
+    client = MagicMock()
+    client.chat.completions.create.side_effect = connection_error()
+    with patch(
+        "mixedvoices.processors.success.get_openai_client", return_value=client
+    ), patch("mixedvoices.processors.success.get_model", return_value="gpt-4o"):
+        with pytest.raises(openai.APIConnectionError):
+            assess_success("bot: hi", "Greets the user")
+    get_breaker("openai").record_success()
+
+
+@patch("mixedvoices.core.circuit_breaker.BASE_BACKOFF_SECONDS", 0.3)
+def test_task_paused_during_outage(tmp_path, monkeypatch):
+    folder_paths = {status: tmp_path / status.value for status in TaskStatus}
+    for folder in folder_paths.values():
+        folder.mkdir()
+    monkeypatch.setattr(TASK_MANAGER, "folder_paths", folder_paths)
+
+    breaker = get_breaker("openai")
+    call_times = []
+
+    def run_task(task):
+        call_times.append(time.monotonic())
+        if len(call_times) == 1:
+            for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+                breaker.record_failure()
+            raise ProviderUnavailableError("openai", "connection error")
+
+    try:
+        with patch.object(TASK_MANAGER, "_run_task", side_effect=run_task):
+            task_id = TASK_MANAGER.add_task("outage")
+            start = time.time()
+            while TASK_MANAGER.get_task(task_id).status != TaskStatus.COMPLETED:
+                assert TASK_MANAGER.get_task(task_id).status != TaskStatus.FAILED
+                assert time.time() - start < 10
+                time.sleep(0.05)
+    finally:
+        breaker.record_success()
+
+    assert len(call_times) == 2
+    assert call_times[1] - call_times[0] >= 0.3
+    assert TASK_MANAGER.get_task(task_id).attempts == 1
+
+
+def test_task_requeued_on_outage_error(tmp_path, monkeypatch):
+    folder_paths = {status: tmp_path / status.value for status in TaskStatus}
+    for folder in folder_paths.values():
+        folder.mkdir()
+    monkeypatch.setattr(TASK_MANAGER, "folder_paths", folder_paths)
+
+    # Outage errors before the circuit opens don't fail the task either
+    errors = [connection_error() for _ in range(MAX_TASK_ATTEMPTS + 1)]
+
+    def run_task(task):
+        if errors:
+            raise errors.pop()
+
+    with patch.object(TASK_MANAGER, "_run_task", side_effect=run_task) as mock_run_task:
+        task_id = TASK_MANAGER.add_task("outage")
+        start = time.time()
+        while TASK_MANAGER.get_task(task_id).status != TaskStatus.COMPLETED:
+            assert TASK_MANAGER.get_task(task_id).status != TaskStatus.FAILED
+            assert time.time() - start < 10
+            time.sleep(0.05)
+
+    assert mock_run_task.call_count == MAX_TASK_ATTEMPTS + 2
+    assert TASK_MANAGER.get_task(task_id).attempts == 1
@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+import requests
+from httpx import RequestError
+
+from mixedvoices.core import task_manager
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.task_manager import TASK_MANAGER, TaskStatus
+from mixedvoices.core.utils import process_recording
+from mixedvoices.utils import (
+    DeadlineExceededError,
+    TaskCancelledError,
+    deadline,
+    get_timeout,
+    is_timeout_error,
+    submit_with_context,
+)
+
+
+@patch("mixedvoices.models.REQUEST_TIMEOUT", 5.0)
+def test_deadline():
+    assert get_timeout() == 5.0
+    with deadline(2):
+        assert 0 < get_timeout() <= 2
+        # Nested deadlines can shorten but never extend the outer one
+        with deadline(100):
+            assert get_timeout() <= 2
+        with deadline(1):
+            assert get_timeout() <= 1
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(get_timeout).result() == 5.0
+            assert submit_with_context(executor, get_timeout).result() <= 2
+
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceededError):
+            get_timeout()
+    assert get_timeout() == 5.0
+
+
+def test_is_timeout_error():
+    assert is_timeout_error(DeadlineExceededError("Task deadline exceeded"))
+    try:
+        try:
+            raise requests.exceptions.ReadTimeout("Read timed out")
+        except requests.exceptions.RequestException as e:
+            raise RequestError(f"API request failed: {str(e)}") from e
+    except RequestError as e:
+        assert is_timeout_error(e)
+    assert not is_timeout_error(ValueError("Invalid input"))
+
+
+def test_stage_failure_recorded(empty_project):
+    version = empty_project.load_version("v1")
+    recording = Recording("recording1", "audio.wav", version.id, version.project_id)
+    version._recordings[recording.id] = recording
+    recording._save()
+
+    with patch("mixedvoices.core.utils.AudioBuffer"), patch(
+        "mixedvoices.core.utils.get_transcript_and_duration",
+        side_effect=DeadlineExceededError("Task deadline exceeded"),
+    ):
+        with pytest.raises(DeadlineExceededError):
+            process_recording(recording, version)
+
+    recording = Recording._load(version.project_id, version.id, "recording1")
+    assert recording.task_status == "FAILED"
+    assert recording.stage_failures == {
+        "transcription": "Timed out: Task deadline exceeded"
+    }
+
+
+@patch("mixedvoices.models.TASK_DEADLINE", 0.1)
+def test_watchdog_requeues_stuck_task(tmp_path, monkeypatch):
+    folder_paths = {status: tmp_path / status.value for status in TaskStatus}
+    for folder in folder_paths.values():
+        folder.mkdir()
+    monkeypatch.setattr(TASK_MANAGER, "folder_paths", folder_paths)
+    monkeypatch.setattr(task_manager, "WATCHDOG_GRACE_SECONDS", 0)
+
+    release = threading.Event()
+    calls = []
+    abandoned_errors = []
+    recording = Recording("recording1", "audio.wav", "v1", "project")
+    monkeypatch.setattr(
+        Recording, "_path", property(lambda self: str(tmp_path / "info.json"))
+    )
+
+    def run_task(task):
+        calls.append(task.task_id)
+        if len(calls) == 1:
+            release.wait(10)  # Hangs in a way the deadline can't interrupt
+            try:
+                recording._save()
+            except TaskCancelledError as e:
+                abandoned_errors.append(e)
+
+    with patch.object(TASK_MANAGER, "_run_task", side_effect=run_task):
+        task_id = TASK_MANAGER.add_task("hang")
+        start = time.time()
+        while TASK_MANAGER.get_task(task_id).status != TaskStatus.COMPLETED:
+            assert time.time() - start < 10
+            time.sleep(0.1)
+        release.set()
+        start = time.time()
+        while not abandoned_errors:
+            assert time.time() - start < 10
+            time.sleep(0.1)
+
+    task = TASK_MANAGER.get_task(task_id)
+    assert task.attempts == 2
+    assert calls == [task_id, task_id]
+    # The abandoned thread can't overwrite the retry's results
+    assert not (tmp_path / "info.json").exists()
+    assert TASK_MANAGER.get_pending_task_count() == 0
@@ -0,0 +1,62 @@
+import os
+from unittest.mock import patch
+
+from mixedvoices.core.flow import ProjectFlow, get_flow_path
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.step_graph import upsert_step_path
+
+
+def add_call(version, recording_id, step_names, is_successful=True):
+    recording = Recording(
+        recording_id,
+        "audio.wav",
+        version.id,
+        version.project_id,
+        combined_transcript="1. bot: Hello",
+        task_status="COMPLETED",
+        is_successful=is_successful,
+        success_explanation="Judged",
+    )
+    version._recordings[recording.id] = recording
+    recording.step_ids = [
+        step.step_id for step in upsert_step_path(step_names, version, recording)
+    ]
+    recording._save()
+
+
+def test_project_flow(empty_project):
+    empty_project.create_version("v2", prompt="Testing prompt")
+    v1 = empty_project.load_version("v1")
+    v2 = empty_project.load_version("v2")
+    add_call(v1, "r1", ["Greeting", "Booking"])
+    add_call(v1, "r2", ["Greeting"], is_successful=False)
+    add_call(v2, "r3", ["Greeting", "Booking", "Farewell"], is_successful=False)
+
+    flow = {step["path"]: step for step in empty_project.get_flow()}
+    assert list(flow) == [
+        "Greeting",
+        "Greeting->Booking",
+        "Greeting->Booking->Farewell",
+    ]
+    greeting = flow["Greeting"]
+    assert greeting["previous_path"] is None
+    assert greeting["number_of_calls"] == 3
+    assert greeting["versions"] == {
+        "v1": {"calls": 2, "failed_calls": 1, "terminated_calls": 1},
+        "v2": {"calls": 1, "failed_calls": 0, "terminated_calls": 0},
+    }
+    assert flow["Greeting->Booking->Farewell"]["previous_path"] == "Greeting->Booking"
+    assert flow["Greeting->Booking->Farewell"]["number_of_failed_calls"] == 1
+
+    # Projects created before the flow have it built from their steps
+    os.remove(get_flow_path("empty_project"))
+    assert ProjectFlow.build("empty_project").to_list() == empty_project.get_flow()
+
+    # Rejudged success updates failed calls
+    response = {"success": True, "explanation": "Passed"}
+    with patch("mixedvoices.core.utils.get_success", return_value=response):
+        empty_project.update_success_criteria("New criteria", rejudge=False)
+        empty_project.load_version("v2").rejudge_success()
+    flow = {step["path"]: step for step in empty_project.get_flow()}
+    assert flow["Greeting->Booking->Farewell"]["number_of_failed_calls"] == 0
+    assert flow["Greeting"]["number_of_failed_calls"] == 1
@@ -0,0 +1,110 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from mixedvoices.core.paths import get_path_stats, get_path_stats_path
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.step import Step
+from mixedvoices.core.step_graph import update_step_failed_calls, upsert_step_path
+
+
+def add_call(version, recording_id, step_names, is_successful=True):
+    recording = Recording(
+        recording_id,
+        "audio.wav",
+        version.id,
+        version.project_id,
+        is_successful=is_successful,
+    )
+    version._recordings[recording.id] = recording
+    upsert_step_path(step_names, version, recording)
+
+
+def test_path_stats(empty_project):
+    empty_project.create_version("v2", prompt="Testing prompt")
+    version = empty_project.load_version("v1")
+    add_call(version, "r1", ["Greeting", "Booking"])
+    add_call(version, "r2", ["Greeting", "Booking"])
+    add_call(version, "r3", ["Greeting", "Farewell"], is_successful=False)
+    assert version._get_paths() == ["Greeting->Booking", "Greeting->Farewell"]
+
+    # Saved paths are updated once the flow changes
+    assert os.path.exists(get_path_stats_path("empty_project", "v1"))
+    add_call(version, "r4", ["Greeting", "Transfer"], is_successful=False)
+    add_call(version, "r5", ["Greeting", "Transfer"])
+    assert version._get_paths(top_k=1) == ["Greeting->Booking"]
+    assert version.get_path_stats(top_k=2, sort_by="failure_rate") == [
+        {
+            "path": "Greeting->Farewell",
+            "calls": 1,
+            "failed_calls": 1,
+            "failure_rate": 1.0,
+        },
+        {
+            "path": "Greeting->Transfer",
+            "calls": 2,
+            "failed_calls": 1,
+            "failure_rate": 0.5,
+        },
+    ]
+    with pytest.raises(ValueError):
+        version.get_path_stats(sort_by="duration")
+    with pytest.raises(ValueError):
+        version.get_path_stats(top_k=0)
+
+    # And once failed calls change, as after judging success again
+    booking = next(s for s in version._steps.values() if s.name == "Booking")
+    update_step_failed_calls(version, {booking.step_id: 1})
+    assert version.get_path_stats(top_k=1)[0]["failed_calls"] == 1
+    update_step_failed_calls(version, {booking.step_id: -1})
+
+    # Equal paths of different versions are combined, without loading versions
+    add_call(empty_project.load_version("v2"), "r6", ["Greeting", "Farewell"])
+    with patch(
+        "mixedvoices.core.version.Version._load",
+        side_effect=Exception("Version loaded"),
+    ):
+        path_stats = empty_project.get_path_stats(top_k=1, sort_by="failure_rate")
+    assert path_stats == [
+        {
+            "path": "Greeting->Farewell",
+            "calls": 2,
+            "failed_calls": 1,
+            "failure_rate": 0.5,
+        }
+    ]
+    assert len(empty_project._get_paths()) == 3
+
+
+def test_call_ended_at_interior_step(empty_project):
+    version = empty_project.load_version("v1")
+    add_call(version, "r1", ["Greeting", "Booking", "Farewell"])
+    add_call(version, "r2", ["Greeting", "Booking"], is_successful=False)
+    add_call(version, "r3", ["Greeting"], is_successful=False)
+    add_call(version, "r4", ["Greeting", "Booking", "Farewell"], is_successful=False)
+
+    assert version.get_path_stats() == [
+        {"path": "Greeting", "calls": 1, "failed_calls": 1, "failure_rate": 1.0},
+        {
+            "path": "Greeting->Booking",
+            "calls": 1,
+            "failed_calls": 1,
+            "failure_rate": 1.0,
+        },
+        {
+            "path": "Greeting->Booking->Farewell",
+            "calls": 2,
+            "failed_calls": 1,
+            "failure_rate": 0.5,
+        },
+    ]
+
+
+def test_deep_flow():
+    steps = [Step(f"Step {i}", "v1", "project") for i in range(5000)]
+    for step, next_step in zip(steps, steps[1:]):
+        step.next_steps = [next_step]
+    path_stats = get_path_stats(steps[:1])
+    assert len(path_stats) == 1
+    assert path_stats[0]["path"].endswith("Step 4998->Step 4999")
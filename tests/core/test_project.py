@@ -23,3 +23,21 @@ def empty_project(empty_project):
 
     with pytest.raises(ValueError):
         project.create_version("v1", prompt="Testing prompt")
+
+
+def test_call_metrics(empty_project):
+    call_metric = mv.metrics.CallMetric("speech_ratio", "my_metrics:speech_ratio")
+    empty_project.add_call_metrics([call_metric])
+    with pytest.raises(FileExistsError):
+        empty_project.add_call_metrics([call_metric])
+    with pytest.raises(TypeError):
+        empty_project.add_call_metrics(["my_metrics:speech_ratio"])
+    with pytest.raises(ValueError):
+        empty_project.add_call_metrics([mv.metrics.CallMetric("WPM", "my_metrics:wpm")])
+
+    project = mv.load_project("empty_project")
+    assert project.call_metrics == [call_metric]
+    project.remove_call_metric("speech_ratio")
+    with pytest.raises(KeyError):
+        project.remove_call_metric("speech_ratio")
+    assert mv.load_project("empty_project").call_metrics == []
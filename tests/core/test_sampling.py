@@ -0,0 +1,146 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+import mixedvoices as mv
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.sampling import (
+    SamplingPolicy,
+    get_sampling_decision,
+    get_sampling_weights,
+    get_strata_path,
+)
+
+
+def add_recording(version, is_successful=True, duration=60, sampling=None):
+    recording = Recording(
+        f"recording{len(version._recordings)}",
+        "audio.wav",
+        version.id,
+        version.project_id,
+        combined_transcript="1. bot: Hello",
+        is_successful=is_successful,
+        duration=duration,
+        sampling=sampling,
+    )
+    version._recordings[recording.id] = recording
+    recording._save()
+    return recording
+
+
+def test_sampling_policy(empty_project):
+    with pytest.raises(ValueError):
+        SamplingPolicy(rate=1.5)
+
+    assert empty_project.sampling_policy.rate == 1
+    empty_project.update_sampling_policy(SamplingPolicy(rate=0.25))
+    project = mv.load_project("empty_project")
+    assert project.sampling_policy == SamplingPolicy(rate=0.25)
+
+    with pytest.raises(TypeError):
+        project.update_sampling_policy({"rate": 0.5})
+
+
+def test_sampling_decision(empty_project):
+    version = empty_project.load_version("v1")
+    policy = SamplingPolicy(rate=0.25, short_call_seconds=30)
+
+    failed = add_recording(version, is_successful=False)
+    assert get_sampling_decision(policy, failed, version) == {
+        "stratum": "always",
+        "scored": True,
+    }
+    short = add_recording(version, duration=10)
+    assert get_sampling_decision(policy, short, version)["scored"]
+
+    # Exactly every 4th recording of the version is scored
+    decisions = []
+    for _ in range(8):
+        recording = add_recording(version)
+        recording.sampling = get_sampling_decision(policy, recording, version)
+        decisions.append(recording.sampling["scored"])
+    assert decisions == [False, False, False, True] * 2
+
+    unstratified = SamplingPolicy(rate=0.0, stratify_by_version=False)
+    assert not get_sampling_decision(unstratified, recording, version)["scored"]
+
+
+def test_sampling_weights():
+    recordings = [
+        {"sampling": {"stratum": "always", "scored": True}},
+        {"sampling": {"stratum": "version:v1", "scored": True}},
+        {"sampling": {"stratum": "version:v1", "scored": False}},
+        {"sampling": {"stratum": "version:v1", "scored": False}},
+        {"sampling": None},
+    ]
+    assert get_sampling_weights(recordings) == [1.0, 3.0, None, None, 1.0]
+
+
+def test_backfill_metrics(empty_project):
+    empty_project.add_metrics([mv.metrics.empathy])
+    version = empty_project.load_version("v1")
+    sampled_out = {"stratum": "version:v1", "scored": False}
+    recording = add_recording(version, sampling=sampled_out)
+
+    scores = {"empathy": {"explanation": "This is a test", "score": 5}}
+    with patch(
+        "mixedvoices.core.utils.generate_scores", return_value=scores
+    ) as mock_generate_scores:
+        version.backfill_metrics()
+        version.backfill_metrics()  # Nothing left to score
+
+    assert mock_generate_scores.call_count == 1
+    version = mv.load_project("empty_project").load_version("v1")
+    recording = version.get_recording(recording.id)
+    assert recording.llm_metrics == scores
+    assert recording.sampling["scored"]
+
+
+def test_sampling_decision_across_versions_objects(empty_project):
+    policy = SamplingPolicy(rate=0.5)
+    # Tasks processing recordings in parallel each load their own Version
+    versions = [empty_project.load_version("v1") for _ in range(2)]
+    recordings = [add_recording(versions[0]) for _ in range(4)]
+    decisions = []
+    for i, recording in enumerate(recordings):
+        recording.sampling = get_sampling_decision(policy, recording, versions[i % 2])
+        recording._save()
+        decisions.append(recording.sampling["scored"])
+    assert decisions == [False, True, False, True]
+    # A retried recording reuses the position saved on it
+    recording = Recording._load("empty_project", "v1", recordings[1].id)
+    assert get_sampling_decision(policy, recording, versions[0]) == {
+        "stratum": "version:v1",
+        "scored": True,
+        "position": 1,
+    }
+
+    # Counts are built again from saved positions if missing
+    os.remove(get_strata_path("empty_project", "v1"))
+    recording = add_recording(versions[0])
+    assert get_sampling_decision(policy, recording, versions[0])["position"] == 4
+
+
+def test_full_rate_claims_no_position(empty_project):
+    version = empty_project.load_version("v1")
+    recording = add_recording(version)
+    assert get_sampling_decision(SamplingPolicy(), recording, version) == {
+        "stratum": "version:v1",
+        "scored": True,
+    }
+    assert not os.path.exists(get_strata_path("empty_project", "v1"))
+
+
+def test_backfill_metrics_failed_analysis(empty_project):
+    empty_project.add_metrics([mv.metrics.empathy])
+    version = empty_project.load_version("v1")
+    sampled_out = {"stratum": "version:v1", "scored": False}
+    recording = add_recording(version, sampling=sampled_out)
+
+    scores = {"empathy": {"explanation": "Analysis failed", "score": "N/A"}}
+    with patch("mixedvoices.core.utils.generate_scores", return_value=scores):
+        version.backfill_metrics()
+
+    version = mv.load_project("empty_project").load_version("v1")
+    assert not version.get_recording(recording.id).sampling["scored"]
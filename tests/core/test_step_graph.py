@@ -0,0 +1,75 @@
+import threading
+
+import mixedvoices as mv
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.step_graph import upsert_step_path
+from mixedvoices.core.step_index import get_step_counts
+
+
+def make_recording(version, recording_id, is_successful=True):
+    recording = Recording(
+        recording_id,
+        "audio.wav",
+        version.id,
+        version.project_id,
+        is_successful=is_successful,
+    )
+    version._recordings[recording.id] = recording
+    return recording
+
+
+def test_parallel_upserts(empty_project):
+    barrier = threading.Barrier(8, timeout=10)
+    errors = []
+
+    def ingest(i):
+        try:
+            # Each task loads its own Version, as the task manager does
+            version = mv.load_project("empty_project").load_version("v1")
+            recording = make_recording(version, f"r{i}", is_successful=i % 2 == 0)
+            barrier.wait()
+            upsert_step_path(
+                ["Greeting", "Booking", f"Option {i % 2}"], version, recording
+            )
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+    version = mv.load_project("empty_project").load_version("v1")
+    assert sorted(step.name for step in version._steps.values()) == [
+        "Booking",
+        "Greeting",
+        "Option 0",
+        "Option 1",
+    ]
+    (greeting,) = version._starting_steps
+    assert greeting.number_of_calls == 8
+    (booking,) = greeting.next_steps
+    assert sorted(booking.next_step_ids) == sorted(
+        step.step_id for step in booking.next_steps
+    )
+    failed = {step.name: step.number_of_failed_calls for step in booking.next_steps}
+    assert failed == {"Option 0": 0, "Option 1": 4}
+    assert get_step_counts("empty_project")["Greeting"] == 8
+    flow = {step["path"]: step for step in empty_project.get_flow()}
+    assert flow["Greeting"]["number_of_calls"] == 8
+    assert flow["Greeting->Booking->Option 1"]["number_of_failed_calls"] == 4
+
+
+def test_upsert_is_idempotent(empty_project):
+    version = empty_project.load_version("v1")
+    recording = make_recording(version, "r1", is_successful=False)
+    steps = upsert_step_path(["Greeting", "Farewell"], version, recording)
+    assert upsert_step_path(["Greeting", "Farewell"], version, recording) == steps
+
+    version = mv.load_project("empty_project").load_version("v1")
+    assert [step.number_of_calls for step in version._steps.values()] == [1, 1]
+    assert version.get_step(steps[-1].step_id).number_of_failed_calls == 1
+    assert get_step_counts("empty_project") == {"Greeting": 1, "Farewell": 1}
+    assert empty_project.get_flow()[0]["number_of_calls"] == 1
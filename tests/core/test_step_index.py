@@ -0,0 +1,32 @@
+import os
+
+import mixedvoices as mv
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.step_graph import upsert_step_path
+from mixedvoices.core.step_index import StepIndex, get_step_index_path
+
+
+def add_call(version, recording_id, step_names):
+    recording = Recording(
+        recording_id, "audio.wav", version.id, version.project_id, is_successful=True
+    )
+    version._recordings[recording.id] = recording
+    upsert_step_path(step_names, version, recording)
+
+
+def test_step_index(empty_project):
+    empty_project.create_version("v2", prompt="Testing prompt")
+    add_call(empty_project.load_version("v1"), "r1", ["Greeting", "Booking"])
+    add_call(empty_project.load_version("v2"), "r2", ["Greeting", "Farewell"])
+    add_call(empty_project.load_version("v2"), "r3", ["Greeting", "Greeting"])
+
+    index = StepIndex.load("empty_project")
+    assert index.step_counts == {"Greeting": 3, "Booking": 1, "Farewell": 1}
+    assert index.step_names == ["Greeting", "Booking", "Farewell"]
+    assert empty_project._get_step_names() == index.step_names
+
+    # Projects created before the index have it built from their steps
+    os.remove(get_step_index_path("empty_project"))
+    assert StepIndex.build("empty_project").step_counts == index.step_counts
+    add_call(mv.load_project("empty_project").load_version("v1"), "r4", ["Booking"])
+    assert StepIndex.load("empty_project").step_counts["Booking"] == 2
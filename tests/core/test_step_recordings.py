@@ -0,0 +1,118 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.step_graph import upsert_step_path
+from mixedvoices.core.step_recordings import (
+    get_step_recordings,
+    get_step_recordings_path,
+    refresh_recording_rows,
+)
+
+
+def add_call(version, recording_id, created_at, is_successful):
+    recording = Recording(
+        recording_id,
+        "audio.wav",
+        version.id,
+        version.project_id,
+        created_at=created_at,
+        combined_transcript="1. bot: Hello",
+        is_successful=is_successful,
+        summary="A call",
+        llm_metrics={"empathy": {"explanation": "Kind", "score": 8}},
+    )
+    version._recordings[recording.id] = recording
+    recording.step_ids = [
+        step.step_id
+        for step in upsert_step_path(["Greeting", "Booking"], version, recording)
+    ]
+    recording._save()
+    return recording
+
+
+def test_step_recordings(empty_project):
+    version = empty_project.load_version("v1")
+    recordings = [
+        add_call(version, f"r{i}", 1000 - i, is_successful=i % 3 != 0)
+        for i in range(10)
+    ]
+    # Retried task, counted once
+    upsert_step_path(["Greeting", "Booking"], version, recordings[0])
+    (greeting,) = version._starting_steps
+
+    page = version.get_step_recordings(greeting.step_id, limit=4)
+    assert page["total"] == 10
+    assert page["successful"] == 6
+    assert [row["id"] for row in page["recordings"]] == ["r0", "r1", "r2", "r3"]
+    row = page["recordings"][0]
+    assert "combined_transcript" not in row
+    assert row["llm_metrics"] == {"empathy": {"score": 8}}
+
+    page = version.get_step_recordings(greeting.step_id, offset=8, limit=4)
+    assert [row["id"] for row in page["recordings"]] == ["r8", "r9"]
+    page = version.get_step_recordings(greeting.step_id, offset=12)
+    assert page["recordings"] == []
+
+    page = version.get_step_recordings(
+        greeting.step_id, limit=2, is_successful=False, order="asc"
+    )
+    assert page["total"] == 4
+    assert page["successful"] == 0
+    assert [row["id"] for row in page["recordings"]] == ["r9", "r6"]
+
+    with pytest.raises(ValueError):
+        version.get_step_recordings(greeting.step_id, order="newest")
+    with pytest.raises(ValueError):
+        version.get_step_recordings(greeting.step_id, limit=0)
+    with pytest.raises(KeyError):
+        version.get_step_recordings("invalid")
+
+    # Rejudged recordings are refreshed in every step they reached
+    recordings[0].is_successful = True
+    refresh_recording_rows(version, [recordings[0]])
+    (booking,) = greeting.next_steps
+    page = version.get_step_recordings(booking.step_id, is_successful=True)
+    assert page["total"] == 7
+    assert page["recordings"][0]["id"] == "r0"
+
+    # An ingest appends a row, without rewriting the rows before it
+    path = get_step_recordings_path("empty_project", "v1", booking.step_id)
+    with open(path, "rb") as f:
+        rows = f.read()
+    add_call(version, "r10", 2000, is_successful=True)
+    with open(path, "rb") as f:
+        new_rows = f.read()
+    assert new_rows.startswith(rows)
+    assert new_rows.count(b"\n") == rows.count(b"\n") + 1
+    page = version.get_step_recordings(booking.step_id, limit=1)
+    assert [row["id"] for row in page["recordings"]] == ["r10"]
+    assert page["total"] == 11
+
+    # Superseded rows are dropped once they outnumber the latest ones
+    refresh_recording_rows(version, recordings)
+    page = version.get_step_recordings(booking.step_id, offset=10)
+    assert [row["id"] for row in page["recordings"]] == ["r9"]
+    assert page["successful"] == 8
+    with open(path, "rb") as f:
+        assert f.read().count(b"\n") == 11
+
+
+def test_step_recordings_built_without_version(sample_project):
+    version = sample_project.load_version("v1")
+    step = max(version._steps.values(), key=lambda step: step.number_of_calls)
+    path = get_step_recordings_path("sample_project", "v1", step.step_id)
+    assert not os.path.exists(path)
+
+    with patch(
+        "mixedvoices.core.version.Version._load",
+        side_effect=Exception("Version loaded"),
+    ):
+        page = get_step_recordings("sample_project", "v1", step.step_id)
+    assert os.path.exists(path)
+    assert page["total"] == step.number_of_calls
+    assert {row["id"] for row in page["recordings"]} == set(step.recording_ids)
+    created_at = [row["created_at"] for row in page["recordings"]]
+    assert created_at == sorted(created_at, reverse=True)
@@ -1,8 +1,14 @@
 from time import sleep
+from unittest.mock import patch
 
 import pytest
+from openai.types.audio import TranscriptionWord
+from pytest import approx
 
 import mixedvoices as mv
+from mixedvoices.core.recording import Recording
+from mixedvoices.core.step import Step
+from mixedvoices.processors.timeline import WordTimeline
 
 
 def check_recording(recording):
@@ -52,3 +58,168 @@ def test_add_recording(empty_project, mock_process_recording):
     for recording in version._recordings.values():
         check_recording(recording)
         assert recording.success_explanation == "Test success explanation"
+
+
+def test_recompute_call_metrics(empty_project):
+    version = empty_project.load_version("v1")
+    snr = {"user_snr": "20.0 dB", "agent_snr": "18.0 dB"}
+    recording = Recording(
+        "recording1",
+        "audio.wav",
+        version.id,
+        version.project_id,
+        duration=60,
+        call_metrics={"average_latency": 5, **snr},
+    )
+    version._recordings[recording.id] = recording
+    recording._save()
+    version.recompute_call_metrics()  # No saved timeline, nothing to do
+
+    user_words = [TranscriptionWord(word="Hi", start=0.0, end=0.5)]
+    agent_words = [TranscriptionWord(word="Hello", start=1.5, end=2.0)]
+    recording._save_timeline(WordTimeline.from_words(user_words, agent_words))
+    version.recompute_call_metrics()
+
+    version = mv.load_project("empty_project").load_version("v1")
+    call_metrics = version.get_recording("recording1").call_metrics
+    assert call_metrics["average_latency"] == approx(1.0)
+    assert call_metrics["wpm"] == approx(120)
+    assert call_metrics["user_snr"] == snr["user_snr"]  # Kept, needs the audio
+    assert version.get_recording("recording1").turn_timing["latencies"] == [1.0]
+
+
+def test_latency_percentiles(empty_project):
+    version = empty_project.load_version("v1")
+    assert version.get_latency_percentiles() == {
+        "p50_latency": None,
+        "p90_latency": None,
+        "p99_latency": None,
+        "turns": 0,
+        "overlap_seconds": 0.0,
+    }
+    for i, latencies in enumerate([[1.0, 2.0], [3.0], []]):
+        recording = Recording(
+            f"recording{i}",
+            "audio.wav",
+            version.id,
+            version.project_id,
+            turn_timing={"latencies": latencies, "overlaps": [0.5]},
+        )
+        version._recordings[recording.id] = recording
+
+    res = version.get_latency_percentiles([50, 99.9])
+    assert res["p50_latency"] == approx(2.0)
+    assert res["p99.9_latency"] == approx(3.0, abs=0.01)
+    assert res["turns"] == 3
+    assert res["overlap_seconds"] == approx(1.5)
+
+
+def add_scored_recording(version, recording_id, **kwargs):
+    recording = Recording(
+        recording_id,
+        "audio.wav",
+        version.id,
+        version.project_id,
+        combined_transcript="1. bot: Hello",
+        task_status="COMPLETED",
+        **kwargs,
+    )
+    version._recordings[recording.id] = recording
+    recording._save()
+    return recording
+
+
+def test_rescore_stale_metrics(empty_project):
+    empty_project.add_metrics([mv.metrics.empathy])
+    version = empty_project.load_version("v1")
+    add_scored_recording(version, "recording1")
+    add_scored_recording(version, "recording2")
+
+    def side_effect(transcript, prompt, metrics):
+        return {metric.name: {"explanation": "Test", "score": 5} for metric in metrics}
+
+    def rescore():
+        version = mv.load_project("empty_project").load_version("v1")
+        with patch(
+            "mixedvoices.core.utils.generate_scores", side_effect=side_effect
+        ) as mock_generate_scores:
+            version.rescore_stale_metrics()
+        return [
+            sorted(metric.name for metric in call.args[2])
+            for call in mock_generate_scores.call_args_list
+        ]
+
+    assert rescore() == [["empathy"]] * 2
+    assert rescore() == []  # Nothing stale
+
+    empty_project.add_metrics([mv.metrics.verbatim_repetition])
+    assert rescore() == [["verbatim repetition"]] * 2
+
+    empathy = mv.metrics.Metric("empathy", "Changed definition", "binary")
+    empty_project.update_metric(empathy)
+    assert rescore() == [["empathy"]] * 2
+
+    version = mv.load_project("empty_project").load_version("v1")
+    recording = version.get_recording("recording1")
+    assert set(recording.llm_metrics) == {"empathy", "verbatim repetition"}
+    assert recording.llm_metric_hashes["empathy"] == empathy.definition_hash
+
+
+def test_rejudge_success(empty_project):
+    version = empty_project.load_version("v1")
+    step = Step("Greeting", version.id, version.project_id)
+    version._steps[step.step_id] = step
+    judged = add_scored_recording(
+        version,
+        "judged",
+        is_successful=False,
+        success_explanation="Failed",
+        step_ids=[step.step_id],
+    )
+    step.record_usage(judged, True, False)
+    step.save()
+    add_scored_recording(version, "labelled", is_successful=False)
+
+    response = {"success": True, "explanation": "Passed"}
+    with patch(
+        "mixedvoices.core.utils.get_success", return_value=response
+    ) as mock_get_success:
+        version.rejudge_success()
+        version.rejudge_success()  # Already judged against these criteria
+        assert mock_get_success.call_count == 1
+        empty_project.update_success_criteria("New criteria", rejudge=False)
+        mv.load_project("empty_project").load_version("v1").rejudge_success()
+
+    assert mock_get_success.call_count == 2
+    version = mv.load_project("empty_project").load_version("v1")
+    assert version.get_recording("judged").is_successful
+    assert not version.get_recording("labelled").is_successful
+    assert version.get_step(step.step_id).number_of_failed_calls == 0
+
+    with patch("mixedvoices.core.version.Version.rejudge_success") as mock_rejudge:
+        empty_project.update_success_criteria("Other criteria")
+        mock_rejudge.assert_not_called()
+        empty_project.update_success_criteria(None, rejudge=True)
+    mock_rejudge.assert_called_once_with(blocking=False)
+
+
+@patch("mixedvoices.core.task_manager.VERSION_TASK_BATCH_SIZE", 2)
+def test_rejudge_success_in_batches(empty_project):
+    empty_project.update_success_criteria("Criteria")
+    version = empty_project.load_version("v1")
+    for i in range(5):
+        add_scored_recording(version, f"recording{i}")
+
+    # Each batch is its own task, so none runs past TASK_DEADLINE
+    with patch(
+        "mixedvoices.core.task_manager.TASK_MANAGER.add_task",
+        side_effect=lambda task_type, **params: f"task{len(params['recording_ids'])}",
+    ) as mock_add_task:
+        task_ids = version.rejudge_success(blocking=False)
+
+    assert task_ids == ["task2", "task2", "task1"]
+    batches = [call.kwargs["recording_ids"] for call in mock_add_task.call_args_list]
+    assert sorted(sum(batches, [])) == [f"recording{i}" for i in range(5)]
+    assert all(
+        call.args == ("rejudge_success",) for call in mock_add_task.call_args_list
+    )
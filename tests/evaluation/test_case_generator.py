@@ -1,7 +1,11 @@
+import threading
 from unittest.mock import patch
 
 from conftest import needs_deepgram_key
 from mixedvoices import TestCaseGenerator
+from mixedvoices.evaluation.test_case_generator import (
+    generate_test_cases_from_recordings,
+)
 
 
 @needs_deepgram_key
@@ -37,3 +41,29 @@ def test_test_case_generator(sample_project, mock_generate_test_cases):
     result = generator.generate()
 
     assert len(result) == 12
+
+
+def test_recordings_transcribed_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def transcribe(path, user_channel):
+        barrier.wait()  # Both recordings must be in flight at once
+        return f"{path} {user_channel}", None, 10
+
+    module = "mixedvoices.evaluation.test_case_generator"
+    with patch(f"{module}.get_transcript_and_duration", side_effect=transcribe), patch(
+        f"{module}.generate_test_cases_from_transcripts",
+        side_effect=lambda prompt, transcripts, **kwargs: transcripts,
+    ):
+        transcripts = generate_test_cases_from_recordings(
+            "prompt", ["a.wav", "b.wav"], ["left", "right"]
+        )
+    assert transcripts == ["a.wav left", "b.wav right"]
+
+
+def test_top_paths(sample_project):
+    generator = TestCaseGenerator("prompt")
+    generator.add_from_version(sample_project.load_version("v1"), top_k=1)
+    assert generator.num_cases == 1
+    generator.add_from_project(sample_project, cases_per_path=2, sort_by="failure_rate")
+    assert generator.num_cases == 5
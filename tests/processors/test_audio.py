@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from mixedvoices.core.utils import get_transcript_and_duration
+from mixedvoices.processors.audio import AudioBuffer, load_channels, probe_audio
+from mixedvoices.processors.call_metrics import calculate_stereo_snr
+
+
+def write_audio(path, channels, sample_rate=8000, seconds=2.5):
+    samples = np.zeros((int(sample_rate * seconds), channels), dtype=np.float32)
+    samples[:, 0] = 0.5
+    sf.write(path, samples, sample_rate)
+
+
+def test_probe_audio(tmp_path):
+    audio_path = str(tmp_path / "call.wav")
+    write_audio(audio_path, channels=2)
+
+    info = probe_audio(audio_path)
+    assert info.duration == pytest.approx(2.5)
+    assert info.channels == 2
+    assert info.sample_rate == 8000
+
+    y, sr = load_channels(audio_path)
+    assert sr == 8000  # Not resampled
+    assert y.shape == (2, 20000)
+    assert y.dtype == np.float32
+    assert y[0, 0] == pytest.approx(0.5) and y[1, 0] == 0
+
+
+def test_mono_audio_rejected(tmp_path):
+    audio_path = str(tmp_path / "call.wav")
+    write_audio(audio_path, channels=1)
+    with pytest.raises(ValueError, match="stereo"):
+        get_transcript_and_duration(audio_path)
+
+
+def test_audio_buffer(tmp_path):
+    wav_path = str(tmp_path / "call.wav")
+    write_audio(wav_path, channels=2)
+    audio = AudioBuffer.from_file(wav_path)
+    assert isinstance(audio.samples, np.memmap)  # PCM WAV is memory mapped
+    assert audio.channels == 2
+    assert audio.duration == pytest.approx(2.5)
+    with pytest.raises(ValueError):
+        audio.channel(0)[0] = 0  # Shared read only
+
+    mp3_path = str(tmp_path / "call.mp3")
+    write_audio(mp3_path, channels=2)
+    audio = AudioBuffer.from_file(mp3_path)
+    assert audio.channels == 2
+    assert audio.duration == pytest.approx(2.5, abs=0.1)
+
+
+def test_snr_from_buffer(tmp_path):
+    rng = np.random.default_rng(0)
+    samples = 0.01 * rng.standard_normal((16000, 2))
+    samples[1000:, 0] += 0.5 * np.sin(np.arange(15000) / 10)
+    wav_path = str(tmp_path / "call.wav")
+    mp3_path = str(tmp_path / "call.mp3")
+    sf.write(wav_path, samples, 8000, subtype="PCM_16")
+    sf.write(mp3_path, samples, 8000)
+
+    user_snr, _ = calculate_stereo_snr(AudioBuffer.from_file(wav_path))
+    assert user_snr == calculate_stereo_snr(wav_path)[0]
+    assert float(user_snr.split()[0]) > 20
+    # mp3 files used to fail as they were read with scipy's wavfile
+    assert calculate_stereo_snr(mp3_path)[0] != "N/A"
@@ -0,0 +1,71 @@
+import numpy as np
+import soundfile as sf
+from pytest import approx
+
+from mixedvoices.processors.audio import AudioBuffer
+from mixedvoices.processors.audio_quality import analyze_audio_quality, load_windows
+
+
+def write_call(path, sample_rate=8000):
+    """User speaks for 3s, agent for 2s with clipping, then 7s of dead air"""
+    rng = np.random.default_rng(0)
+    samples = 0.01 * rng.standard_normal((12 * sample_rate, 2))
+    t = np.arange(2 * sample_rate) / sample_rate
+    samples[: 3 * sample_rate, 0] += 0.5 * np.sin(np.arange(3 * sample_rate) / 10)
+    samples[3 * sample_rate : 5 * sample_rate, 1] += np.clip(
+        1.5 * np.sin(2 * np.pi * 200 * t), -1, 1
+    )
+    sf.write(path, samples, sample_rate, subtype="PCM_16")
+
+
+def test_audio_quality(tmp_path):
+    audio_path = str(tmp_path / "call.wav")
+    write_call(audio_path)
+    audio = AudioBuffer.from_file(audio_path)
+    quality = analyze_audio_quality(audio)
+
+    assert quality.energy_db.shape == (2, 600)
+    assert quality.noise_floor_db == approx([-40, -40], abs=1)
+    assert np.all(quality.snr_db() > 20)
+    clipped = quality.clipped_percent()
+    assert clipped[0] == 0 and clipped[1] > 1
+    assert quality.dead_air().tolist() == [[approx(5.0), approx(12.0)]]
+
+    summary = quality.summary()
+    assert float(summary["user_snr"].split()[0]) > 20
+    assert summary["dead_air_seconds"] == approx(7.0)
+    assert summary["longest_dead_air"] == approx(7.0)
+
+    # Blocks of frames give the same result, channels swap for a right user
+    blocked = analyze_audio_quality(audio, block_frames=7)
+    assert np.array_equal(blocked.energy_db, quality.energy_db)
+    assert np.array_equal(blocked.clipped, quality.clipped)
+    swapped = analyze_audio_quality(audio, "right")
+    assert swapped.summary()["agent_snr"] == summary["user_snr"]
+
+
+def test_audio_quality_windows(tmp_path):
+    audio_path = str(tmp_path / "call.wav")
+    write_call(audio_path)
+    quality = analyze_audio_quality(AudioBuffer.from_file(audio_path))
+
+    windows = quality.windows()
+    assert windows["starts"].tolist() == approx(list(range(12)))
+    assert windows["level_db"].shape == (2, 12)
+    assert windows["speech"][0].tolist() == approx([1] * 3 + [0] * 9, abs=0.05)
+    assert windows["clipped"][1, 3:5].min() > 0
+    assert windows["clipped"][0].sum() == 0
+
+    path = str(tmp_path / "audio_quality.npz")
+    quality.save(path)
+    loaded = load_windows(path)
+    assert loaded["window_seconds"] == 1.0
+    assert loaded["level_db"] == approx(windows["level_db"], abs=1e-4)
+
+
+def test_silent_audio():
+    audio = AudioBuffer(np.zeros((2, 32000), dtype=np.int16), 8000)
+    summary = analyze_audio_quality(audio).summary()
+    assert summary["user_snr"] == summary["agent_snr"] == "N/A"
+    assert summary["dead_air_seconds"] == approx(4.0)
+    assert analyze_audio_quality(AudioBuffer(np.zeros((2, 10)), 8000)).summary()
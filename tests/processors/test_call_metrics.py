@@ -4,10 +4,14 @@ from openai.types.audio import TranscriptionWord
 from pytest import approx
 
 from mixedvoices.processors.call_metrics import (
+    BUILTIN_CALL_METRICS,
+    analyze_turns,
     calculate_latency_and_interruptions,
     calculate_stereo_snr,
     calculate_wpm,
+    get_call_metrics,
 )
+from mixedvoices.processors.timeline import AGENT, USER, WordTimeline
 
 
 def test_clean_audio():
@@ -23,6 +27,10 @@ def test_noisy_audio():
     assert float(right_snr.split()[0]) > 0
 
 
+def words(*timed_words):
+    return [TranscriptionWord(word=w, start=s, end=s + 0.3) for w, s in timed_words]
+
+
 def load_words(file_path):
     with open(file_path, "r") as f:
         words = json.load(f)
@@ -33,22 +41,57 @@ def load_words(file_path):
     ]
 
 
-def test_latency_and_interruptions():
-    user_words = load_words("tests/assets/user_words.json")
-    agent_words = load_words("tests/assets/agent_words.json")
+def load_timeline():
+    return WordTimeline.from_words(
+        load_words("tests/assets/user_words.json"),
+        load_words("tests/assets/agent_words.json"),
+    )
 
-    res = calculate_latency_and_interruptions(user_words, agent_words, 76)
-    assert res["average_latency"] == approx(1.587)
+
+def test_latency_and_interruptions():
+    res = calculate_latency_and_interruptions(load_timeline(), 76)
+    # Measured from the user's last utterance before each agent turn
+    assert res["average_latency"] == approx(1.085)
+    assert res["p50_latency"] == approx(1.09, abs=1e-3)
+    assert res["p90_latency"] <= res["p99_latency"] <= 1.355
     assert res["user_interruptions_per_minute"] == 0
     assert res["agent_interruptions_per_minute"] == 0
+    assert res["overlap_seconds"] == 0
+    assert res["user_talk_ratio"] == approx(18.26 / 76)
+    assert res["agent_talk_ratio"] == approx(42.0 / 76, rel=1e-3)
+
+
+def test_turns():
+    user_words = words(("Hi", 0.0), ("there", 0.3), ("wait", 3.0), ("no", 5.0))
+    agent_words = words(
+        ("Hello", 1.0), ("How", 2.0), ("can", 2.4), ("I", 2.8), ("Sure", 5.4)
+    )
+    turns = analyze_turns(WordTimeline.from_words(user_words, agent_words))
+
+    # "wait" talks over the agent, the reply to "no" is under the threshold
+    assert turns.latencies.tolist() == approx([0.4])
+    assert turns.overlaps.tolist() == approx([0.1])
+    assert turns.user_interruptions == 1
+    assert turns.agent_interruptions == 1
+    assert turns.user_talk_time == approx(0.6 + 0.3 + 0.3)
+    assert turns.to_dict() == {"latencies": [0.4], "overlaps": [0.1]}
+
+    empty = analyze_turns(WordTimeline.from_words([], []))
+    assert len(empty.latencies) == 0 and empty.agent_interruptions == 0
+    res = calculate_latency_and_interruptions(WordTimeline.from_words([], []), 60)
+    assert res["average_latency"] == res["p99_latency"] == 0
 
 
 def test_wpm():
-    agent_words = load_words("tests/assets/agent_words.json")
-    agent_wpm = calculate_wpm(agent_words)
+    timeline = load_timeline()
+    agent_wpm = calculate_wpm(timeline.channel(AGENT))
     assert agent_wpm == approx(184.307, rel=1e-3)
 
-    user_words = load_words("tests/assets/user_words.json")
-    user_wpm = calculate_wpm(user_words)
+    user_wpm = calculate_wpm(timeline.channel(USER))
 
     assert user_wpm == approx(167.579, rel=1e-3)
+
+
+def test_builtin_call_metrics():
+    res = get_call_metrics("tests/assets/call2.wav", load_timeline(), 76)
+    assert set(res) == set(BUILTIN_CALL_METRICS)
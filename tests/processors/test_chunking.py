@@ -0,0 +1,116 @@
+from unittest.mock import MagicMock, patch
+
+from mixedvoices.metrics import Metric
+from mixedvoices.processors.chunking import (
+    should_chunk,
+    split_transcript,
+    stitch_step_names,
+)
+from mixedvoices.processors.llm_metrics import combine_chunk_scores, generate_scores
+from mixedvoices.processors.success import aggregate_chunk_success
+
+
+def make_transcript(num_turns):
+    speakers = ["bot", "user"]
+    return "\n".join(
+        f"{i + 1}. {speakers[i % 2]}: this is turn number {i + 1} of the call"
+        for i in range(num_turns)
+    )
+
+
+def test_split_transcript():
+    transcript = make_transcript(40)
+    chunks = split_transcript(transcript, max_tokens=50)
+    assert len(chunks) > 1
+    assert "\n".join(chunks) == transcript
+    for chunk in chunks:
+        assert chunk.split(". ")[0].isdigit()
+
+    # Unnumbered continuation lines stay with their turn
+    transcript = "1. bot: Hello\nhow are you\n2. user: Good"
+    assert split_transcript(transcript, max_tokens=1) == [
+        "1. bot: Hello\nhow are you",
+        "2. user: Good",
+    ]
+
+
+def test_should_chunk():
+    transcript = make_transcript(40)
+    with patch("mixedvoices.models.TRANSCRIPT_CHUNKING", "off"):
+        assert not should_chunk(transcript)
+    with patch("mixedvoices.models.TRANSCRIPT_CHUNKING", "auto"), patch(
+        "mixedvoices.models.TRANSCRIPT_CHUNK_TOKENS", 50
+    ):
+        assert should_chunk(transcript)
+
+
+def test_stitch_step_names():
+    chunk_steps = [
+        ["Greeting", "Collect Caller Information"],
+        ["Collect Caller Information", "Set Appointment"],
+        ["Farewell"],
+    ]
+    assert stitch_step_names(chunk_steps) == [
+        "Greeting",
+        "Collect Caller Information",
+        "Set Appointment",
+        "Farewell",
+    ]
+
+
+def test_combine_chunk_scores():
+    binary = Metric("binary", "definition", "binary")
+    continuous = Metric("continuous", "definition", "continuous")
+    results = [
+        {"explanation": "good", "score": "PASS"},
+        {"explanation": "bad", "score": "FAIL"},
+    ]
+    assert combine_chunk_scores(binary, results)["score"] == "FAIL"
+    results = [
+        {"explanation": "good", "score": 8},
+        {"explanation": "okay", "score": 5},
+        {"explanation": "unclear", "score": "N/A"},
+    ]
+    combined = combine_chunk_scores(continuous, results)
+    assert combined["score"] == 6
+    assert combined["explanation"].startswith("Part 1: good")
+
+
+@patch("mixedvoices.models.TRANSCRIPT_CHUNKING", "auto")
+@patch("mixedvoices.models.TRANSCRIPT_CHUNK_TOKENS", 50)
+def test_chunked_generate_scores():
+    metric = Metric("empathy", "definition", "continuous")
+    transcript = make_transcript(40)
+    num_chunks = len(split_transcript(transcript, 50))
+
+    def analyze(chunk, prompt, metric):
+        return {"explanation": chunk.split(":")[0], "score": 4}
+
+    client = MagicMock()
+    # Invalid output of the small model falls back to combining the scores
+    client.chat.completions.create.return_value.choices[0].message.content = "Sure"
+    with patch(
+        "mixedvoices.processors.llm_metrics.analyze_metric", side_effect=analyze
+    ) as mock_analyze, patch(
+        "mixedvoices.processors.llm_metrics.get_openai_client", return_value=client
+    ):
+        scores = generate_scores(transcript, "prompt", [metric])
+
+    assert mock_analyze.call_count == num_chunks
+    assert scores["empathy"]["score"] == 4
+
+
+def test_aggregate_chunk_success_needs_verdict():
+    results = [
+        {"explanation": "greeted", "success": True},
+        {"explanation": "hung up", "success": False},
+    ]
+    client = MagicMock()
+    # A score instead of a success verdict
+    client.chat.completions.create.return_value.choices[0].message.content = (
+        "Explanation: Call failed\nScore: 3"
+    )
+    with patch("mixedvoices.processors.success.get_openai_client", return_value=client):
+        result = aggregate_chunk_success(results, "criteria")
+    assert result["success"] is False
+    assert result["explanation"].startswith("Part 1: greeted")
@@ -0,0 +1,129 @@
+import os
+import time
+
+import numpy as np
+import pytest
+from openai.types.audio import TranscriptionWord
+
+from mixedvoices.metrics import CallMetric
+from mixedvoices.processors import custom_call_metrics
+from mixedvoices.processors.audio import AudioBuffer
+from mixedvoices.processors.custom_call_metrics import (
+    run_custom_call_metrics,
+    shutdown_call_metric_pool,
+)
+from mixedvoices.processors.timeline import USER, WordTimeline
+
+
+# Call metrics run in worker processes, which import them from this module
+def count_user_words(audio, timeline, user_channel):
+    return len(timeline.channel(USER))
+
+
+def peak_level(audio, timeline, user_channel):
+    return np.abs(audio.channel(0 if user_channel == "left" else 1)).max()
+
+
+def failing_metric(audio, timeline, user_channel):
+    raise ValueError("Bad metric")
+
+
+def slow_metric(audio, timeline, user_channel):
+    time.sleep(30)
+
+
+def crashing_metric(audio, timeline, user_channel):
+    os._exit(1)
+
+
+def test_call_metric():
+    call_metric = CallMetric("User_Words", count_user_words)
+    assert call_metric.name == "user_words"
+    assert call_metric.function == "test_custom_call_metrics:count_user_words"
+    assert call_metric.load_function() is count_user_words
+    assert CallMetric(**call_metric.to_dict()) == call_metric
+
+    with pytest.raises(ValueError):
+        CallMetric("lambda", lambda audio, timeline, user_channel: 0)
+    with pytest.raises(ValueError):
+        CallMetric("no_module", "count_user_words")
+    with pytest.raises(ValueError):
+        CallMetric("no_timeout", count_user_words, timeout=0)
+
+
+def test_run_custom_call_metrics():
+    user_words = [TranscriptionWord(word="Hi", start=0.0, end=0.5)]
+    timeline = WordTimeline.from_words(user_words, [])
+    call_metrics = [
+        CallMetric("user_words", count_user_words),
+        CallMetric("peak_level", peak_level),
+        CallMetric("failing", failing_metric),
+        CallMetric("slow", slow_metric, timeout=1),
+    ]
+    start = time.time()
+    try:
+        results, failures = run_custom_call_metrics(
+            call_metrics,
+            AudioBuffer.from_file("tests/assets/call2.wav"),
+            timeline,
+            "right",
+        )
+        # The worker still running the slow metric is stopped with its pool
+        assert custom_call_metrics._pool is None
+    finally:
+        shutdown_call_metric_pool()
+
+    assert time.time() - start < 30
+    assert results == {
+        "user_words": 1,
+        "peak_level": 32767,
+        "failing": "N/A",
+        "slow": "N/A",
+    }
+    assert isinstance(results["peak_level"], int)
+    assert failures == {
+        "failing": "ValueError: Bad metric",
+        "slow": "CallMetricTimeoutError: Timed out after 1s",
+    }
+
+
+def test_custom_call_metrics_pool_restarted():
+    timeline = WordTimeline.from_words(
+        [TranscriptionWord(word="Hi", start=0.0, end=0.5)], []
+    )
+    try:
+        results, failures = run_custom_call_metrics(
+            [CallMetric("crashing", crashing_metric)],
+            AudioBuffer.from_file("tests/assets/call2.wav"),
+            timeline,
+        )
+        assert results == {"crashing": "N/A"}
+        assert failures["crashing"].startswith("BrokenProcessPool")
+
+        # The broken pool is replaced for the next recording
+        results, failures = run_custom_call_metrics(
+            [CallMetric("user_words", count_user_words)],
+            AudioBuffer.from_file("tests/assets/call2.wav"),
+            timeline,
+        )
+        assert results == {"user_words": 1}
+    finally:
+        shutdown_call_metric_pool()
+
+
+def test_custom_call_metrics_decoded_audio():
+    timeline = WordTimeline.from_words([], [])
+    samples = np.zeros((2, 8000), dtype=np.float32)
+    samples[1, 100] = -0.5
+    try:
+        # Audio that isn't mapped from a WAV file is shared through a temporary one
+        results, failures = run_custom_call_metrics(
+            [CallMetric("peak_level", peak_level)],
+            AudioBuffer(samples, 8000),
+            timeline,
+            "right",
+        )
+    finally:
+        shutdown_call_metric_pool()
+    assert results == {"peak_level": 0.5}
+    assert failures == {}
@@ -0,0 +1,112 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from httpx import RequestError
+
+from mixedvoices.core.circuit_breaker import (
+    FAILURE_THRESHOLD,
+    ProviderUnavailableError,
+    get_breaker,
+)
+from mixedvoices.processors.deepgram import (
+    MAX_RETRIES,
+    AsyncDeepgramClient,
+    DeepgramClient,
+    DeepgramUpload,
+)
+
+RESULT = {"results": {"channels": []}}
+
+
+class FakeDeepgram(BaseHTTPRequestHandler):
+    """Replies with the queued status codes in order, then 200"""
+
+    protocol_version = "HTTP/1.1"  # Keep connections alive
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server.requests.append((self.client_address, body))
+        status = server.statuses.pop(0) if server.statuses else 200
+        payload = json.dumps(RESULT if status == 200 else {"error": "x"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_deepgram(monkeypatch):
+    monkeypatch.setenv("DEEPGRAM_API_KEY", "dummy")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeDeepgram)
+    server.requests, server.statuses = [], []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    get_breaker("deepgram").record_success()
+    with patch("mixedvoices.processors.deepgram.BASE_RETRY_SECONDS", 0.01):
+        yield server, f"http://127.0.0.1:{server.server_address[1]}/v1/listen"
+    server.shutdown()
+    server.server_close()
+    get_breaker("deepgram").record_success()
+
+
+def test_deepgram_client(fake_deepgram, tmp_path):
+    server, url = fake_deepgram
+    audio_path = tmp_path / "call.wav"
+    audio_path.write_bytes(b"audio" * 1000)
+    client = DeepgramClient(url)
+
+    server.statuses = [503, 429]
+    assert client.listen(DeepgramUpload(str(audio_path))) == RESULT
+    assert client.listen(DeepgramUpload(b"encoded", "audio/flac")) == RESULT
+    client.close()
+
+    # Retried uploads of a file are sent whole each time
+    bodies = [body for _, body in server.requests]
+    assert bodies == [b"audio" * 1000] * 3 + [b"encoded"]
+    # A single pooled connection is reused across requests
+    assert len({address for address, _ in server.requests}) == 1
+
+
+def test_deepgram_client_errors(fake_deepgram):
+    server, url = fake_deepgram
+    client = DeepgramClient(url)
+
+    server.statuses = [400]
+    with pytest.raises(RequestError):
+        client.listen(DeepgramUpload(b"encoded"))
+    assert len(server.requests) == 1  # Bad requests aren't retried
+
+    # Retries of a request count as a single failure
+    server.requests = []
+    server.statuses = [500] * (MAX_RETRIES + 1) * FAILURE_THRESHOLD
+    with pytest.raises(RequestError):
+        client.listen(DeepgramUpload(b"encoded"))
+    assert len(server.requests) == MAX_RETRIES + 1
+    assert get_breaker("deepgram").consecutive_failures == 1
+
+    for _ in range(FAILURE_THRESHOLD - 2):
+        with pytest.raises(RequestError):
+            client.listen(DeepgramUpload(b"encoded"))
+    with pytest.raises(ProviderUnavailableError):
+        client.listen(DeepgramUpload(b"encoded"))
+    assert get_breaker("deepgram").is_open
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_async_deepgram_client(fake_deepgram):
+    server, url = fake_deepgram
+    server.statuses = [502]
+    async with AsyncDeepgramClient(url) as client:
+        assert await client.listen(DeepgramUpload(b"encoded")) == RESULT
+    assert len(server.requests) == 2
@@ -0,0 +1,94 @@
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from mixedvoices.core.utils import get_transcript_and_duration
+from mixedvoices.processors.audio import AudioBuffer
+from mixedvoices.processors.local_transcriber import (
+    get_local_pool,
+    get_model_size,
+    shutdown_local_pool,
+    transcribe_and_combine_local,
+)
+from mixedvoices.processors.timeline import AGENT, USER
+
+has_faster_whisper = importlib.util.find_spec("faster_whisper") is not None
+
+
+def test_local_transcription():
+    samples = np.zeros((2, 8000), dtype=np.int16)
+    samples[1] = 1000  # Agent channel, left is silent
+    received = []
+
+    def transcribe(samples, vad_filter):
+        received.append(samples)
+        if samples.max() > 0:
+            return [("Hi", 0.5, 0.7), ("there.", 0.8, 1.0)]
+        return [("Hello", 0.0, 0.4)]
+
+    with ThreadPoolExecutor(2) as pool, patch(
+        "mixedvoices.processors.local_transcriber.get_local_pool", return_value=pool
+    ), patch(
+        "mixedvoices.processors.local_transcriber._transcribe_in_worker",
+        side_effect=transcribe,
+    ):
+        transcript, timeline = transcribe_and_combine_local(
+            AudioBuffer(samples, 8000), "left"
+        )
+
+    # Channels are resampled to 16 kHz float32 for Whisper
+    assert all(s.dtype == np.float32 and len(s) == 16000 for s in received)
+    assert timeline.channel(USER).words.tolist() == ["Hello"]
+    assert timeline.channel(AGENT).starts.tolist() == [0.5, 0.8]
+    assert transcript == "1. user: Hello\n2. bot: Hi there."
+
+
+def test_local_pool_restarted_once():
+    samples = np.zeros((2, 8000), dtype=np.int16)
+    broken_pool = MagicMock()
+    broken_pool.submit.side_effect = BrokenProcessPool("A worker died")
+
+    with ThreadPoolExecutor(2) as pool, patch(
+        "mixedvoices.processors.local_transcriber.get_local_pool",
+        side_effect=lambda: pool if broken_pool.shutdown.called else broken_pool,
+    ), patch(
+        "mixedvoices.processors.local_transcriber._transcribe_in_worker",
+        return_value=[("Hello", 0.0, 0.4)],
+    ):
+        transcript, _ = transcribe_and_combine_local(AudioBuffer(samples, 8000))
+    assert "user: Hello" in transcript and "bot: Hello" in transcript
+    broken_pool.shutdown.assert_called_once_with(wait=False)
+
+    with patch(
+        "mixedvoices.processors.local_transcriber.get_local_pool",
+        return_value=broken_pool,
+    ):
+        with pytest.raises(BrokenProcessPool):
+            transcribe_and_combine_local(AudioBuffer(samples, 8000))
+
+
+def test_local_model_size():
+    assert get_model_size("local/whisper-base") == "base"
+    with pytest.raises(ValueError):
+        get_model_size("openai/whisper-1")
+
+
+@pytest.mark.skipif(has_faster_whisper, reason="faster-whisper installed")
+def test_local_transcriber_not_installed():
+    with pytest.raises(ImportError, match=r"mixedvoices\[local\]"):
+        get_local_pool()
+
+
+@pytest.mark.skipif(not has_faster_whisper, reason="faster-whisper not installed")
+@patch("mixedvoices.models.TRANSCRIPTION_MODEL", "local/whisper-tiny")
+def test_local_transcriber():
+    try:
+        transcript, _, duration = get_transcript_and_duration("tests/assets/call2.wav")
+    finally:
+        shutdown_local_pool()
+    assert "appointment" in transcript.lower()
+    assert round(duration) == 76
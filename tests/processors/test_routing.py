@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+import pytest
+
+from mixedvoices.processors.routing import estimate_tokens, get_model
+from mixedvoices.processors.steps import is_valid_steps_response
+
+
+@patch("mixedvoices.models.MODEL_ROUTING", "fixed")
+@patch("mixedvoices.models.METRICS_MODEL", "gpt-4o")
+def test_fixed_routing():
+    assert get_model("metrics", "short transcript") == "gpt-4o"
+    with pytest.raises(ValueError):
+        get_model("unknown", "short transcript")
+
+
+@patch("mixedvoices.models.MODEL_ROUTING", "adaptive")
+@patch("mixedvoices.models.ROUTING_SMALL_MODEL", "gpt-4o-mini")
+@patch("mixedvoices.models.ROUTING_TOKEN_THRESHOLD", 100)
+@patch("mixedvoices.models.ROUTING_BUDGET", "balanced")
+@patch("mixedvoices.models.METRICS_MODEL", "gpt-4o")
+@patch("mixedvoices.models.STEPS_MODEL", "gpt-4o")
+@patch("mixedvoices.models.SUMMARY_MODEL", "gpt-4o")
+def test_adaptive_routing():
+    short_transcript = "a" * 200
+    long_transcript = "a" * 600
+    assert estimate_tokens(long_transcript) == 150
+
+    assert get_model("metrics", short_transcript) == "gpt-4o-mini"
+    assert get_model("metrics", short_transcript, escalate=True) == "gpt-4o"
+    assert get_model("metrics", long_transcript) == "gpt-4o"
+
+    # Per stage thresholds: summary tolerates more, steps less
+    assert get_model("summary", long_transcript) == "gpt-4o-mini"
+    assert get_model("steps", short_transcript) == "gpt-4o-mini"
+    assert get_model("steps", "a" * 300) == "gpt-4o"
+
+    with patch("mixedvoices.models.ROUTING_BUDGET", "cost"):
+        assert get_model("metrics", long_transcript) == "gpt-4o-mini"
+    with patch("mixedvoices.models.ROUTING_BUDGET", "quality"):
+        assert get_model("metrics", "a" * 300) == "gpt-4o"
+
+
+def test_is_valid_steps_response():
+    assert is_valid_steps_response("#Thinking#\n...\n#Output#\nGreeting, Farewell")
+    assert not is_valid_steps_response("Greeting, Farewell")
+    assert not is_valid_steps_response("#Output#\nGreeting, , Farewell")
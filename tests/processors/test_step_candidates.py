@@ -0,0 +1,45 @@
+import glob
+import json
+
+from mixedvoices.processors.step_candidates import (
+    OFFERED_STEP_NAMES,
+    select_step_candidates,
+)
+from mixedvoices.processors.utils import get_standard_steps_string
+
+
+def load_fixture_calls():
+    """Transcripts of the sample project, with the step names of each"""
+    version_folder = "tests/assets/sample_project/versions/v1"
+    step_names = {}
+    for path in glob.glob(f"{version_folder}/steps/*/info.json"):
+        step_names[path.split("/")[-2]] = json.load(open(path))["name"]
+    calls = []
+    for path in glob.glob(f"{version_folder}/recordings/*/info.json"):
+        recording = json.load(open(path))
+        names = [step_names[step_id] for step_id in recording["step_ids"]]
+        calls.append((recording["combined_transcript"], names))
+    return calls
+
+
+def test_select_step_candidates():
+    step_counts = {f"Discuss Topic {i}": 50 for i in range(200)}
+    step_counts.update({"Greeting": 100, "Check Refund Status": 1})
+    calls = load_fixture_calls()
+    for _, names in calls:
+        step_counts.update({name: 2 for name in names if name not in step_counts})
+
+    full_prompt = get_standard_steps_string(list(step_counts))
+    for transcript, names in calls:
+        candidates = select_step_candidates(transcript, step_counts, 10)
+        assert len(candidates) == 10
+        assert "Greeting" not in candidates  # Always offered as a standard step
+        assert set(names) - OFFERED_STEP_NAMES <= set(candidates)
+        assert len(get_standard_steps_string(candidates)) < len(full_prompt) / 5
+
+    # Every step fits under the limit, most used first
+    assert select_step_candidates("", {"Pay Bill": 1, "Ask Price": 3}, 10) == [
+        "Ask Price",
+        "Pay Bill",
+    ]
+    assert select_step_candidates("", {"Pay Bill": 1}, 0) == []
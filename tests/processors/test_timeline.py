@@ -0,0 +1,43 @@
+from openai.types.audio import TranscriptionWord
+
+from mixedvoices.processors.timeline import AGENT, USER, WordTimeline
+from mixedvoices.processors.transcriber import create_combined_transcript
+
+
+def words(*timed_words):
+    return [TranscriptionWord(word=w, start=s, end=s + 0.3) for w, s in timed_words]
+
+
+def test_word_timeline():
+    user_words = words(("Hi", 1.0), ("there", 1.4), ("Thanks", 6.0))
+    agent_words = words(("Hello", 0.0), ("How", 3.0), ("can", 3.4), ("I", 6.0))
+    timeline = WordTimeline.from_words(user_words, agent_words)
+
+    assert len(timeline) == 7
+    assert timeline.starts.tolist() == sorted(timeline.starts.tolist())
+    # The agent's word goes first when both start together
+    assert timeline.words.tolist()[-2:] == ["I", "Thanks"]
+    assert timeline.channel(USER).to_words() == user_words
+    assert timeline.channel(AGENT).words.tolist() == ["Hello", "How", "can", "I"]
+
+    assert create_combined_transcript(timeline) == (
+        "1. bot: Hello\n2. user: Hi there\n3. bot: How can I\n4. user: Thanks"
+    )
+    empty = WordTimeline.from_words([], [])
+    assert len(empty) == 0 and create_combined_transcript(empty) == ""
+
+
+def test_word_timeline_save(tmp_path):
+    timeline = WordTimeline.from_words(
+        words(("yes", 1.0), ("yes", 2.0)), words(("Hello", 0.0), ("yes", 3.0))
+    )
+    path = str(tmp_path / "timeline.npz")
+    timeline.save(path)
+    loaded = WordTimeline.load(path)
+    assert loaded.words.tolist() == ["Hello", "yes", "yes", "yes"]
+    assert loaded.starts.tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert loaded.speakers.tolist() == [AGENT, USER, USER, AGENT]
+    assert loaded.words[1] is loaded.words[3]  # Interned
+
+    WordTimeline.from_words([], []).save(path)
+    assert len(WordTimeline.load(path)) == 0
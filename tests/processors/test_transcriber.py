@@ -1,9 +1,26 @@
+import io
+import threading
 from unittest.mock import patch
 
+import numpy as np
 import pytest
+import soundfile as sf
+from openai.types.audio import TranscriptionWord
 
 from conftest import needs_deepgram_key, needs_openai_key
 from mixedvoices.core.utils import get_transcript_and_duration
+from mixedvoices.processors.audio import AudioBuffer
+from mixedvoices.processors.timeline import AGENT, USER
+from mixedvoices.processors.transcriber import (
+    EncodedAudio,
+    TranscriptionExecutor,
+    UploadStats,
+    encode_audio,
+    find_chunk_boundaries,
+    get_chunk_seconds,
+    transcribe_and_combine_openai,
+    transcribe_with_deepgram,
+)
 
 
 def check_transcript(transcript):
@@ -14,15 +31,13 @@ def check_transcript(transcript):
 
 @needs_openai_key
 @patch("mixedvoices.models.TRANSCRIPTION_MODEL", "openai/whisper-1")
-def test_openai_transcriber(tmp_path):
+def test_openai_transcriber():
     with pytest.raises(ValueError):
-        get_transcript_and_duration("tests/assets/call2.wav", tmp_path, "top")
+        get_transcript_and_duration("tests/assets/call2.wav", "top")
 
     with pytest.raises(ValueError):
-        get_transcript_and_duration("tests/assets/call2_user.wav", tmp_path)
-    transcript, _, _, duration = get_transcript_and_duration(
-        "tests/assets/call2.wav", tmp_path
-    )
+        get_transcript_and_duration("tests/assets/call2_user.wav")
+    transcript, _, duration = get_transcript_and_duration("tests/assets/call2.wav")
     check_transcript(transcript.lower())
 
     assert round(duration) == 76
@@ -30,10 +45,124 @@ def test_openai_transcriber(tmp_path):
 
 @needs_deepgram_key
 @patch("mixedvoices.models.TRANSCRIPTION_MODEL", "deepgram/nova-2")
-def test_deepgram_transcriber(tmp_path):
-    transcript, _, _, duration = get_transcript_and_duration(
-        "tests/assets/call2.wav", tmp_path
-    )
+def test_deepgram_transcriber():
+    transcript, _, duration = get_transcript_and_duration("tests/assets/call2.wav")
     check_transcript(transcript.lower())
 
     assert round(duration) == 76
+
+
+@patch("mixedvoices.models.UPLOAD_ENCODING", "wav")
+@patch("mixedvoices.processors.transcriber.SILENCE_SEARCH_SECONDS", 2)
+def test_find_chunk_boundaries():
+    sample_rate = 100
+    samples = np.ones(25 * sample_rate, dtype=np.float32)
+    samples[850:900] = 0  # Silence between 8.5s and 9s
+
+    boundaries = find_chunk_boundaries(samples, sample_rate, chunk_seconds=10)
+    assert boundaries[0] == 0 and boundaries[-1] == len(samples)
+    assert 850 <= boundaries[1] < 900  # Cut in the silence before 10s
+    assert all(b - a <= 10 * sample_rate for a, b in zip(boundaries, boundaries[1:]))
+
+    assert find_chunk_boundaries(samples[:500], sample_rate, 10) == [0, 500]
+    # Whisper's upload limit caps chunks of high sample rate audio
+    assert get_chunk_seconds(48000) < get_chunk_seconds(16000) == 600
+
+
+@patch("mixedvoices.processors.transcriber.WHISPER_CHUNK_SECONDS", 10)
+@patch("mixedvoices.processors.transcriber.SILENCE_SEARCH_SECONDS", 2)
+def test_chunked_openai_transcription():
+    sample_rate = 100
+    samples = np.zeros((2, 25 * sample_rate), dtype=np.float32)
+
+    def transcribe(audio_file):
+        # Every chunk has a single word said 1s into it
+        return "hello", [TranscriptionWord(word="hello", start=1.0, end=1.5)]
+
+    stats = UploadStats("flac")
+    with patch(
+        "mixedvoices.processors.transcriber.transcribe_with_openai",
+        side_effect=transcribe,
+    ) as mock_transcribe:
+        _, timeline = transcribe_and_combine_openai(
+            AudioBuffer(samples, sample_rate), "right", stats
+        )
+        # The pool is still usable for the next recording
+        transcribe_and_combine_openai(AudioBuffer(samples, sample_rate))
+
+    assert mock_transcribe.call_count == 12
+    assert stats.to_dict()["upload_bytes"] > 0
+    # Silent audio is cut at the start of the search window, every 8s
+    starts = timeline.channel(USER).starts.tolist()
+    assert starts == [1.0, 9.0, 17.0]
+    assert timeline.channel(AGENT).starts.tolist() == starts
+
+
+@pytest.mark.parametrize("encoding", ["wav", "flac", "opus"])
+def test_encode_audio(encoding):
+    sample_rate = 44100
+    t = np.arange(2 * sample_rate) / sample_rate
+    samples = (0.3 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16)
+
+    with patch("mixedvoices.models.UPLOAD_ENCODING", encoding):
+        encoded = encode_audio(samples, sample_rate, "chunk")
+    decoded, decoded_rate = sf.read(io.BytesIO(encoded.data))
+    assert encoded.filename.startswith("chunk.")
+    assert decoded_rate == (sample_rate if encoding == "wav" else 16000)
+    assert len(decoded) / decoded_rate == pytest.approx(2, abs=0.05)
+    middle = decoded[len(decoded) // 4 : -len(decoded) // 4]
+    assert np.sqrt(np.mean(middle**2)) == pytest.approx(0.3 / np.sqrt(2), abs=0.03)
+    if encoding != "wav":
+        assert len(encoded.data) < 2 * 16000 * 2  # Smaller than 16 kHz PCM
+
+
+@patch("mixedvoices.models.UPLOAD_ENCODING", "opus")
+def test_deepgram_upload_encoding():
+    samples = np.zeros((2, 16000), dtype=np.float32)
+    channel = {"alternatives": [{"transcript": "", "words": []}]}
+    uploads = []
+
+    def request(upload):
+        uploads.append(upload)
+        return {"results": {"channels": [channel, channel]}}
+
+    stats = UploadStats("opus")
+    with patch(
+        "mixedvoices.processors.transcriber.make_deepgram_request", side_effect=request
+    ):
+        transcribe_with_deepgram(
+            "call.wav", audio=AudioBuffer(samples, 16000), stats=stats
+        )
+
+    assert isinstance(uploads[0], EncodedAudio)
+    assert uploads[0].content_type == "audio/ogg"
+    assert sf.info(io.BytesIO(uploads[0].data)).channels == 2
+    assert stats.upload_bytes == len(uploads[0].data)
+
+
+@patch("mixedvoices.models.TRANSCRIPTION_WORKERS", 2)
+def test_transcription_executor():
+    executor = TranscriptionExecutor()
+    release = threading.Event()
+    futures = [executor.submit(release.wait, 5) for _ in range(3)]
+    waiting = executor.submit(lambda: "done")
+    assert waiting.cancel()
+
+    stats = executor.stats()
+    assert stats["workers"] == 2
+    assert stats["running"] + stats["queued"] == 3
+    assert stats["peak_queued"] >= 2
+
+    release.set()
+    executor.shutdown()  # Waits for queued work
+    assert all(future.done() for future in futures)
+    assert executor.stats() == {
+        "workers": 0,
+        "queued": 0,
+        "running": 0,
+        "completed": 3,
+        "peak_queued": stats["peak_queued"],
+    }
+    # Shutting down doesn't break the next recording
+    assert executor.submit(lambda: "done").result() == "done"
+    executor.shutdown()
@@ -60,6 +60,7 @@ def test_get_standard_steps_string():
         "Check Medicine Availability",
         "Check Cream Availability",
         "Ask to speak to manager",
+        "Ask to speak to manager",  # Listed once
     ]
 
     standard_steps = get_standard_steps_string(existing_step_names)
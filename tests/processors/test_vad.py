@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from openai.types.audio import TranscriptionWord
+
+from mixedvoices.processors.audio import AudioBuffer
+from mixedvoices.processors.timeline import AGENT, USER
+from mixedvoices.processors.transcriber import (
+    UploadStats,
+    transcribe_and_combine_openai,
+)
+from mixedvoices.processors.vad import compact, find_speech_regions, union_regions
+
+SAMPLE_RATE = 8000
+
+
+def make_speech(seconds, speech_times):
+    """Quiet noise with a loud tone over each (start, end) in seconds"""
+    rng = np.random.default_rng(0)
+    samples = 0.001 * rng.standard_normal(int(seconds * SAMPLE_RATE))
+    t = np.arange(len(samples)) / SAMPLE_RATE
+    for start, end in speech_times:
+        mask = (t >= start) & (t < end)
+        samples[mask] += 0.3 * np.sin(2 * np.pi * 220 * t[mask])
+    return samples.astype(np.float32)
+
+
+def test_find_speech_regions():
+    # The short pause in the first region doesn't split it
+    samples = make_speech(12, [(1, 2), (2.2, 3), (7, 8)])
+    regions = np.array(find_speech_regions(samples, SAMPLE_RATE)) / SAMPLE_RATE
+    assert regions.ravel() == pytest.approx([0.8, 3.2, 6.8, 8.2], abs=0.04)
+
+    assert find_speech_regions(np.zeros(SAMPLE_RATE, np.float32), SAMPLE_RATE) == []
+    assert union_regions([(0, 10), (30, 40)], [(5, 20), (50, 60)]) == [
+        (0, 20),
+        (30, 40),
+        (50, 60),
+    ]
+
+
+def test_compact():
+    samples = np.arange(10 * SAMPLE_RATE, dtype=np.int16)
+    regions = [(1 * SAMPLE_RATE, 2 * SAMPLE_RATE), (5 * SAMPLE_RATE, 6 * SAMPLE_RATE)]
+    compacted, timestamp_map = compact(samples, SAMPLE_RATE, regions)
+
+    assert compacted.dtype == np.int16
+    assert len(compacted) == 2.3 * SAMPLE_RATE  # Two regions and a 0.3s gap
+    assert compacted[0] == samples[SAMPLE_RATE]
+    assert compacted[-1] == samples[6 * SAMPLE_RATE - 1]
+    assert timestamp_map.to_original(0.5) == pytest.approx(1.5)
+    assert timestamp_map.to_original(1.8) == pytest.approx(5.5)
+    assert timestamp_map.to_original(1.1) == pytest.approx(2)  # In the gap
+
+    stereo, _ = compact(np.zeros((10, 2)), 10, [(0, 2), (5, 8)])
+    assert stereo.shape == (8, 2)
+
+
+@patch("mixedvoices.models.TRANSCRIPTION_VAD", "on")
+def test_vad_transcription_keeps_call_time():
+    samples = np.zeros((2, 20 * SAMPLE_RATE), dtype=np.float32)
+    samples[0] = make_speech(20, [(3, 4), (10, 11)])
+
+    def transcribe(audio_file):
+        # A word at the start of each region of the compacted audio
+        words = [
+            TranscriptionWord(word="hi", start=0.2, end=0.6),
+            TranscriptionWord(word="bye", start=1.9, end=2.2),
+        ]
+        return "hi bye", words
+
+    stats = UploadStats("flac")
+    with patch(
+        "mixedvoices.processors.transcriber.transcribe_with_openai",
+        side_effect=transcribe,
+    ) as mock_transcribe:
+        _, timeline = transcribe_and_combine_openai(
+            AudioBuffer(samples, SAMPLE_RATE), "left", stats
+        )
+
+    # Silent agent channel isn't uploaded at all
+    assert mock_transcribe.call_count == 1
+    assert len(timeline.channel(AGENT)) == 0
+    starts = timeline.channel(USER).starts
+    assert starts == pytest.approx([3.0, 10.0], abs=0.04)
+    assert stats.audio_seconds == pytest.approx(3.1, abs=0.1)
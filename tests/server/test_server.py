@@ -1,7 +1,14 @@
+import time
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 
+from mixedvoices.core.task_manager import (
+    _CURRENT_TASK,
+    TASK_MANAGER,
+    Task,
+    TaskStatus,
+)
 from mixedvoices.server.server import app
 
 client = TestClient(app)
@@ -239,11 +246,20 @@ def test_version_operations(empty_project):
         assert response.status_code == 500
 
     # Update success criteria
-    response = client.post(
-        "/api/projects/empty_project/success_criteria",
-        json={"success_criteria": "Updated criteria"},
-    )
-    assert response.status_code == 200
+    with patch("mixedvoices.core.version.Version.rejudge_success") as mock_rejudge:
+        response = client.post(
+            "/api/projects/empty_project/success_criteria",
+            json={"success_criteria": "Updated criteria"},
+        )
+        assert response.status_code == 200
+        mock_rejudge.assert_not_called()
+        response = client.post(
+            "/api/projects/empty_project/success_criteria",
+            json={"success_criteria": "Updated criteria", "rejudge": True},
+        )
+        assert response.status_code == 200
+    assert mock_rejudge.call_count == 2  # Once for each version
+    mock_rejudge.assert_called_with(blocking=False)
 
     # Test invalid version
     response = client.post(
@@ -518,13 +534,39 @@ def test_recording_flow(sample_project):
         )
         assert response.status_code == 500
 
+    # Get recording details
+    response = client.get(
+        f"/api/projects/sample_project/versions/v1/recordings/{recording_id}"
+    )
+    assert response.status_code == 200
+    assert response.json()["combined_transcript"]
+
+    response = client.get("/api/projects/sample_project/versions/v1/recordings/invalid")
+    assert response.status_code == 404
+
     # Get step recordings
     for step in steps:
         response = client.get(
             f"/api/projects/sample_project/versions/v1/steps/{step['id']}/recordings"
         )
         assert response.status_code == 200
-        assert "recordings" in response.json()
+        assert recording_id in [row["id"] for row in response.json()["recordings"]]
+        assert "combined_transcript" not in response.json()["recordings"][0]
+
+    # Paginated and filtered
+    response = client.get(
+        f"/api/projects/sample_project/versions/v1/steps/{step['id']}/recordings",
+        params={"offset": 0, "limit": 1, "is_successful": "false", "order": "asc"},
+    )
+    assert response.status_code == 200
+    assert len(response.json()["recordings"]) <= 1
+    assert response.json()["successful"] == 0
+
+    response = client.get(
+        f"/api/projects/sample_project/versions/v1/steps/{step['id']}/recordings",
+        params={"order": "invalid"},
+    )
+    assert response.status_code == 400
 
     # Test invalid step ID
     response = client.get(
@@ -534,7 +576,7 @@ def test_recording_flow(sample_project):
 
     # Mock error
     with patch(
-        "mixedvoices.core.version.Version.get_step",
+        "mixedvoices.server.server.get_step_recordings",
         side_effect=Exception("Test error"),
     ):
         response = client.get(
@@ -621,3 +663,63 @@ def test_eval_run_operations(sample_project):
             f"/api/projects/sample_project/evals/{eval_id}/runs/{run_id}"
         )
         assert response.status_code == 500
+
+
+def test_transcription_stats():
+    response = client.get("/api/transcription/stats")
+    assert response.status_code == 200
+    assert {"workers", "queued", "running", "completed"} <= response.json().keys()
+
+
+def test_latency_percentiles(sample_project):
+    response = client.get("/api/projects/sample_project/versions/v1/latency")
+    assert response.status_code == 200
+    assert {"p50_latency", "p90_latency", "p99_latency", "turns"} <= (
+        response.json().keys()
+    )
+
+    response = client.get("/api/projects/invalid/versions/v1/latency")
+    assert response.status_code == 404
+
+
+def test_rescore_metrics_and_tasks(empty_project):
+    response = client.post("/api/projects/empty_project/versions/v1/rescore_metrics")
+    assert response.status_code == 200
+    assert response.json()["task_ids"] == []  # No metrics to score
+
+    with patch(
+        "mixedvoices.core.version.Version.rescore_stale_metrics",
+        return_value=["task-id"],
+    ):
+        response = client.post(
+            "/api/projects/empty_project/versions/v1/rescore_metrics"
+        )
+    assert response.json()["task_ids"] == ["task-id"]
+
+    response = client.post("/api/projects/invalid/versions/v1/rescore_metrics")
+    assert response.status_code == 404
+
+    task = Task("task-id", "rescore_recordings", {}, TaskStatus.PENDING, time.time())
+    TASK_MANAGER.tasks[task.task_id] = task
+    token = _CURRENT_TASK.set(task)
+    try:
+        TASK_MANAGER.report_progress(1, 2)
+    finally:
+        _CURRENT_TASK.reset(token)
+    response = client.get(f"/api/tasks/{task.task_id}")
+    assert response.status_code == 200
+    assert response.json()["progress"] == {"done": 1, "total": 2}
+
+    response = client.get("/api/tasks/invalid")
+    assert response.status_code == 404
+
+
+def test_project_flow(sample_project):
+    response = client.get("/api/projects/sample_project/flow")
+    assert response.status_code == 200
+    steps = response.json()["steps"]
+    assert sum(step["number_of_terminated_calls"] for step in steps) == 2
+    assert steps[0]["versions"]["v1"]["calls"] == 2
+
+    response = client.get("/api/projects/invalid/flow")
+    assert response.status_code == 404
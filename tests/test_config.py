@@ -0,0 +1,37 @@
+import pytest
+
+from mixedvoices import config
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    monkeypatch.setattr(config, "CONFIG_PATH", str(path))
+    return path
+
+
+@pytest.mark.parametrize(
+    "key, value",
+    [
+        ("CALL_METRIC_PROCESSES", "0"),
+        ("TRANSCRIPTION_WORKERS", "2.5"),
+        ("STEPS_CANDIDATE_LIMIT", "-5"),
+        ("ROUTING_TOKEN_THRESHOLD", "many"),
+        ("TASK_DEADLINE", "0"),
+        ("REQUEST_TIMEOUT", "-1"),
+        ("REQUEST_TIMEOUT", "nan"),
+        ("TRANSCRIPTION_MODEL", "whisper"),
+        ("UNKNOWN_KEY", "1"),
+    ],
+)
+def test_update_value_rejects_invalid(config_path, key, value):
+    with pytest.raises(ValueError):
+        config.update_value(key, value)
+    assert config.load_config() == config.DEFAULT_CONFIG
+
+
+def test_update_value(config_path):
+    config.update_value("CALL_METRIC_PROCESSES", "4")
+    config.update_value("REQUEST_TIMEOUT", "30.5")
+    assert config.get_value_from_config("CALL_METRIC_PROCESSES") == "4"
+    assert config.get_value_from_config("REQUEST_TIMEOUT") == "30.5"